@@ -0,0 +1,262 @@
+import os
+import sys
+import json
+import time
+import pickle
+import sqlite3
+import argparse
+import datetime
+import urllib.request
+import numpy as np
+import pandas as pd
+import shared_cache
+import tracing
+from tracing import span
+from market_data import download_histories, fetch_info
+from compact_store import SIGNAL_LABELS, PRICE_FIELDS, build_panel, calendar_groups
+import stock_analysis
+import signal_rules
+from watchlists import load_universe
+
+ALERT_DB = "alerts.db"
+ALERT_LOG = "alerts.log"
+BAR_STORE = "scanner_bars.pkl"
+HISTORY_PERIOD = "2y"
+HISTORY_YEARS = 2
+REFRESH_OVERLAP_DAYS = 5
+# A re-downloaded bar that moved by more than this means Yahoo re-adjusted the history
+# (split or dividend), so the stored series is replaced instead of appended to.
+ADJUSTMENT_TOLERANCE = 1e-4
+EX_DIVIDEND_DAYS = 3
+SCAN_INTERVAL = 15 * 60
+WEBHOOK_TIMEOUT = 10
+BAND_LABELS = {-1: "below lower band", 0: "inside bands", 1: "above upper band"}
+SINKS = ["log", "sqlite", "webhook"]
+
+def open_state(path=ALERT_DB):
+    conn = sqlite3.connect(path)
+    conn.execute("""CREATE TABLE IF NOT EXISTS signal_state (
+        ticker TEXT PRIMARY KEY, bar_date TEXT, signal TEXT, strength INTEGER, band INTEGER, ex_dividend TEXT)""")
+    conn.execute("""CREATE TABLE IF NOT EXISTS alerts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT, created TEXT, ticker TEXT, kind TEXT,
+        previous TEXT, current TEXT, detail TEXT)""")
+    conn.commit()
+    return conn
+
+def load_bars(path=BAR_STORE):
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    return {}
+
+def save_bars(bars, path=BAR_STORE):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        pickle.dump(bars, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
+def _merge_bars(old, fresh):
+    """Append fresh bars to old, or None when the overlap shows the history was re-adjusted."""
+    pos = old.index.searchsorted(fresh.index[0])
+    matches = fresh.index.get_indexer(old.index[pos:])
+    found = matches >= 0
+    if found.any():
+        before = old["Close"].to_numpy(dtype=np.float64)[pos:][found]
+        after = fresh["Close"].to_numpy(dtype=np.float64)[matches[found]]
+        if np.nanmax(np.abs(after / before - 1)) > ADJUSTMENT_TOLERANCE:
+            return None
+    elif fresh.index[0] > old.index[-1] + pd.Timedelta(days=REFRESH_OVERLAP_DAYS * 3):
+        return None
+    merged = pd.concat([old.iloc[:pos], fresh])
+    return merged.iloc[merged.index.searchsorted(merged.index[-1] - pd.DateOffset(years=HISTORY_YEARS)):]
+
+def update_bars(bars, tickers):
+    """
+    Bring the stored daily bars up to date in place. Known tickers only download the last
+    few bars (one batched request per start date); new or re-adjusted tickers get the full
+    history. Returns the number of tickers fully re-downloaded.
+    """
+    shared_cache.invalidate("history")
+    shared_cache.invalidate("price_store")
+    starts = {}
+    full = [t for t in tickers if t not in bars]
+    for ticker in tickers:
+        if ticker in bars:
+            start = (bars[ticker].index[-1] - pd.Timedelta(days=REFRESH_OVERLAP_DAYS)).strftime("%Y-%m-%d")
+            starts.setdefault(start, []).append(ticker)
+    for start, group in starts.items():
+        with span("scanner.incremental", tickers=len(group), start=start):
+            fresh = download_histories(group, period=None, interval="1d", auto_adjust=True, start=start)
+        for ticker in group:
+            df = fresh.get(ticker)
+            if df is None or df.empty:
+                continue
+            merged = _merge_bars(bars[ticker], df[[c for c in PRICE_FIELDS if c in df.columns]])
+            if merged is None:
+                full.append(ticker)
+            else:
+                bars[ticker] = merged
+    if full:
+        with span("scanner.full", tickers=len(full)):
+            fresh = download_histories(full, period=HISTORY_PERIOD, interval="1d", auto_adjust=True)
+        for ticker, df in fresh.items():
+            if all(c in df.columns for c in PRICE_FIELDS):
+                bars[ticker] = df[PRICE_FIELDS]
+    return len(full)
+
+def scan_signals(bars, tickers, strategy=None, sma_window=200):
+    """
+    Latest signal, strength, close and Bollinger position for every ticker, computed on
+    one panel per calendar group. Tickers without a complete indicator row are left out.
+    """
+    strategy = strategy or signal_rules.DEFAULT_COMPILED
+    rows = []
+    for group in calendar_groups(bars, tickers):
+        panel = build_panel({t: bars[t] for t in group})
+        ind = stock_analysis.compute_panel_indicators(panel, sma_window)
+        codes, strength = signal_rules.evaluate_panel(strategy, ind)
+        valid = ind["trend"] >= 0
+        has_row = valid.any(axis=0)
+        last = len(ind["dates"]) - 1 - np.argmax(valid[::-1], axis=0)
+        columns = np.arange(len(group))
+        fields = ind["fields"]
+        close = ind["values"][fields.index("Close"), last, columns]
+        band = np.where(close > ind["values"][fields.index("BB_High"), last, columns], 1,
+                        np.where(close < ind["values"][fields.index("BB_Low"), last, columns], -1, 0))
+        for j, ticker in enumerate(group):
+            if has_row[j]:
+                rows.append({
+                    "ticker": ticker,
+                    "bar_date": ind["dates"][last[j]].strftime("%Y-%m-%d"),
+                    "signal": SIGNAL_LABELS[codes[last[j], j]],
+                    "strength": int(strength[last[j], j]),
+                    "close": float(close[j]),
+                    "band": int(band[j]),
+                })
+    return pd.DataFrame(rows, columns=["ticker", "bar_date", "signal", "strength", "close", "band"]).set_index("ticker")
+
+def upcoming_ex_dividends(tickers, days=EX_DIVIDEND_DAYS, today=None):
+    """{ticker: 'YYYY-MM-DD'} for tickers whose next ex-dividend date is within days."""
+    today = today or datetime.date.today()
+    upcoming = {}
+    for ticker in tickers:
+        try:
+            ts = fetch_info(ticker).get("exDividendDate")
+        except Exception:
+            continue
+        if isinstance(ts, (int, float)) and ts > 0:
+            ex_date = datetime.datetime.fromtimestamp(ts, datetime.timezone.utc).date()
+            if 0 <= (ex_date - today).days <= days:
+                upcoming[ticker] = ex_date.isoformat()
+    return upcoming
+
+def detect_transitions(conn, current, ex_dividends):
+    """
+    Compare the scan with the stored state, store the new state and return the alerts.
+    A ticker seen for the first time only records its state, so a fresh database does not
+    alert on the whole universe.
+    """
+    previous = {row[0]: row[1:] for row in conn.execute("SELECT ticker, signal, band, ex_dividend FROM signal_state")}
+    now = datetime.datetime.now().isoformat(timespec="seconds")
+    alerts, updates = [], []
+    for ticker, row in current.iterrows():
+        prev_signal, prev_band, prev_ex = previous.get(ticker, (None, None, None))
+        ex_date = ex_dividends.get(ticker, prev_ex)
+        if ticker in previous:
+            if row["signal"] != prev_signal:
+                alerts.append({"created": now, "ticker": ticker, "kind": "signal", "previous": prev_signal,
+                               "current": row["signal"], "detail": f"strength {row['strength']} on {row['bar_date']}"})
+            if row["band"] != prev_band and row["band"] != 0:
+                alerts.append({"created": now, "ticker": ticker, "kind": "bollinger", "previous": BAND_LABELS.get(prev_band),
+                               "current": BAND_LABELS[row["band"]], "detail": f"close {row['close']:.2f} on {row['bar_date']}"})
+        if ticker in ex_dividends and ex_dividends[ticker] != prev_ex:
+            alerts.append({"created": now, "ticker": ticker, "kind": "ex_dividend", "previous": prev_ex,
+                           "current": ex_dividends[ticker], "detail": f"goes ex-dividend on {ex_dividends[ticker]}"})
+        updates.append((ticker, row["bar_date"], row["signal"], int(row["strength"]), int(row["band"]), ex_date))
+    conn.executemany("INSERT OR REPLACE INTO signal_state VALUES (?, ?, ?, ?, ?, ?)", updates)
+    conn.commit()
+    return alerts
+
+def write_log(alerts, path=ALERT_LOG):
+    with open(path, "a", encoding="utf-8") as f:
+        for a in alerts:
+            f.write(f"{a['created']}\t{a['ticker']}\t{a['kind']}\t{a['previous']} -> {a['current']}\t{a['detail']}\n")
+
+def write_sqlite(alerts, conn):
+    conn.executemany(
+        "INSERT INTO alerts (created, ticker, kind, previous, current, detail) VALUES (:created, :ticker, :kind, :previous, :current, :detail)",
+        alerts,
+    )
+    conn.commit()
+
+def post_webhook(alerts, url, timeout=WEBHOOK_TIMEOUT):
+    """POST the batch as JSON; a failing endpoint is reported but never stops the scanner."""
+    request = urllib.request.Request(url, data=json.dumps({"alerts": alerts}).encode(), headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            response.read()
+    except OSError as e:
+        print(f"Webhook delivery to {url} failed: {e}", file=sys.stderr)
+
+def emit_alerts(alerts, sinks, conn, log_path=ALERT_LOG, webhook_url=None):
+    if not alerts:
+        return
+    if "log" in sinks:
+        write_log(alerts, log_path)
+    if "sqlite" in sinks:
+        write_sqlite(alerts, conn)
+    if "webhook" in sinks and webhook_url:
+        post_webhook(alerts, webhook_url)
+
+def scan_once(conn, bars, tickers, dividend_tickers, strategy=None, sma_window=200, ex_dividend_days=EX_DIVIDEND_DAYS):
+    """One pass: refresh bars, evaluate every ticker, return (alerts, stats)."""
+    trace = tracing.start_trace("alert_scanner")
+    started = time.perf_counter()
+    try:
+        refetched = update_bars(bars, tickers)
+        current = scan_signals(bars, tickers, strategy, sma_window)
+        ex_dividends = upcoming_ex_dividends(dividend_tickers, ex_dividend_days) if ex_dividend_days >= 0 else {}
+        with span("scanner.transitions", tickers=len(current)):
+            alerts = detect_transitions(conn, current, ex_dividends)
+    finally:
+        tracing.finish_trace(trace)
+    stats = {"tickers": len(tickers), "scanned": len(current), "refetched": refetched, "alerts": len(alerts),
+             "seconds": round(time.perf_counter() - started, 2)}
+    return alerts, stats
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Headless scanner that reports signal, Bollinger band and ex-dividend transitions.")
+    parser.add_argument("--universe", help="CSV of extra tickers ('ticker' column) scanned alongside the watchlists.")
+    parser.add_argument("--strategy", help="Strategy file (.yaml/.json) to evaluate instead of the default swing rules.")
+    parser.add_argument("--sma-window", type=int, default=200)
+    parser.add_argument("--ex-dividend-days", type=int, default=EX_DIVIDEND_DAYS, help="Alert when a dividend-watchlist ticker goes ex within this many days (-1 disables).")
+    parser.add_argument("--sink", action="append", choices=SINKS, help="Where alerts go; repeatable (default: log and sqlite).")
+    parser.add_argument("--webhook-url")
+    parser.add_argument("--db", default=ALERT_DB)
+    parser.add_argument("--log", default=ALERT_LOG)
+    parser.add_argument("--bars", default=BAR_STORE)
+    parser.add_argument("--interval", type=int, default=SCAN_INTERVAL, help="Seconds between scans.")
+    parser.add_argument("--once", action="store_true", help="Run a single scan and exit.")
+    args = parser.parse_args(argv)
+    sinks = args.sink or ["log", "sqlite"]
+    if "webhook" in sinks and not args.webhook_url:
+        parser.error("--sink webhook needs --webhook-url")
+
+    strategy = signal_rules.load_strategy(args.strategy) if args.strategy else None
+    conn = open_state(args.db)
+    bars = load_bars(args.bars)
+    while True:
+        tickers, dividend_tickers = load_universe(args.universe)
+        alerts, stats = scan_once(conn, bars, tickers, dividend_tickers, strategy, args.sma_window, args.ex_dividend_days)
+        save_bars(bars, args.bars)
+        emit_alerts(alerts, sinks, conn, args.log, args.webhook_url)
+        print(f"{datetime.datetime.now():%Y-%m-%d %H:%M:%S} scanned {stats['scanned']}/{stats['tickers']} tickers "
+              f"({stats['refetched']} full downloads) in {stats['seconds']}s, {stats['alerts']} alerts", flush=True)
+        for a in alerts:
+            print(f"  {a['ticker']:<10} {a['kind']:<12} {a['previous']} -> {a['current']}  {a['detail']}", flush=True)
+        if args.once:
+            return 0
+        time.sleep(max(0.0, args.interval - stats["seconds"]))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,389 @@
+import io
+import os
+import sys
+import json
+import asyncio
+import argparse
+import random
+import datetime
+from urllib.parse import parse_qs
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import shared_cache
+import tracing
+from tracing import span, run_in_trace
+import stock_analysis
+import long_term_investments
+import dividend_tracker
+import price_store
+import portfolio_risk
+import fundamentals
+import signal_rules
+import candlestick_patterns
+import fx_rates
+import provider_health
+
+# A plain ASGI application (no web framework): serve it with any ASGI server, e.g.
+#   uvicorn api_server:app --workers 4
+# or `python api_server.py`, which starts uvicorn if it is installed.
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8000
+MAX_TICKERS = 500
+MAX_BODY_BYTES = 1 << 20
+API_WORKERS = 32
+API_CACHE_TTL = 60
+ARROW_BATCH_ROWS = 5000
+# Fraction of requests whose trace is exported when CAPRIANI_TRACE_EXPORT is on. Off by default: at API
+# request rates one export per request would serialise on the file and grow it without limit.
+API_TRACE_SAMPLE = float(os.environ.get("CAPRIANI_API_TRACE_SAMPLE", "0"))
+CONTENT_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+    "arrow": "application/vnd.apache.arrow.stream",
+}
+# Query/body parameters that are numbers, with their allowed range.
+NUMERIC_PARAMS = {"rows": (1, 5000), "sma_window": (2, 400), "years": (1, 50)}
+# Parameters with a fixed set of values: yfinance periods and the currencies prices convert to.
+CHOICE_PARAMS = {"period": price_store.PERIOD_ORDER, "base": list(fx_rates.CURRENCY_SYMBOLS)}
+INDICATOR_FIELDS = ["Open", "High", "Low", "Close", "Volume", "EMA20", "RSI14", "MACD_Line", "MACD_Signal", "BB_High", "BB_Low", "Volume_SMA", "Trend", *candlestick_patterns.PATTERNS]
+
+_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api")
+# Per-ticker lookups inside batched handlers. A pool of its own, since a handler blocked on
+# _executor's workers could wait forever once every worker is such a handler.
+_lookup_executor = ThreadPoolExecutor(max_workers=API_WORKERS, thread_name_prefix="api-lookup")
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def _validate(params):
+    """Cast and range-check the numeric and choice parameters before any work (or streaming) starts."""
+    for name, (low, high) in NUMERIC_PARAMS.items():
+        if name not in params:
+            continue
+        try:
+            params[name] = int(params[name])
+        except (TypeError, ValueError):
+            raise ApiError(400, f"Invalid value for '{name}': {params[name]!r}")
+        if not low <= params[name] <= high:
+            raise ApiError(400, f"{name} must be between {low} and {high}")
+    for name, choices in CHOICE_PARAMS.items():
+        if name in params and params[name] not in choices:
+            raise ApiError(400, f"Invalid value for '{name}': {params[name]!r}; use one of {', '.join(choices)}")
+    return params
+
+def _tickers(params):
+    tickers = params.get("tickers") or params.get("ticker") or []
+    if isinstance(tickers, str):
+        tickers = tickers.split(",")
+    tickers = list(dict.fromkeys(str(t).strip().upper() for t in tickers if str(t).strip()))
+    if not tickers:
+        raise ApiError(400, "Pass one or more tickers, e.g. ?tickers=AAPL,MSFT")
+    if len(tickers) > MAX_TICKERS:
+        raise ApiError(413, f"At most {MAX_TICKERS} tickers per request")
+    return tickers
+
+def _strategy(params):
+    name = params.get("strategy")
+    if not name:
+        return signal_rules.DEFAULT_COMPILED
+    strategies, _ = shared_cache.get_or_fetch(("api_strategies",), signal_rules.available_strategies, API_CACHE_TTL)
+    if name not in strategies:
+        raise ApiError(400, f"Unknown strategy '{name}'; available: {', '.join(strategies)}")
+    return strategies[name]
+
+def _jsonable(value):
+    if value is None or isinstance(value, (str, bool)):
+        return value
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (np.integer, int)):
+        return int(value)
+    if isinstance(value, np.float32):
+        # The shortest decimal that round-trips the stored float32 (123.46, not 123.45999908).
+        return None if np.isnan(value) else float(str(value))
+    if isinstance(value, (np.floating, float)):
+        return None if np.isnan(value) else float(value)
+    if isinstance(value, (pd.Timestamp, datetime.date)):
+        return value.date().isoformat() if isinstance(value, pd.Timestamp) else value.isoformat()
+    return str(value)
+
+def _clean(record):
+    return {k: _jsonable(v) for k, v in record.items()}
+
+# Per-ticker computations. Each returns a list of flat records; they read through the same
+# process caches as the Streamlit pages, so the API and the UI share every download.
+
+def indicator_records(ticker, params):
+    df = stock_analysis.fetch_indicator_frame(ticker, params.get("period", "2y"), params.get("sma_window", 200))
+    if df is None:
+        raise LookupError("no price history")
+    df = df.tail(params.get("rows", 1))
+    # Column arrays rather than to_dict, which widens float32 to float64 and loses the dtype.
+    columns = {c: df[c].to_numpy() for c in df.columns if c in INDICATOR_FIELDS or c.startswith("SMA")}
+    return [{"ticker": ticker, "date": date, **{f: values[i] for f, values in columns.items()}} for i, date in enumerate(df.index)]
+
+def signal_records(ticker, params):
+    df = stock_analysis.fetch_indicator_frame(ticker, "2y", params.get("sma_window", 200))
+    if df is None:
+        raise LookupError("no price history")
+    signals = signal_rules.evaluate_frame(params["_strategy"], df.tail(params.get("rows", 1)))
+    return [{"ticker": ticker, "date": date, "close": close, "signal": str(signal), "strength": strength}
+            for date, close, signal, strength in zip(signals.index, df["Close"].to_numpy()[-len(signals):], signals["Signal"], signals["Strength"])]
+
+def upcoming_dividend_records(ticker, params):
+    company, ex_div, pay_date = dividend_tracker.fetch_dividend_info(ticker)
+    return [{"ticker": ticker, "company": company, "ex_dividend_date": ex_div, "pay_date": pay_date}]
+
+def dividend_records(ticker, params):
+    events = price_store.dividends(ticker, params.get("period", price_store.STORE_PERIOD))
+    currency = fx_rates.ticker_currency(ticker)
+    return [{"ticker": ticker, "ex_date": date, "amount": amount, "currency": currency} for date, amount in events.items()]
+
+def _parallel(func, tickers):
+    """{ticker: func(ticker)} with the per-ticker lookups (mostly cached .info) run concurrently."""
+    futures = [(t, _lookup_executor.submit(run_in_trace(func), t)) for t in tickers]
+    return {t: f.result() for t, f in futures}
+
+def _batch_cagr(tickers, params):
+    """{ticker: CAGR fraction} from one batched close matrix (converted to the base currency)."""
+    period, base = params.get("period", "5y"), params.get("base", fx_rates.BASE_CURRENCY)
+    currencies = _parallel(fx_rates.ticker_currency, tickers)
+    closes = portfolio_risk.load_close_matrix(tickers, period, base, currencies)
+    return (fundamentals.historical_cagr(closes) / 100).to_dict() if not closes.empty else {}
+
+def cagr_records(tickers, params):
+    cagr = _batch_cagr(tickers, params)
+    period, base = params.get("period", "5y"), params.get("base", fx_rates.BASE_CURRENCY)
+    return {t: [{"ticker": t, "period": period, "currency": base, "cagr_pct": cagr[t] * 100}] if t in cagr and not np.isnan(cagr[t]) else LookupError("no price history")
+            for t in tickers}
+
+def projection_records(tickers, params):
+    years = params.get("years", 10)
+    cagr = _batch_cagr(tickers, {**params, "base": fx_rates.BASE_CURRENCY})
+    prices = _parallel(lambda t: long_term_investments.price_in_base(long_term_investments.get_current_price_and_currency(t)[0], fx_rates.ticker_currency(t)), tickers)
+    out = {}
+    for ticker in tickers:
+        growth, base_price = cagr.get(ticker, np.nan), prices[ticker]
+        if base_price is None or np.isnan(growth):
+            out[ticker] = LookupError("no price or CAGR")
+            continue
+        table = long_term_investments.project_future_price(base_price, years, growth)
+        out[ticker] = [{"ticker": ticker, "year": year, "projected_price": value, "currency": fx_rates.BASE_CURRENCY, "cagr_pct": growth * 100}
+                       for year, value in zip(table["Year"], table["Projected Price"])]
+    return out
+
+# path -> (handler, batched). Per-ticker handlers run concurrently on the thread pool and can
+# stream as each ticker finishes; batched handlers take the whole list (one download batch).
+ROUTES = {
+    "/indicators": (indicator_records, False),
+    "/signals": (signal_records, False),
+    "/cagr": (cagr_records, True),
+    "/projections": (projection_records, True),
+    "/dividends": (dividend_records, False),
+    "/dividends/upcoming": (upcoming_dividend_records, False),
+}
+
+def _error_record(ticker, error):
+    return {"ticker": ticker, "error": f"{type(error).__name__}: {error}" if not isinstance(error, LookupError) else str(error)}
+
+def _safe(handler, ticker, params):
+    try:
+        return handler(ticker, params)
+    except ApiError:
+        raise
+    except Exception as e:
+        return e
+
+async def _results(handler, batched, tickers, params):
+    """Yield (ticker, records or exception) in request order as soon as each is ready."""
+    loop = asyncio.get_running_loop()
+    if batched:
+        results = await loop.run_in_executor(_executor, run_in_trace(handler), tickers, params)
+        for ticker in tickers:
+            yield ticker, results[ticker]
+        return
+    futures = [loop.run_in_executor(_executor, run_in_trace(_safe), handler, t, params) for t in tickers]
+    for ticker, future in zip(tickers, futures):
+        yield ticker, await future
+
+def _arrow_bytes(records):
+    """Arrow IPC stream of the records, written in ARROW_BATCH_ROWS record batches."""
+    try:
+        import pyarrow as pa
+    except ImportError as e:
+        raise ApiError(406, "pyarrow is required for Arrow output: pip install pyarrow") from e
+    table = pa.Table.from_pandas(pd.DataFrame(records), preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        for batch in table.to_batches(max_chunksize=ARROW_BATCH_ROWS):
+            writer.write_batch(batch)
+    return sink.getvalue()
+
+def _response_format(params, headers):
+    fmt = params.get("format")
+    if not fmt:
+        accept = headers.get("accept", "")
+        fmt = next((name for name, content_type in CONTENT_TYPES.items() if content_type in accept), "json")
+    if fmt not in CONTENT_TYPES:
+        raise ApiError(406, f"format must be one of {', '.join(CONTENT_TYPES)}")
+    return fmt
+
+async def _read_params(scope, receive):
+    params = {k: v[-1] for k, v in parse_qs(scope.get("query_string", b"").decode()).items()}
+    if scope["method"] == "POST":
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if len(body) > MAX_BODY_BYTES:
+                raise ApiError(413, "Request body too large")
+            if not message.get("more_body"):
+                break
+        if body:
+            try:
+                payload = json.loads(body)
+            except ValueError:
+                raise ApiError(400, "Body must be JSON, e.g. {\"tickers\": [\"AAPL\", \"MSFT\"]}")
+            if not isinstance(payload, dict):
+                raise ApiError(400, "Body must be a JSON object")
+            params.update(payload)
+    return _validate(params)
+
+async def _send(send, status, content_type, body, cache="miss", extra_headers=()):
+    await send({"type": "http.response.start", "status": status, "headers": [
+        (b"content-type", content_type.encode()), (b"content-length", str(len(body)).encode()),
+        (b"cache-control", f"max-age={API_CACHE_TTL}".encode()), (b"x-cache", cache.encode()), *extra_headers,
+    ]})
+    await send({"type": "http.response.body", "body": body})
+
+async def _send_error(send, status, message):
+    await _send(send, status, CONTENT_TYPES["json"], json.dumps({"error": message}).encode(), "none")
+
+def _cache_key(path, params, fmt):
+    public = sorted((k, json.dumps(v, sort_keys=True, default=str)) for k, v in params.items() if not k.startswith("_") and k != "format")
+    return ("api", path, fmt, tuple(public))
+
+async def _start_stream(send, fmt):
+    await send({"type": "http.response.start", "status": 200, "headers": [
+        (b"content-type", CONTENT_TYPES[fmt].encode()), (b"cache-control", f"max-age={API_CACHE_TTL}".encode()), (b"x-cache", b"miss"),
+    ]})
+
+async def _serve(path, params, fmt, send):
+    """
+    Compute and send one response. Whole responses are cached for API_CACHE_TTL so repeated
+    requests are a dictionary lookup. NDJSON and JSON are streamed a ticker at a time while
+    they are built; Arrow is sent whole, since its per-ticker errors travel in a header that
+    has to go out before the body.
+    """
+    key = _cache_key(path, params, fmt)
+    cached = shared_cache.peek(key)
+    if cached is not None:
+        await _send(send, 200, CONTENT_TYPES[fmt], cached, "hit")
+        return
+    handler, batched = ROUTES[path]
+    tickers = _tickers(params)
+    if path == "/signals":
+        params["_strategy"] = _strategy(params)
+
+    if fmt == "ndjson":
+        await _start_stream(send, fmt)
+        chunks = []
+        async for ticker, result in _results(handler, batched, tickers, params):
+            records = [_error_record(ticker, result)] if isinstance(result, Exception) else result
+            chunk = "".join(json.dumps(_clean(r)) + "\n" for r in records).encode()
+            chunks.append(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+        shared_cache.put(key, b"".join(chunks), API_CACHE_TTL)
+        return
+
+    if fmt == "json":
+        # {"data": [...], "errors": {...}}, with each ticker's records sent as soon as they are ready.
+        await _start_stream(send, fmt)
+        chunks, errors, separator = [b'{"data": ['], {}, ""
+        await send({"type": "http.response.body", "body": chunks[0], "more_body": True})
+        async for ticker, result in _results(handler, batched, tickers, params):
+            if isinstance(result, Exception):
+                errors[ticker] = _error_record(ticker, result)["error"]
+                continue
+            if not result:
+                continue
+            chunk = (separator + ", ".join(json.dumps(_clean(r)) for r in result)).encode()
+            separator = ", "
+            chunks.append(chunk)
+            await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        chunks.append(f'], "errors": {json.dumps(errors)}}}'.encode())
+        await send({"type": "http.response.body", "body": chunks[-1]})
+        shared_cache.put(key, b"".join(chunks), API_CACHE_TTL)
+        return
+
+    data, errors = [], {}
+    async for ticker, result in _results(handler, batched, tickers, params):
+        if isinstance(result, Exception):
+            errors[ticker] = _error_record(ticker, result)["error"]
+        else:
+            data.extend(_clean(r) for r in result)
+    # Arrow carries one schema, so per-ticker failures travel in a header instead.
+    body = await asyncio.get_running_loop().run_in_executor(_executor, _arrow_bytes, data) if data else b""
+    extra = [(b"x-ticker-errors", ",".join(errors).encode())] if errors else []
+    if not errors:
+        shared_cache.put(key, body, API_CACHE_TTL)
+    await _send(send, 200, CONTENT_TYPES[fmt], body, extra_headers=extra)
+
+async def app(scope, receive, send):
+    """The ASGI entry point."""
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                _executor.shutdown(wait=False)
+                _lookup_executor.shutdown(wait=False)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] != "http":
+        return
+    path = scope["path"].rstrip("/") or "/"
+    if path == "/health":
+        await _send(send, 200, CONTENT_TYPES["json"], json.dumps({"status": "ok", "endpoints": sorted(ROUTES), "provider": provider_health.breaker_state()["state"], "failing": provider_health.health_table().to_dict("records")}, default=str).encode(), "none")
+        return
+    if path not in ROUTES:
+        await _send_error(send, 404, f"Unknown endpoint {path}; available: {', '.join(sorted(ROUTES))}")
+        return
+    if scope["method"] not in ("GET", "POST"):
+        await _send_error(send, 405, "Use GET or POST")
+        return
+
+    trace = tracing.start_trace(f"api:{path}")
+    try:
+        with span("api.request", path=path, method=scope["method"]) as attrs:
+            params = await _read_params(scope, receive)
+            headers = {k.decode().lower(): v.decode() for k, v in scope.get("headers", [])}
+            fmt = _response_format(params, headers)
+            attrs["format"] = fmt
+            await _serve(path, params, fmt, send)
+    except ApiError as e:
+        await _send_error(send, e.status, str(e))
+    finally:
+        tracing.finish_trace(trace, tracing.TRACE_EXPORT_JSONL if random.random() < API_TRACE_SAMPLE else None)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the analytics engine over HTTP (ASGI).")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--workers", type=int, default=1, help="Server processes (each keeps its own cache unless CAPRIANI_CACHE_DIR is set).")
+    args = parser.parse_args(argv)
+    try:
+        import uvicorn
+    except ImportError:
+        print("uvicorn is required to run the server: pip install uvicorn (or point any ASGI server at api_server:app)", file=sys.stderr)
+        return 1
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers, log_level="info")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,259 @@
+import os
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+from contextlib import contextmanager
+import pandas as pd
+import numpy as np
+import yfinance as yf
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+
+import stock_analysis
+import top_25_stocks
+import long_term_investments
+import shared_cache
+import alert_scanner
+import relative_strength
+import event_study
+from compact_store import build_panel
+
+BASELINE_JSON = "benchmark_baseline.json"
+TICKER_COUNTS = [1, 50, 500, 5000]
+YEAR_SPANS = [2, 5, 10, 20]
+TRADING_DAYS = 252
+# Seed and name of the stand-in benchmark series, kept clear of the universe's SYN seeds.
+BENCHMARK_SEED = 10 ** 9
+BENCHMARK_TICKER = "SYNBENCH"
+PERIOD_DAYS = {"1d": 1, "5d": 5, "1mo": 21, "3mo": 63, "6mo": 126, "1y": 252, "2y": 504, "5y": 1260, "10y": 2520}
+
+def synthetic_ohlcv(years, seed):
+    """Geometric random walk with a plausible OHLCV shape, one row per business day."""
+    rng = np.random.default_rng(seed)
+    n = int(years * TRADING_DAYS)
+    index = pd.bdate_range(end="2025-02-28", periods=n)
+    returns = rng.normal(0.0004, 0.018, n)
+    close = 100 * np.exp(np.cumsum(returns))
+    open_ = close * (1 + rng.normal(0, 0.004, n))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.006, n)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.006, n)))
+    volume = rng.lognormal(15, 0.5, n).round()
+    return pd.DataFrame({"Open": open_, "High": high, "Low": low, "Close": close, "Volume": volume}, index=index)
+
+def load_recorded_ohlcv(data_dir):
+    """Load recorded <TICKER>.csv files (Date index + OHLCV columns) from data_dir."""
+    frames = []
+    for name in sorted(os.listdir(data_dir)):
+        if name.endswith(".csv"):
+            frames.append(pd.read_csv(os.path.join(data_dir, name), index_col=0, parse_dates=True))
+    return frames
+
+def build_universe(n_tickers, years, recorded=None):
+    universe = {}
+    for i in range(n_tickers):
+        if recorded:
+            df = recorded[i % len(recorded)]
+            df = df.iloc[-int(years * TRADING_DAYS):]
+        else:
+            df = synthetic_ohlcv(years, seed=i)
+        universe[f"SYN{i:05d}"] = df
+    return universe
+
+@contextmanager
+def offline_yfinance(universe):
+    """Serve yf.download and yf.Ticker(...).info from the in-memory universe instead of Yahoo."""
+    calls = {"download": 0}
+    real_download, real_ticker = yf.download, yf.Ticker
+
+    def window(df, period, start):
+        if start is not None:
+            return df[df.index >= pd.Timestamp(start)]
+        return df.iloc[-PERIOD_DAYS.get(period, len(df)):]
+
+    def lookup(ticker):
+        df = universe.get(ticker)
+        if df is None and ticker.endswith("=X") and universe:
+            # A flat FX rate, so currency conversion costs the same as with live pairs.
+            df = pd.DataFrame({"Open": 0.8, "High": 0.8, "Low": 0.8, "Close": 0.8, "Volume": 0.0}, index=next(iter(universe.values())).index)
+        return df
+
+    def fake_download(ticker, period="1mo", start=None, **kwargs):
+        calls["download"] += 1
+        if isinstance(ticker, (list, tuple)):
+            frames = {t: window(lookup(t), period, start) for t in ticker if lookup(t) is not None}
+            return pd.concat(frames, axis=1) if frames else pd.DataFrame()
+        df = lookup(ticker)
+        if df is None:
+            return pd.DataFrame()
+        return window(df, period, start).copy()
+
+    class FakeTicker:
+        def __init__(self, ticker):
+            self.info = {"shortName": ticker, "currency": "USD", "forwardPE": 20.0, "trailingPE": 25.0, "marketCap": 1e10}
+
+    yf.download, yf.Ticker = fake_download, FakeTicker
+    shared_cache.invalidate()
+    try:
+        yield calls
+    finally:
+        yf.download, yf.Ticker = real_download, real_ticker
+        shared_cache.invalidate()
+
+def bench_compute_indicators(universe):
+    for df in universe.values():
+        stock_analysis.compute_indicators(df.copy())
+
+def bench_generate_signal(universe):
+    for df in universe.values():
+        df_ind = stock_analysis.compute_indicators(df.copy())
+        if df_ind is not None:
+            stock_analysis.generate_signal_and_strength(df_ind.iloc[-1])
+
+def bench_top_25_screening(universe):
+    with offline_yfinance(universe):
+        top_25_stocks.fetch_top_25_stocks(list(universe))
+
+def bench_project_future_price(universe):
+    for df in universe.values():
+        long_term_investments.project_future_price(float(df["Close"].iloc[-1]), 25, 0.08)
+
+def bench_cagr(universe):
+    with offline_yfinance(universe):
+        for ticker in universe:
+            long_term_investments.compute_historical_cagr(ticker)
+
+def bench_plot_full_analysis(universe):
+    for ticker, df in universe.items():
+        df_ind = stock_analysis.compute_indicators(df.copy())
+        if df_ind is not None:
+            fig = stock_analysis.build_full_analysis_figure(ticker, df_ind)
+            fig.canvas.draw()
+            plt.close(fig)
+
+def bench_alert_scan(universe):
+    with offline_yfinance(universe):
+        tickers = list(universe)
+        bars = {}
+        alert_scanner.update_bars(bars, tickers)
+        alert_scanner.scan_signals(bars, tickers)
+
+def synthetic_benchmark(universe):
+    """A separate random walk over the universe's longest history, so every ticker stays in the case."""
+    days = max(len(df) for df in universe.values())
+    return synthetic_ohlcv(days / TRADING_DAYS, seed=BENCHMARK_SEED)["Close"]
+
+def bench_relative_strength(universe):
+    # Sector ETFs are left out (no sectors known offline).
+    closes = pd.DataFrame({t: df["Close"] for t, df in universe.items()})
+    closes[BENCHMARK_TICKER] = synthetic_benchmark(universe)
+    relative_strength.rank_universe(closes, list(universe), BENCHMARK_TICKER)
+
+def bench_event_study(universe):
+    # Offline stores carry no dividends, so the events are every signal change plus quarterly pseudo ex-dates.
+    panels = [build_panel(universe)]
+    signals = event_study.signal_events(panels)
+    quarterly = pd.DataFrame([(t, d) for t in universe for d in panels[0]["dates"][::63]], columns=["ticker", "date"])
+    event_study.run_event_study(panels, pd.concat([signals, quarterly], ignore_index=True), synthetic_benchmark(universe))
+
+BENCHMARKS = {
+    "compute_indicators": bench_compute_indicators,
+    "generate_signal_and_strength": bench_generate_signal,
+    "fetch_top_25_stocks": bench_top_25_screening,
+    "project_future_price": bench_project_future_price,
+    "compute_historical_cagr": bench_cagr,
+    "plot_full_analysis": bench_plot_full_analysis,
+    "alert_scan": bench_alert_scan,
+    "relative_strength": bench_relative_strength,
+    "event_study": bench_event_study,
+}
+
+def run_case(name, universe, measure_memory=True):
+    func = BENCHMARKS[name]
+    start = time.perf_counter()
+    func(universe)
+    elapsed = time.perf_counter() - start
+    peak_mb = None
+    if measure_memory:
+        tracemalloc.start()
+        func(universe)
+        peak_mb = tracemalloc.get_traced_memory()[1] / 1e6
+        tracemalloc.stop()
+    return {
+        "benchmark": name,
+        "tickers": len(universe),
+        "seconds": round(elapsed, 4),
+        "ms_per_ticker": round(elapsed * 1000 / len(universe), 4),
+        "peak_mb": round(peak_mb, 2) if peak_mb is not None else None,
+    }
+
+def case_key(result):
+    return f"{result['benchmark']}|{result['tickers']}|{result['years']}"
+
+def load_baseline(path=BASELINE_JSON):
+    if os.path.exists(path):
+        with open(path) as f:
+            return {case_key(r): r for r in json.load(f)}
+    return {}
+
+def save_baseline(results, path=BASELINE_JSON):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2)
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Annotate each result with its change against the baseline; return the regressed ones."""
+    regressions = []
+    for result in results:
+        base = baseline.get(case_key(result))
+        if not base:
+            result["vs_baseline"] = "new"
+            continue
+        change = result["ms_per_ticker"] / base["ms_per_ticker"] - 1 if base["ms_per_ticker"] else 0.0
+        result["vs_baseline"] = f"{change * 100:+.1f}%"
+        if change > tolerance:
+            regressions.append(result)
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the analytics hot paths.")
+    parser.add_argument("--tickers", type=int, nargs="+", default=TICKER_COUNTS)
+    parser.add_argument("--years", type=float, nargs="+", default=YEAR_SPANS)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--max-chart-tickers", type=int, default=10, help="Chart rendering is sampled down to this many tickers.")
+    parser.add_argument("--data-dir", help="Directory of recorded <TICKER>.csv OHLCV files to use instead of synthetic data.")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the tracemalloc pass used for peak memory.")
+    parser.add_argument("--baseline", default=BASELINE_JSON)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown per ticker before a case counts as a regression.")
+    args = parser.parse_args(argv)
+
+    recorded = load_recorded_ohlcv(args.data_dir) if args.data_dir else None
+    results = []
+    for years in args.years:
+        for n_tickers in args.tickers:
+            universe = build_universe(n_tickers, years, recorded)
+            for name in args.only:
+                case_universe = universe
+                if name == "plot_full_analysis" and n_tickers > args.max_chart_tickers:
+                    case_universe = dict(list(universe.items())[:args.max_chart_tickers])
+                result = run_case(name, case_universe, not args.no_memory)
+                result["tickers"] = n_tickers
+                result["years"] = years
+                results.append(result)
+                print(f"{name:<30} {n_tickers:>5} tickers x {years:>4}y  {result['ms_per_ticker']:>10.3f} ms/ticker  peak {result['peak_mb']} MB", flush=True)
+
+    if args.save_baseline:
+        save_baseline(results, args.baseline)
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    regressions = compare_to_baseline(results, load_baseline(args.baseline), args.tolerance)
+    print(pd.DataFrame(results).to_string(index=False))
+    for result in regressions:
+        print(f"REGRESSION: {result['benchmark']} at {result['tickers']} tickers x {result['years']}y is {result['vs_baseline']} per ticker")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+# Column names double as signal_rules names, so strategies can say "Hammer and RSI14 < 35".
+PATTERNS = ["Doji", "Hammer", "Bullish_Engulfing", "Bearish_Engulfing", "Morning_Star", "Evening_Star", "Inside_Bar", "Gap_Up", "Gap_Down"]
+BULLISH = {"Hammer", "Bullish_Engulfing", "Morning_Star", "Gap_Up"}
+BEARISH = {"Bearish_Engulfing", "Evening_Star", "Gap_Down"}
+OHLC = ("Open", "High", "Low", "Close")
+# Shapes, as fractions of the bar's high-low range (or of the body for shadows).
+DOJI_BODY = 0.1
+HAMMER_SHADOW = 2.0
+HAMMER_UPPER = 0.1
+STAR_BODY = 0.3
+LONG_BODY = 0.5
+# A hammer only counts after a decline: the previous close below the close this many bars before it.
+DECLINE_BARS = 5
+# Bars needed to judge the latest one: the hammer's decline plus the bar it is measured from.
+LOOKBACK = DECLINE_BARS + 2
+
+def _shift(x, n=1):
+    """x n bars earlier along axis 0 (time), NaN where there is no earlier bar."""
+    out = np.full_like(x, np.nan)
+    out[n:] = x[:-n]
+    return out
+
+def _parts(o, h, l, c):
+    body = np.abs(c - o)
+    span = h - l
+    upper = h - np.maximum(o, c)
+    lower = np.minimum(o, c) - l
+    return body, span, upper, lower
+
+def doji(o, h, l, c):
+    body, span, _, _ = _parts(o, h, l, c)
+    return (span > 0) & (body <= DOJI_BODY * span)
+
+def hammer(o, h, l, c):
+    body, span, upper, lower = _parts(o, h, l, c)
+    prior_close = _shift(c)
+    declined = prior_close < _shift(c, DECLINE_BARS + 1)
+    return (span > 0) & (lower >= HAMMER_SHADOW * np.maximum(body, DOJI_BODY * span)) & (upper <= HAMMER_UPPER * span) & declined
+
+def bullish_engulfing(o, h, l, c):
+    po, pc = _shift(o), _shift(c)
+    return (pc < po) & (c > o) & (o <= pc) & (c >= po) & (c - o > po - pc)
+
+def bearish_engulfing(o, h, l, c):
+    po, pc = _shift(o), _shift(c)
+    return (pc > po) & (c < o) & (o >= pc) & (c <= po) & (o - c > pc - po)
+
+def _star(o, h, l, c, bullish):
+    body, span, _, _ = _parts(o, h, l, c)
+    o2, c2, body2, span2 = _shift(o, 2), _shift(c, 2), _shift(body, 2), _shift(span, 2)
+    o1, c1, body1 = _shift(o), _shift(c), _shift(body)
+    first = (body2 >= LONG_BODY * span2) & ((c2 < o2) if bullish else (c2 > o2))
+    star = (body1 <= STAR_BODY * body2) & ((np.maximum(o1, c1) <= c2) if bullish else (np.minimum(o1, c1) >= c2))
+    midpoint = (o2 + c2) / 2
+    third = (c > o) & (c > midpoint) if bullish else (c < o) & (c < midpoint)
+    return first & star & third
+
+def morning_star(o, h, l, c):
+    return _star(o, h, l, c, True)
+
+def evening_star(o, h, l, c):
+    return _star(o, h, l, c, False)
+
+def inside_bar(o, h, l, c):
+    return (h < _shift(h)) & (l > _shift(l))
+
+def gap_up(o, h, l, c):
+    return l > _shift(h)
+
+def gap_down(o, h, l, c):
+    return h < _shift(l)
+
+PATTERN_FUNCTIONS = {
+    "Doji": doji, "Hammer": hammer, "Bullish_Engulfing": bullish_engulfing, "Bearish_Engulfing": bearish_engulfing,
+    "Morning_Star": morning_star, "Evening_Star": evening_star, "Inside_Bar": inside_bar, "Gap_Up": gap_up, "Gap_Down": gap_down,
+}
+
+def pattern_masks(open_, high, low, close, patterns=None):
+    """
+    {pattern: boolean mask} for every bar, from OHLC arrays with time on axis 0: one ticker
+    (dates,) or a whole universe (dates x tickers) in the same pass. Bars without enough
+    history (or with NaN prices) are False.
+    """
+    o, h, l, c = (np.asarray(x, dtype=np.float64) for x in (open_, high, low, close))
+    with np.errstate(invalid="ignore"):
+        return {name: PATTERN_FUNCTIONS[name](o, h, l, c) for name in (patterns or PATTERNS)}
+
+def add_pattern_columns(df):
+    """Add a boolean column per pattern to a price/indicator frame (in place) and return it."""
+    masks = pattern_masks(*(df[f].to_numpy() for f in OHLC))
+    for name, mask in masks.items():
+        df[name] = mask
+    return df
+
+def panel_pattern(panel, name):
+    """One pattern's (dates x tickers) mask for a compact_store panel (one calendar per panel)."""
+    fields = panel["fields"]
+    o, h, l, c = (panel["values"][fields.index(f)] for f in OHLC)
+    return pattern_masks(o, h, l, c, [name])[name]
+
+def describe(row):
+    """'Hammer, Gap Up' for the patterns set on one indicator row; '' when there are none."""
+    return ", ".join(name.replace("_", " ") for name in PATTERNS if name in row.index and bool(row[name]))
+
+def latest_bars(frames, bars=LOOKBACK):
+    """
+    The last bars of each ticker's own series stacked into (bars x tickers) OHLC arrays, so a
+    universe on different calendars is scanned as one array. Short histories are NaN-padded.
+    Returns (tickers, last dates, {'Open': ..., 'High': ..., 'Low': ..., 'Close': ...}).
+    """
+    tickers = [t for t, df in frames.items() if df is not None and not df.empty]
+    stacked = np.full((4, bars, len(tickers)), np.nan)
+    dates = []
+    for j, ticker in enumerate(tickers):
+        tail = frames[ticker].iloc[-bars:]
+        for i, field in enumerate(OHLC):
+            stacked[i, bars - len(tail):, j] = tail[field].to_numpy(dtype=np.float64)
+        dates.append(tail.index[-1])
+    return tickers, dates, dict(zip(OHLC, stacked))
+
+def patterns_today(frames, patterns=None):
+    """
+    One row per ticker: the date of its latest bar and a flag per pattern formed on that bar,
+    computed for the whole universe at once.
+    """
+    patterns = patterns or PATTERNS
+    tickers, dates, bars = latest_bars(frames)
+    masks = pattern_masks(bars["Open"], bars["High"], bars["Low"], bars["Close"], patterns)
+    df = pd.DataFrame({name: masks[name][-1] for name in patterns}, index=pd.Index(tickers, name="Ticker"))
+    df.insert(0, "Date", [pd.Timestamp(d).strftime("%Y-%m-%d") for d in dates])
+    return df
+
+def _bias(names):
+    bullish, bearish = bool(set(names) & BULLISH), bool(set(names) & BEARISH)
+    return "Mixed" if bullish and bearish else "Bullish" if bullish else "Bearish" if bearish else "Neutral"
+
+def screen_patterns(frames, patterns=None):
+    """Tickers whose latest bar formed any of patterns (all if None): date, pattern names and bias."""
+    patterns = patterns or PATTERNS
+    today = patterns_today(frames, patterns)
+    hits = today[today[patterns].any(axis=1)]
+    flags = hits[patterns].to_numpy()
+    names = [[name for name, hit in zip(patterns, row) if hit] for row in flags]
+    return pd.DataFrame({
+        "Date": hits["Date"],
+        "Patterns": [", ".join(n.replace("_", " ") for n in row) for row in names],
+        "Bias": [_bias(row) for row in names],
+    }, index=hits.index)
@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+
+TREND_LABELS = ["Downtrend", "Uptrend"]
+SIGNAL_LABELS = ["N/A", "🔴 STRONG SELL", "🚫 SELL", "⚖️ HOLD", "📈 STRONG HOLD", "💡 BUY", "🔥 STRONG BUY"]
+SIGNAL_CODES = {label: code for code, label in enumerate(SIGNAL_LABELS)}
+PRICE_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+def trend_categorical(uptrend_mask, index=None):
+    """Trend as a two-category column: one int8 code per row, still compares equal to 'Uptrend'/'Downtrend'."""
+    codes = np.asarray(uptrend_mask, dtype=np.int8)
+    return pd.Series(pd.Categorical.from_codes(codes, categories=TREND_LABELS), index=index)
+
+def compact_frame(df):
+    """
+    Downcast a price/indicator frame in place of the float64 + object layout:
+    float columns to float32, Trend to an int8-backed categorical.
+    """
+    if df is None:
+        return None
+    out = {}
+    for col in df.columns:
+        series = df[col]
+        if col == "Trend" and not isinstance(series.dtype, pd.CategoricalDtype):
+            out[col] = trend_categorical(series.to_numpy() == "Uptrend", df.index)
+        elif pd.api.types.is_float_dtype(series) or (col == "Volume" and pd.api.types.is_numeric_dtype(series)):
+            out[col] = series.astype(np.float32)
+        else:
+            out[col] = series
+    return pd.DataFrame(out, index=df.index)
+
+def calendar_groups(bars, tickers):
+    """Tickers grouped by identical date index, so each group packs into a gap-free panel."""
+    groups = {}
+    for ticker in tickers:
+        df = bars.get(ticker)
+        if df is not None and not df.empty:
+            groups.setdefault(df.index.asi8.tobytes(), []).append(ticker)
+    return list(groups.values())
+
+def build_panel(frames):
+    """
+    Pack {ticker: frame} into one panel with a shared date index:
+    a float32 array (fields x dates x tickers) plus an int8 trend array (dates x tickers, -1 where missing).
+    """
+    tickers = [t for t, df in frames.items() if df is not None and not df.empty]
+    if not tickers:
+        return {"dates": pd.DatetimeIndex([]), "tickers": [], "fields": [], "values": np.empty((0, 0, 0), dtype=np.float32), "trend": np.empty((0, 0), dtype=np.int8)}
+    dates = frames[tickers[0]].index
+    for t in tickers[1:]:
+        if not frames[t].index.equals(dates):
+            dates = dates.union(frames[t].index)
+    fields = [c for c in frames[tickers[0]].columns if c != "Trend" and pd.api.types.is_numeric_dtype(frames[tickers[0]][c])]
+    values = np.full((len(fields), len(dates), len(tickers)), np.nan, dtype=np.float32)
+    trend = np.full((len(dates), len(tickers)), -1, dtype=np.int8)
+    for j, t in enumerate(tickers):
+        df = frames[t]
+        rows = dates.get_indexer(df.index)
+        for i, field in enumerate(fields):
+            if field in df.columns:
+                values[i, rows, j] = df[field].to_numpy(dtype=np.float32)
+        if "Trend" in df.columns:
+            trend[rows, j] = (df["Trend"].to_numpy() == "Uptrend").astype(np.int8)
+    return {"dates": dates, "tickers": tickers, "fields": fields, "values": values, "trend": trend}
+
+def panel_field(panel, field):
+    """One field as a dates x tickers frame, e.g. panel_field(panel, 'Close') for return matrices."""
+    i = panel["fields"].index(field)
+    return pd.DataFrame(panel["values"][i], index=panel["dates"], columns=panel["tickers"])
\ No newline at end of file
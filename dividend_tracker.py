@@ -1,22 +1,18 @@
-import os
 import datetime
 import streamlit as st
 import pandas as pd
-import yfinance as yf
-
-DIVIDEND_CSV = "dividend_watchlist.csv"
-
-def load_dividend_watchlist():
-    """Load dividend watchlist from a local CSV if it exists, otherwise return an empty list."""
-    if os.path.exists(DIVIDEND_CSV):
-        df = pd.read_csv(DIVIDEND_CSV)
-        return df.to_dict("records")
-    return []
+from market_data import fetch_info
+from tracing import span
+import symbol_directory
+import relative_strength
+import event_study
+from watchlists import DIVIDEND_CSV, load_dividend_watchlist
 
 def save_dividend_watchlist(watchlist_list):
     """Save watchlist (list of dicts) to a local CSV file."""
     df = pd.DataFrame(watchlist_list)
-    df.to_csv(DIVIDEND_CSV, index=False)
+    with span("csv.write", path=DIVIDEND_CSV):
+        df.to_csv(DIVIDEND_CSV, index=False)
 
 def convert_timestamp_to_date(ts_value):
     """
@@ -36,8 +32,7 @@ def fetch_dividend_info(ticker):
     Returns (company_name, ex_div_date, pay_date) as strings.
     If ex_div or pay_date are numeric timestamps, we convert them.
     """
-    ticker_obj = yf.Ticker(ticker)
-    info = ticker_obj.info
+    info = fetch_info(ticker)
 
     # Company name fallback
     company_name = info.get("shortName") or info.get("longName") or ticker
@@ -67,7 +62,7 @@ def run():
 
     st.subheader("Manage Your Dividend Watchlist")
     # Add Ticker
-    new_ticker = st.text_input("Add a Ticker (e.g. 'AAPL')").upper().strip()
+    new_ticker = symbol_directory.ticker_input("Add a Ticker (e.g. 'AAPL')", key="dividend_add")
     if st.button("Add Ticker"):
         if new_ticker:
             existing = [item for item in st.session_state.dividend_watchlist if item["ticker"] == new_ticker]
@@ -125,3 +120,19 @@ def run():
     for many tickers. This data can be incomplete or missing.
     """)
 
+    st.write("---")
+    st.subheader("Price Behaviour Around Ex-Dividend Dates")
+    st.write("""
+    Average return of your watchlist, relative to a benchmark, from 10 trading days before each ex-dividend date to 20 after,
+    over every ex-date in five years of stored prices. Returns are dividend-adjusted, so day 0 shows what a holder earned
+    rather than the price drop by the dividend amount.
+    **Guidance:** A run-up before ex-dates that reverses afterwards means buying just to collect the dividend has not paid.
+    """)
+    benchmark = st.selectbox("Benchmark", options=list(relative_strength.BENCHMARKS.values()), key="dividend_event_benchmark")
+    if st.checkbox("Show ex-dividend event study"):
+        tickers = [item["ticker"] for item in updated_data]
+        with st.spinner("Aligning returns around ex-dividend dates..."):
+            panels, bench = event_study.load_event_data(tickers, benchmark)
+            events = event_study.dividend_events(tickers)
+        event_study.render_event_study(panels, events, benchmark, bench, "Ex-Dividend Dates")
+
@@ -0,0 +1,212 @@
+import sys
+import argparse
+from statistics import NormalDist
+import numpy as np
+import pandas as pd
+import streamlit as st
+import matplotlib.pyplot as plt
+from compact_store import SIGNAL_CODES, SIGNAL_LABELS, PRICE_FIELDS, build_panel, calendar_groups
+from tracing import span
+import price_store
+import signal_rules
+import stock_analysis
+
+# Days relative to the event bar (day 0 is the first trading day on or after the event date).
+WINDOW = (-10, 20)
+LEVEL = 0.95
+EVENT_PERIOD = "5y"
+BENCHMARK = "SPY"
+EVENT_COLUMNS = ["ticker", "date", "event"]
+# Transitions into these signals are studied by default.
+STUDY_SIGNALS = ["🔥 STRONG BUY", "💡 BUY", "🚫 SELL", "🔴 STRONG SELL"]
+
+def _naive(dates):
+    dates = pd.DatetimeIndex(dates)
+    return dates.tz_localize(None).normalize() if dates.tz is not None else dates.normalize()
+
+def load_event_data(tickers, benchmark=BENCHMARK, period=EVENT_PERIOD, adjust="total"):
+    """
+    (panels, benchmark closes) from the shared price store: one OHLCV panel (compact_store
+    layout, float32) per exchange calendar among tickers, since a union calendar would leave
+    NaN gaps in every series, and the benchmark's closes on its own calendar (None if it has
+    no history). 'total' adjusts for dividends, so an ex-date shows the holder's return rather
+    than the mechanical price drop; 'splits' keeps that drop in.
+    """
+    frames = price_store.histories(list(dict.fromkeys([*tickers, benchmark])), period, adjust)
+    frames = {t: df[[c for c in PRICE_FIELDS if c in df.columns]].set_axis(_naive(df.index)) for t, df in frames.items()}
+    panels = [build_panel({t: frames[t] for t in group}) for group in calendar_groups(frames, tickers)]
+    bench = frames[benchmark]["Close"].astype(np.float64) if benchmark in frames else None
+    return panels, bench
+
+def _returns(close):
+    returns = np.full_like(close, np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns[1:] = close[1:] / close[:-1] - 1
+    return returns
+
+def abnormal_returns(panel, benchmark_close):
+    """
+    (dates x tickers) daily return minus the benchmark's over the same bars (market-adjusted
+    abnormal returns). The benchmark is read as of each panel date, so one on another
+    exchange calendar is compared over the same span of days.
+    """
+    close = panel["values"][panel["fields"].index("Close")].astype(np.float64)
+    bench = benchmark_close.sort_index().reindex(panel["dates"], method="ffill").to_numpy(dtype=np.float64)
+    return _returns(close) - _returns(bench)[:, None]
+
+def event_windows(abnormal, dates, tickers, events, window=WINDOW):
+    """
+    (events x window days) abnormal returns gathered in one fancy-indexing pass: each event's
+    row of the panel plus the window offsets, in its ticker's column. Days outside the panel,
+    and events whose ticker or date is not in it, are NaN.
+    """
+    offsets = np.arange(window[0], window[1] + 1)
+    event_dates = _naive(events["date"])
+    rows = dates.searchsorted(event_dates)
+    cols = pd.Index(tickers).get_indexer(events["ticker"])
+    # An event before the first bar would otherwise land on row 0 as if it happened there.
+    known = (cols >= 0) & (rows < len(dates)) & (event_dates >= dates[0])
+    index = rows[:, None] + offsets[None, :]
+    inside = known[:, None] & (index >= 0) & (index < len(dates))
+    out = abnormal[np.clip(index, 0, len(dates) - 1), np.clip(cols, 0, None)[:, None]]
+    out[~inside] = np.nan
+    return out, offsets
+
+def summarize(windows, offsets, level=LEVEL):
+    """
+    Per window day: events with data, average abnormal return (AAR) and cumulative average
+    (CAAR) with normal-approximation confidence bands from the cross-section of events.
+    A missing day counts as zero abnormal return in an event's cumulative sum; days no event
+    reaches are NaN throughout. Events are treated as independent, so many events on the same
+    dates (one ex-date across a sector) make the bands narrower than they should be.
+    """
+    z = NormalDist().inv_cdf(0.5 + level / 2)
+    windows = windows[~np.isnan(windows).all(axis=1)]
+    present = ~np.isnan(windows)
+    counts = present.sum(axis=0)
+    filled = np.where(present, windows, 0.0)
+    car = np.cumsum(filled, axis=1)
+    n = len(windows)
+    # Sums rather than nanmean/nanstd, which warn on the empty and single-event days shown as NaN here.
+    with np.errstate(divide="ignore", invalid="ignore"):
+        aar = filled.sum(axis=0) / counts
+        aar_se = np.sqrt(np.where(present, (filled - aar) ** 2, 0.0).sum(axis=0) / (counts - 1) / counts)
+        caar = np.where(counts > 0, car.sum(axis=0) / n, np.nan)
+        caar_se = np.sqrt(((car - caar) ** 2).sum(axis=0) / (n - 1) / n) if n > 1 else np.full(len(offsets), np.nan)
+        t_stat = aar / aar_se
+    return pd.DataFrame({
+        "Events": counts,
+        "AAR (%)": aar * 100,
+        "AAR Low (%)": (aar - z * aar_se) * 100,
+        "AAR High (%)": (aar + z * aar_se) * 100,
+        "t-stat": t_stat,
+        "CAAR (%)": caar * 100,
+        "CAAR Low (%)": (caar - z * caar_se) * 100,
+        "CAAR High (%)": (caar + z * caar_se) * 100,
+    }, index=pd.Index(offsets, name="Day"))
+
+def run_event_study(panels, events, benchmark_close, window=WINDOW, level=LEVEL):
+    """AAR/CAAR table for an event table (columns ticker, date) on per-calendar price panels."""
+    with span("event_study", events=len(events), tickers=sum(len(p["tickers"]) for p in panels)):
+        offsets = np.arange(window[0], window[1] + 1)
+        parts = [np.empty((0, len(offsets)))]
+        for panel in panels:
+            mine = events[events["ticker"].isin(panel["tickers"])]
+            if len(mine):
+                abnormal = abnormal_returns(panel, benchmark_close)
+                parts.append(event_windows(abnormal, panel["dates"], panel["tickers"], mine, window)[0])
+        return summarize(np.concatenate(parts), offsets, level)
+
+def dividend_events(tickers, period=EVENT_PERIOD):
+    """Every stored ex-dividend date of tickers as an event table."""
+    stores = price_store.fetch_stores(tickers, period)
+    parts = [pd.DataFrame({"ticker": ticker, "date": _naive(store["dividends"].index), "event": "Ex-dividend"})
+             for ticker, store in stores.items() if len(store["dividends"])]
+    return pd.concat(parts, ignore_index=True) if parts else pd.DataFrame(columns=EVENT_COLUMNS)
+
+def signal_events(panels, strategy=None, signals=STUDY_SIGNALS):
+    """
+    Bars where the strategy's signal changed into one of signals, for every ticker of each
+    per-calendar panel at once (indicators via compute_panel_indicators).
+    """
+    strategy = strategy or signal_rules.DEFAULT_COMPILED
+    wanted_codes = [SIGNAL_CODES[s] for s in signals]
+    na = SIGNAL_CODES["N/A"]
+    parts = [pd.DataFrame(columns=EVENT_COLUMNS)]
+    for panel in panels:
+        indicators = stock_analysis.compute_panel_indicators(panel)
+        codes, _ = signal_rules.evaluate_panel(strategy, indicators)
+        changed = np.zeros(codes.shape, dtype=bool)
+        changed[1:] = np.isin(codes[1:], wanted_codes) & (codes[1:] != codes[:-1]) & (codes[:-1] != na)
+        rows, cols = np.nonzero(changed)
+        parts.append(pd.DataFrame({
+            "ticker": np.array(panel["tickers"], dtype=object)[cols],
+            "date": panel["dates"][rows],
+            "event": np.array(SIGNAL_LABELS, dtype=object)[codes[rows, cols]],
+        }))
+    return pd.concat(parts, ignore_index=True)
+
+def plot_event_study(summary, title):
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 8), sharex=True)
+    days = summary.index.to_numpy()
+    ax1.bar(days, summary["AAR (%)"], color="blue", alpha=0.6, label="AAR")
+    ax1.errorbar(days, summary["AAR (%)"], yerr=[summary["AAR (%)"] - summary["AAR Low (%)"], summary["AAR High (%)"] - summary["AAR (%)"]],
+                 fmt="none", ecolor="black", alpha=0.5, capsize=2)
+    ax1.axvline(0, color="red", linestyle="--")
+    ax1.set_title(f"{title}: Average Abnormal Return")
+    ax1.set_ylabel("AAR (%)")
+    ax1.grid(True, linestyle="--", alpha=0.7)
+    ax2.plot(days, summary["CAAR (%)"], color="#008000", label="CAAR")
+    ax2.fill_between(days, summary["CAAR Low (%)"], summary["CAAR High (%)"], color="#008000", alpha=0.2, label="Confidence Band")
+    ax2.axvline(0, color="red", linestyle="--")
+    ax2.axhline(0, color="gray", linewidth=0.8)
+    ax2.set_title("Cumulative Average Abnormal Return")
+    ax2.set_xlabel("Trading Days From Event")
+    ax2.set_ylabel("CAAR (%)")
+    ax2.legend()
+    ax2.grid(True, linestyle="--", alpha=0.7)
+    return fig
+
+def render_event_study(panels, events, benchmark, benchmark_close, title, level=LEVEL):
+    """Chart and day-by-day table of an event study, or a note when there are no events."""
+    if benchmark_close is None:
+        st.error(f"No price history for the benchmark {benchmark}.")
+        return
+    if events.empty:
+        st.info("No events found for these tickers.")
+        return
+    summary = run_event_study(panels, events, benchmark_close, WINDOW, level)
+    st.write(f"**{len(events)} events** across {events['ticker'].nunique()} tickers, {int(level * 100)}% confidence bands, abnormal returns vs {benchmark}.")
+    fig = plot_event_study(summary, title)
+    with span("matplotlib.render"):
+        st.pyplot(fig)
+    plt.close(fig)
+    st.dataframe(summary.round(3), use_container_width=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Average and cumulative abnormal returns around ex-dividend dates or signal changes.")
+    parser.add_argument("tickers", nargs="+")
+    parser.add_argument("--events", choices=["dividends", "signals"], default="dividends")
+    parser.add_argument("--benchmark", default=BENCHMARK)
+    parser.add_argument("--period", default=EVENT_PERIOD)
+    parser.add_argument("--window", type=int, nargs=2, default=list(WINDOW), metavar=("START", "END"))
+    parser.add_argument("--level", type=float, default=LEVEL)
+    parser.add_argument("--strategy", help="Strategy file for --events signals (default: the swing rules).")
+    args = parser.parse_args(argv)
+
+    panels, bench = load_event_data(args.tickers, args.benchmark, args.period)
+    if bench is None:
+        print(f"No price history for the benchmark {args.benchmark}", file=sys.stderr)
+        return 1
+    if args.events == "dividends":
+        events = dividend_events(args.tickers, args.period)
+    else:
+        strategy = signal_rules.load_strategy(args.strategy) if args.strategy else None
+        events = signal_events(panels, strategy)
+    summary = run_event_study(panels, events, bench, tuple(args.window), args.level)
+    print(f"{len(events)} events, abnormal returns vs {args.benchmark}")
+    print(summary.round(3).to_string())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,209 @@
+import os
+import sys
+import argparse
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pandas as pd
+import shared_cache
+from market_data import fetch_info
+from tracing import span, run_in_trace
+import signal_rules
+import portfolio_risk
+import watchlists
+import fx_rates
+
+SNAPSHOT_PARQUET = "fundamentals_snapshot.parquet"
+MAX_WORKERS = 16
+TRADING_DAYS = 252
+
+# Snapshot column -> yfinance .info key. Column names are valid identifiers so they can be
+# used directly in screening expressions ("forward_pe < 20 and cagr_5y > 10").
+INFO_FIELDS = {
+    "company": "shortName",
+    "sector": "sector",
+    "industry": "industry",
+    "country": "country",
+    "exchange": "exchange",
+    "currency": "currency",
+    "price": "regularMarketPrice",
+    "market_cap": "marketCap",
+    "enterprise_value": "enterpriseValue",
+    "forward_pe": "forwardPE",
+    "trailing_pe": "trailingPE",
+    "peg_ratio": "trailingPegRatio",
+    "price_to_book": "priceToBook",
+    "price_to_sales": "priceToSalesTrailing12Months",
+    "ev_to_ebitda": "enterpriseToEbitda",
+    "dividend_yield": "dividendYield",
+    "payout_ratio": "payoutRatio",
+    "profit_margin": "profitMargins",
+    "operating_margin": "operatingMargins",
+    "return_on_equity": "returnOnEquity",
+    "revenue_growth": "revenueGrowth",
+    "earnings_growth": "earningsGrowth",
+    "debt_to_equity": "debtToEquity",
+    "current_ratio": "currentRatio",
+    "beta": "beta",
+    "week52_high": "fiftyTwoWeekHigh",
+    "week52_low": "fiftyTwoWeekLow",
+    "average_volume": "averageVolume",
+}
+TEXT_FIELDS = ["company", "sector", "industry", "country", "exchange", "currency"]
+DISPLAY_NAMES = {
+    "company": "Company", "sector": "Sector", "industry": "Industry", "country": "Country",
+    "exchange": "Exchange", "currency": "Currency", "price": "Price", "market_cap": "Market Cap",
+    "enterprise_value": "Enterprise Value", "forward_pe": "Forward P/E", "trailing_pe": "Trailing P/E",
+    "peg_ratio": "PEG", "price_to_book": "P/B", "price_to_sales": "P/S", "ev_to_ebitda": "EV/EBITDA",
+    "dividend_yield": "Dividend Yield (%)", "payout_ratio": "Payout Ratio", "profit_margin": "Profit Margin",
+    "operating_margin": "Operating Margin", "return_on_equity": "ROE", "revenue_growth": "Revenue Growth",
+    "earnings_growth": "Earnings Growth", "debt_to_equity": "Debt/Equity", "current_ratio": "Current Ratio",
+    "beta": "Beta", "week52_high": "52W High", "week52_low": "52W Low", "average_volume": "Avg Volume",
+    "cagr_5y": "5Y CAGR (%)", "as_of": "As Of",
+}
+
+def _info_row(ticker):
+    info = fetch_info(ticker)
+    row = {"ticker": ticker}
+    for column, key in INFO_FIELDS.items():
+        value = info.get(key)
+        if column in TEXT_FIELDS:
+            row[column] = value if isinstance(value, str) else None
+        else:
+            row[column] = float(value) if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+    if not row["company"]:
+        row["company"] = info.get("longName") or ticker
+    return row
+
+def historical_cagr(closes):
+    """5Y CAGR (%) for every column of a close matrix, the same formula as compute_historical_cagr."""
+    values = closes.to_numpy(dtype=np.float64)
+    valid = ~np.isnan(values)
+    count = valid.sum(axis=0)
+    first = values[valid.argmax(axis=0), np.arange(values.shape[1])]
+    last = values[len(values) - 1 - valid[::-1].argmax(axis=0), np.arange(values.shape[1])]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cagr = ((last / first) ** (TRADING_DAYS / count) - 1) * 100
+    cagr[count < 2] = np.nan
+    return pd.Series(cagr, index=closes.columns)
+
+def collect_fundamentals(tickers, max_workers=MAX_WORKERS, with_cagr=True):
+    """
+    Snapshot rows for tickers: the INFO_FIELDS of each .info (fetched in parallel) plus the
+    GBP 5Y CAGR from one batched price download. Tickers whose .info fails are left out.
+    """
+    today = datetime.date.today().isoformat()
+    with span("fundamentals.collect", tickers=len(tickers)):
+        rows = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+            for ticker, future in [(t, pool.submit(run_in_trace(_info_row), t)) for t in tickers]:
+                try:
+                    rows.append(future.result())
+                except Exception as e:
+                    print(f"Skipping {ticker}: {type(e).__name__}: {e}", file=sys.stderr)
+        df = pd.DataFrame(rows, columns=["ticker", *INFO_FIELDS])
+        if with_cagr and len(df):
+            currencies = dict(zip(df["ticker"], df["currency"]))
+            cagr = historical_cagr(portfolio_risk.load_close_matrix(list(df["ticker"]), "5y", fx_rates.BASE_CURRENCY, currencies))
+        else:
+            cagr = pd.Series(dtype=float)
+        df["cagr_5y"] = df["ticker"].map(cagr).astype(np.float64)
+        df["as_of"] = today
+    return df
+
+def _compact(df):
+    """Text columns as categoricals and numbers as float64: small on disk, fast to filter."""
+    df = df.copy()
+    for column in df.columns:
+        if column in TEXT_FIELDS or column == "as_of":
+            df[column] = df[column].astype(object).astype("category")
+        elif column != "ticker":
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(np.float64)
+    return df.set_index("ticker")
+
+def load_snapshot(path=SNAPSHOT_PARQUET):
+    """The stored snapshot (indexed by ticker), memoised per file version."""
+    if not os.path.exists(path):
+        return _compact(pd.DataFrame(columns=["ticker", *INFO_FIELDS, "cagr_5y", "as_of"]))
+    key = ("fundamentals", os.path.abspath(path), os.path.getmtime(path))
+
+    def read():
+        with span("parquet.read", path=path, bytes=os.path.getsize(path)):
+            return pd.read_parquet(path)
+
+    df, _ = shared_cache.get_or_fetch(key, read, shared_cache.INFO_TTL)
+    return df
+
+def stale_tickers(snapshot, tickers, today=None):
+    today = today or datetime.date.today().isoformat()
+    as_of = snapshot["as_of"].astype(str).to_dict() if len(snapshot) else {}
+    return [t for t in tickers if as_of.get(t) != today]
+
+def refresh_snapshot(tickers, path=SNAPSHOT_PARQUET, force=False, max_workers=MAX_WORKERS):
+    """
+    Re-collect tickers not yet refreshed today (all of them with force) and merge them into
+    the snapshot file. Returns (snapshot, number of tickers refreshed).
+    """
+    snapshot = load_snapshot(path)
+    todo = list(dict.fromkeys(tickers)) if force else stale_tickers(snapshot, list(dict.fromkeys(tickers)))
+    if not todo:
+        return snapshot, 0
+    fresh = _compact(collect_fundamentals(todo, max_workers))
+    kept = snapshot.drop(index=[t for t in fresh.index if t in snapshot.index])
+    merged = _compact(pd.concat([kept.reset_index(), fresh.reset_index()], ignore_index=True))
+    tmp = f"{path}.tmp"
+    with span("parquet.write", path=path, rows=len(merged)):
+        merged.to_parquet(tmp, engine="pyarrow")
+        os.replace(tmp, path)
+    return load_snapshot(path), len(todo)
+
+def _snapshot_resolver(snapshot):
+    def resolve(name):
+        if name == "ticker":
+            return snapshot.index.to_numpy(dtype=object)
+        if name not in snapshot.columns:
+            raise ValueError(f"Unknown field '{name}'; available: {', '.join(['ticker', *snapshot.columns])}")
+        column = snapshot[name]
+        if isinstance(column.dtype, pd.CategoricalDtype):
+            return column.astype(object).to_numpy()
+        return column.to_numpy(dtype=np.float64)
+    return resolve
+
+def screen(snapshot, where=None, sort_by=None, ascending=False, limit=None):
+    """
+    Filter and sort the snapshot with a signal_rules expression over its columns, e.g.
+    screen(df, "forward_pe < 20 and cagr_5y > 10", sort_by="market_cap"). Rows with a
+    missing value in a compared field never match. Raises ValueError on a bad expression.
+    """
+    with span("fundamentals.screen", rows=len(snapshot)):
+        result = snapshot
+        if where and str(where).strip():
+            mask = np.broadcast_to(np.asarray(signal_rules.evaluate_expression(where, _snapshot_resolver(snapshot)), dtype=bool), (len(snapshot),))
+            result = snapshot[mask]
+        if sort_by:
+            if sort_by not in result.columns:
+                raise ValueError(f"Unknown sort field '{sort_by}'")
+            result = result.sort_values(sort_by, ascending=ascending, na_position="last")
+        if limit:
+            result = result.head(limit)
+    return result
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the fundamentals snapshot (run daily) and optionally screen it.")
+    parser.add_argument("--universe", help="CSV with a 'ticker' column; defaults to the watchlists.")
+    parser.add_argument("--snapshot", default=SNAPSHOT_PARQUET)
+    parser.add_argument("--force", action="store_true", help="Re-collect tickers already refreshed today.")
+    parser.add_argument("--where", help='Screen expression, e.g. "forward_pe < 20 and cagr_5y > 10".')
+    parser.add_argument("--sort", help="Field to sort by (descending).")
+    parser.add_argument("--limit", type=int, default=50)
+    args = parser.parse_args(argv)
+
+    tickers, _ = watchlists.load_universe(args.universe)
+    snapshot, refreshed = refresh_snapshot(tickers, args.snapshot, args.force)
+    print(f"Snapshot {args.snapshot}: {len(snapshot)} tickers, {refreshed} refreshed")
+    if args.where or args.sort:
+        print(screen(snapshot, args.where, args.sort, limit=args.limit).to_string())
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
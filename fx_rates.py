@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import shared_cache
+from market_data import download_history, fetch_info
+from tracing import span
+
+BASE_CURRENCY = "GBP"
+FX_PERIOD = "10y"
+FX_TTL = 6 * 60 * 60
+# Yahoo quotes some exchanges in minor units: (major currency, multiplier to the major unit).
+MINOR_UNITS = {"GBp": ("GBP", 0.01), "GBX": ("GBP", 0.01), "ZAc": ("ZAR", 0.01), "ILA": ("ILS", 0.01)}
+CURRENCY_SYMBOLS = {
+    "GBP": "£", "USD": "$", "EUR": "€", "JPY": "¥", "CNY": "¥", "INR": "₹", "CHF": "CHF ",
+    "CAD": "C$", "AUD": "A$", "NZD": "NZ$", "HKD": "HK$", "SGD": "S$", "SEK": "kr ", "NOK": "kr ",
+    "DKK": "kr ", "ZAR": "R", "ILS": "₪", "KRW": "₩", "BRL": "R$",
+}
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Adj Close"]
+
+def major_currency(currency):
+    """(major currency, multiplier) for a Yahoo currency code, e.g. 'GBp' -> ('GBP', 0.01)."""
+    if not currency:
+        return "USD", 1.0
+    return MINOR_UNITS.get(currency, (currency.upper(), 1.0))
+
+def currency_symbol(currency):
+    major, _ = major_currency(currency)
+    return CURRENCY_SYMBOLS.get(major, f"{major} ")
+
+def to_major(value, currency):
+    """A quoted price in its major unit, e.g. 248.2 GBp -> (2.482, 'GBP')."""
+    major, scale = major_currency(currency)
+    return (value * scale if value is not None else None), major
+
+def format_price(value, currency):
+    """'£2.48' for 248.2 GBp, '$253.31' for USD; 'N/A' when there is no price."""
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return "N/A"
+    amount, major = to_major(value, currency)
+    return f"{currency_symbol(major)}{amount:,.2f}"
+
+def ticker_currency(ticker):
+    """Quote currency of ticker from its (cached) .info; USD when Yahoo does not say."""
+    try:
+        return fetch_info(ticker).get("currency") or "USD"
+    except Exception:
+        return "USD"
+
+def _naive_dates(index):
+    index = pd.DatetimeIndex(index)
+    if index.tz is not None:
+        index = index.tz_localize(None)
+    return index.normalize()
+
+def _download_pair(source, target):
+    for pair, invert in ((f"{source}{target}=X", False), (f"{target}{source}=X", True)):
+        df = download_history(pair, period=FX_PERIOD, interval="1d")
+        if df is not None and not df.empty and "Close" in df.columns:
+            rates = df["Close"].astype(np.float64).dropna()
+            rates.index = _naive_dates(rates.index)
+            rates = rates[~rates.index.duplicated(keep="last")]
+            return 1.0 / rates if invert else rates
+    return None
+
+def fx_series(source, target=BASE_CURRENCY):
+    """
+    Daily rate series converting one unit of source into target, downloaded once per pair
+    (FX_PERIOD of history) and shared by every conversion. None if Yahoo has neither
+    direction of the pair.
+    """
+    source, target = major_currency(source)[0], major_currency(target)[0]
+    if source == target:
+        return None
+    with span("fx.series", pair=f"{source}{target}") as attrs:
+        rates, status = shared_cache.get_or_fetch(("fx", source, target), lambda: _download_pair(source, target), FX_TTL)
+        attrs["cache"] = "miss" if status == "miss" else "hit"
+    return rates
+
+def rates_on(dates, currency, base=BASE_CURRENCY):
+    """
+    Multipliers taking prices quoted in currency (minor units included) into base on each
+    date: the last known FX close on or before the date, back-filled before the series starts.
+    """
+    major, scale = major_currency(currency)
+    base_major, base_scale = major_currency(base)
+    factor = scale / base_scale
+    if major == base_major:
+        return np.full(len(dates), factor)
+    rates = fx_series(major, base_major)
+    if rates is None:
+        return np.full(len(dates), np.nan)
+    days = _naive_dates(dates)
+    aligned = rates.reindex(rates.index.union(days)).ffill().bfill().reindex(days)
+    return aligned.to_numpy() * factor
+
+def convert_history(df, currency, base=BASE_CURRENCY):
+    """Copy of an OHLCV frame with its price columns in base; Volume is left alone."""
+    if df is None or df.empty:
+        return df
+    columns = [c for c in PRICE_COLUMNS if c in df.columns]
+    out = df.copy()
+    out[columns] = df[columns].to_numpy(dtype=np.float64) * rates_on(df.index, currency, base)[:, None]
+    return out
+
+def convert_close_matrix(closes, currencies, base=BASE_CURRENCY):
+    """
+    A (dates x tickers) price matrix in base, as one multiply by a matching rate matrix.
+    currencies maps ticker -> quote currency; each pair's series is looked up once however
+    many tickers trade in it.
+    """
+    if closes.empty:
+        return closes
+    quoted = [currencies.get(t, "USD") for t in closes.columns]
+    by_currency = {c: rates_on(closes.index, c, base) for c in dict.fromkeys(quoted)}
+    rates = np.column_stack([by_currency[c] for c in quoted])
+    return pd.DataFrame(closes.to_numpy(dtype=np.float64) * rates, index=closes.index, columns=closes.columns)
+
+def convert_price(value, currency, base=BASE_CURRENCY):
+    """A single latest price in base, using the most recent FX close."""
+    if value is None:
+        return None
+    rate = rates_on(pd.DatetimeIndex([pd.Timestamp.today()]), currency, base)[0]
+    return None if np.isnan(rate) else float(value) * rate
@@ -1,28 +1,28 @@
-import os
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import yfinance as yf
-
-LTI_CSV = "lti_watchlist.csv"
-CURRENCY_MAP = {"USD": "£", "GBP": "£", "GBp": "£", "EUR": "€"}
-
-def load_watchlist():
-    if os.path.exists(LTI_CSV):
-        df = pd.read_csv(LTI_CSV)
-        df.columns = [col.capitalize() for col in df.columns]
-        return df.to_dict("records")
-    return []
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from market_data import download_history, fetch_info
+from tracing import span
+import portfolio_risk
+import portfolio_optimizer
+import fundamentals
+import fx_rates
+import symbol_directory
+import prefetch
+from top_25_stocks import S_AND_P_500
+from watchlists import LTI_CSV, load_long_term_watchlist
 
 def save_watchlist(watchlist):
-    pd.DataFrame(watchlist).to_csv(LTI_CSV, index=False)
+    with span("csv.write", path=LTI_CSV):
+        pd.DataFrame(watchlist).to_csv(LTI_CSV, index=False)
 
 def fetch_fundamental_data(ticker):
     info_dict = {}
     try:
-        tkr = yf.Ticker(ticker)
-        info = tkr.info
+        info = fetch_info(ticker)
         info_dict["Company"] = info.get("shortName", info.get("longName", ticker) or "N/A")
         info_dict["Forward P/E"] = info.get("forwardPE", "N/A")
         info_dict["Trailing P/E"] = info.get("trailingPE", "N/A")
@@ -37,11 +37,16 @@ def fetch_fundamental_data(ticker):
         info_dict["Currency"] = "USD"
     return info_dict
 
-def compute_historical_cagr(ticker, period="5y"):
+def compute_historical_cagr(ticker, period="5y", base_currency=fx_rates.BASE_CURRENCY):
+    """CAGR of the close converted into base_currency (native prices if the FX series is unavailable)."""
     try:
-        df = yf.download(ticker, period=period, interval="1d", progress=False)
+        df = download_history(ticker, period=period, interval="1d", auto_adjust=True)
         if df.empty or "Close" not in df.columns:
             return 0.0
+        if base_currency:
+            converted = fx_rates.convert_history(df, fx_rates.ticker_currency(ticker), base_currency)
+            if converted["Close"].notna().all():
+                df = converted
         cagr = float(((df["Close"].iloc[-1] / df["Close"].iloc[0]) ** (1 / (len(df) / 252)) - 1))
         return cagr
     except Exception:
@@ -49,14 +54,22 @@ def compute_historical_cagr(ticker, period="5y"):
 
 def get_current_price_and_currency(ticker):
     try:
-        tkr = yf.Ticker(ticker)
-        info = tkr.info
-        price = float(info.get("regularMarketPrice", yf.download(ticker, period="1d", progress=False)["Close"].iloc[-1] if not yf.download(ticker, period="1d", progress=False).empty else None))
+        info = fetch_info(ticker)
+        price = info.get("regularMarketPrice")
+        if price is None:
+            df_last = download_history(ticker, period="1d", interval="1d", auto_adjust=True)
+            price = df_last["Close"].iloc[-1] if not df_last.empty else None
+        price = float(price)
         currency = info.get("currency", "USD")
-        return price, CURRENCY_MAP.get(currency, "£")
+        price, _ = fx_rates.to_major(price, currency)
+        return price, fx_rates.currency_symbol(currency)
     except Exception:
         return None, "£"
 
+def price_in_base(price, currency):
+    """A price already in its major unit (as get_current_price_and_currency returns) converted to GBP."""
+    return fx_rates.convert_price(price, fx_rates.major_currency(currency)[0]) if price else None
+
 def project_future_price(current_price, years, cagr):
     if current_price is None or not isinstance(current_price, (int, float)):
         return pd.DataFrame([{"Year": 0, "Projected Price": "N/A"}])
@@ -85,36 +98,134 @@ def generate_long_term_conclusion(cagr, fundamentals):
         conclusion += f" The company’s market cap of {market_cap / 1e9:.2f} billion suggests a {'large' if market_cap > 1e11 else 'mid-sized' if market_cap > 2e10 else 'small'} entity, which may influence your decision."
     return conclusion
 
+def fetch_watchlist_row(ticker):
+    """One row of the long-term watchlist table."""
+    fundamentals = fetch_fundamental_data(ticker)
+    price, sym = get_current_price_and_currency(ticker)
+    cagr_5y = compute_historical_cagr(ticker)
+    return {
+        "ticker": ticker,
+        "Company": fundamentals["Company"],
+        "Current Price": f"{sym}{price:.2f}" if price else "N/A",
+        "Price (£)": fx_rates.format_price(price_in_base(price, fundamentals["Currency"]), fx_rates.BASE_CURRENCY),
+        "5Y CAGR (%)": round(cagr_5y * 100, 2) if cagr_5y else "N/A",
+        "Forward P/E": fundamentals["Forward P/E"],
+        "Trailing P/E": fundamentals["Trailing P/E"],
+        "Market Cap": fundamentals["Market Cap"]
+    }
+
+def build_history_figure(ticker, df_hist, scale, sym):
+    fig = Figure(figsize=(12, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.plot(df_hist.index, df_hist["Close"] * scale, label="Close Price", color="blue")
+    ax.set_title(f"{ticker} - 5-Year Historical Performance")
+    ax.set_xlabel("Date")
+    ax.set_ylabel(f"Price ({sym})")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.7)
+    return fig
+
+def fetch_history_chart(ticker):
+    """PNG bytes of the 5-year price chart in the ticker's major currency unit, rendered once per process."""
+    def render():
+        df_hist = download_history(ticker, period="5y", interval="1d", auto_adjust=True)
+        if df_hist.empty:
+            return None
+        currency = fetch_info(ticker).get("currency", "USD")
+        with span("matplotlib.render", ticker=ticker):
+            return prefetch.figure_png(build_history_figure(ticker, df_hist, fx_rates.major_currency(currency)[1], fx_rates.currency_symbol(currency)))
+    return prefetch.cached_chart(("chart", "history_5y", ticker), render)
+
+def render_allocation_optimizer(tickers):
+    st.subheader("Allocation Optimiser")
+    st.write("""
+    Suggested weights for your long-term watchlist from 5 years of daily returns.
+    **Guidance:**
+    - **Min Variance**: The least volatile mix of your names.
+    - **Max Sharpe**: The mix with the best return per unit of risk on the efficient frontier.
+    - **Risk Parity**: Each name contributes the same amount of risk.
+    - **Position Cap**: No single name may exceed this weight.
+    """)
+    col1, col2 = st.columns(2)
+    cap = col1.slider("Position Cap (%)", min_value=5, max_value=100, value=40, step=5, help="Maximum weight in any single ticker.") / 100
+    risk_free = col2.number_input("Risk-Free Rate (%)", min_value=0.0, max_value=10.0, value=4.0, step=0.25) / 100
+
+    returns = portfolio_risk.build_return_matrix(portfolio_risk.load_close_matrix(tickers, "5y", fx_rates.BASE_CURRENCY))
+    if returns.shape[1] < 2:
+        st.info("At least two tickers with enough price history are needed to optimise allocations.")
+        return
+    result = portfolio_optimizer.optimise_allocations(returns, cap=cap, risk_free=risk_free)
+
+    st.dataframe((result["weights"] * 100).round(2).rename(columns=lambda c: f"{c} (%)"), use_container_width=True)
+    st.table((result["stats"].T * [100, 100, 1]).round(2).rename(columns={"Expected Return": "Expected Return (%)", "Volatility": "Volatility (%)"}))
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.plot(result["frontier"]["Volatility"] * 100, result["frontier"]["Return"] * 100, color="blue", label="Efficient Frontier")
+    for name, marker in [("Min Variance", "o"), ("Max Sharpe", "*"), ("Risk Parity", "s")]:
+        ax.scatter(result["stats"].loc["Volatility", name] * 100, result["stats"].loc["Expected Return", name] * 100, marker=marker, s=120, label=name)
+    ax.set_title("Efficient Frontier")
+    ax.set_xlabel("Volatility (%)")
+    ax.set_ylabel("Expected Return (%)")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.7)
+    with span("matplotlib.render"):
+        st.pyplot(fig)
+    plt.close(fig)
+
+def render_fundamentals_screener(watchlist_tickers):
+    st.subheader("Fundamentals Screener")
+    st.write("""
+    Screen every ticker in the local fundamentals snapshot by valuation, growth and quality. The snapshot is refreshed at most once a day per ticker.
+    **Guidance:**
+    - **Filter**: Combine fields with `and`, `or` and `not`, e.g. `forward_pe < 20 and cagr_5y > 10` or `sector == 'Technology' and dividend_yield > 2`.
+    - **Fields**: Use the field names listed under the filter box; 5Y CAGR and dividend yield are in percent.
+    - Tickers with a missing value for a field in the filter are left out.
+    """)
+    default_universe = ", ".join(dict.fromkeys(watchlist_tickers + S_AND_P_500))
+    universe_text = st.text_area("Snapshot Universe", value=default_universe, help="Comma-separated tickers to collect when refreshing the snapshot.")
+    universe = [t.strip().upper() for t in universe_text.split(",") if t.strip()]
+    if st.button("Refresh Snapshot") and universe:
+        with st.spinner(f"Collecting fundamentals for {len(universe)} tickers..."):
+            _, refreshed = fundamentals.refresh_snapshot(universe)
+        st.success(f"Refreshed {refreshed} tickers." if refreshed else "Snapshot is already up to date for today.")
+
+    snapshot = fundamentals.load_snapshot()
+    if snapshot.empty:
+        st.info("The fundamentals snapshot is empty. Refresh it above to start screening.")
+        return
+    numeric_fields = [c for c in snapshot.columns if c not in fundamentals.TEXT_FIELDS and c != "as_of"]
+    query = st.text_input("Filter", value="forward_pe < 20 and cagr_5y > 10", help="Fields: " + ", ".join(["ticker", *snapshot.columns]))
+    col1, col2 = st.columns(2)
+    sort_by = col1.selectbox("Sort By", numeric_fields, index=numeric_fields.index("market_cap") if "market_cap" in numeric_fields else 0, format_func=lambda c: fundamentals.DISPLAY_NAMES.get(c, c))
+    ascending = col2.checkbox("Ascending", value=False)
+    try:
+        result = fundamentals.screen(snapshot, query, sort_by, ascending)
+    except ValueError as e:
+        st.error(f"Invalid filter: {e}")
+        return
+    st.dataframe(result.rename(columns=fundamentals.DISPLAY_NAMES), use_container_width=True, height=400)
+    st.caption(f"{len(result)} of {len(snapshot)} tickers match. Snapshot dates: {snapshot['as_of'].astype(str).min()} to {snapshot['as_of'].astype(str).max()}.")
+
 def run():
     st.title("🏦 Long-Term Investments – Watchlist & Deep Analysis")
     st.write("""
     Analyse stocks for long-term growth with fundamental data, historical performance, and detailed conclusions.
     Add tickers to your long-term investing watchlist to evaluate long-term potential.
     **Guidance:** Focus on stocks with strong growth (CAGR > 10%), attractive valuations (P/E < 30), and conclusions for long-term holding decisions.
+    CAGR and projections are measured in GBP, so UK and overseas names compare like for like.
     """)
 
     if "long_term_watchlist" not in st.session_state:
-        st.session_state.long_term_watchlist = load_watchlist()
+        st.session_state.long_term_watchlist = load_long_term_watchlist()
 
     st.subheader("Manage Your Long-Term Investing Watchlist")
-    new_ticker = st.text_input("Add a Ticker (e.g., 'AAPL')", help="Enter a stock symbol like 'AAPL' for Apple.").upper().strip()
+    new_ticker = symbol_directory.ticker_input("Add a Ticker (e.g., 'AAPL')", key="long_term_add")
     if st.button("Add Ticker") and new_ticker:
         if any(item.get("ticker", item.get("Ticker", "")) == new_ticker for item in st.session_state.long_term_watchlist):
             st.warning(f"{new_ticker} is already in your long-term investing watchlist.")
         else:
-            fundamentals = fetch_fundamental_data(new_ticker)
-            price, sym = get_current_price_and_currency(new_ticker)
-            cagr_5y = compute_historical_cagr(new_ticker)
-            record = {
-                "ticker": new_ticker,
-                "Company": fundamentals["Company"],
-                "Current Price": f"{sym}{price:.2f}" if price else "N/A",
-                "5Y CAGR (%)": round(cagr_5y * 100, 2) if cagr_5y else "N/A",
-                "Forward P/E": fundamentals["Forward P/E"],
-                "Trailing P/E": fundamentals["Trailing P/E"],
-                "Market Cap": fundamentals["Market Cap"]
-            }
-            st.session_state.long_term_watchlist.append(record)
+            st.session_state.long_term_watchlist.append(fetch_watchlist_row(new_ticker))
             save_watchlist(st.session_state.long_term_watchlist)
             st.success(f"Added {new_ticker} to your long-term investing watchlist.")
 
@@ -131,24 +242,17 @@ def run():
     else:
         watchlist_data = []
         for item in st.session_state.long_term_watchlist:
-            ticker = item.get("ticker", item.get("Ticker", ""))
-            fundamentals = fetch_fundamental_data(ticker)
-            price, sym = get_current_price_and_currency(ticker)
-            cagr_5y = compute_historical_cagr(ticker)
-            watchlist_data.append({
-                "ticker": ticker,
-                "Company": fundamentals["Company"],
-                "Current Price": f"{sym}{price:.2f}" if price else "N/A",
-                "5Y CAGR (%)": round(cagr_5y * 100, 2) if cagr_5y else "N/A",
-                "Forward P/E": fundamentals["Forward P/E"],
-                "Trailing P/E": fundamentals["Trailing P/E"],
-                "Market Cap": fundamentals["Market Cap"]
-            })
+            watchlist_data.append(fetch_watchlist_row(item.get("ticker", item.get("Ticker", ""))))
         st.session_state.long_term_watchlist = watchlist_data
         save_watchlist(watchlist_data)
         df_watchlist = pd.DataFrame(watchlist_data)
         st.dataframe(df_watchlist, use_container_width=True, height=400)
 
+        # The table already fetched each 5-year history; only the charts are left to warm.
+        prefetch.schedule("long_term", prefetch.prioritise(all_tickers, recent=prefetch.recently_viewed("long_term")), lambda t: [fetch_history_chart(t)])
+
+        render_allocation_optimizer(all_tickers)
+
         st.subheader("Deep Analysis")
         st.write("""
         Select a ticker for in-depth long-term analysis, including fundamental data, historical performance, and a conclusion.
@@ -159,15 +263,18 @@ def run():
         """)
         chosen_ticker = st.selectbox("Select a Ticker for Deep Analysis", options=[""] + all_tickers, help="Choose a ticker to see in-depth long-term analysis.")
         if chosen_ticker:
+            prefetch.note_viewed("long_term", chosen_ticker)
             fundamentals = fetch_fundamental_data(chosen_ticker)
             price, sym = get_current_price_and_currency(chosen_ticker)
             cagr_5y = compute_historical_cagr(chosen_ticker)
             conclusion = generate_long_term_conclusion(cagr_5y, fundamentals)
+            base_price = price_in_base(price, fundamentals["Currency"])
+            base_sym = fx_rates.currency_symbol(fx_rates.BASE_CURRENCY)
 
             with st.expander("Fundamental Data", expanded=True):
                 st.table(pd.DataFrame(list(fundamentals.items()), columns=["Metric", "Value"]))
 
-            st.write(f"**Current Price:** {sym}{price:.2f}" if price else "**Current Price:** N/A")
+            st.write(f"**Current Price:** {sym}{price:.2f} ({fx_rates.format_price(base_price, fx_rates.BASE_CURRENCY)})" if price else "**Current Price:** N/A")
             st.write(f"**5-Year Historical CAGR:** {cagr_5y * 100:.2f}%" if cagr_5y else "N/A")
             st.write(f"**Conclusion:** {conclusion}")
             st.write("""
@@ -175,27 +282,24 @@ def run():
             """)
 
             st.write("### Historical Performance (5 Years)")
-            df_hist = yf.download(chosen_ticker, period="5y", interval="1d", progress=False)
-            if not df_hist.empty:
-                fig_hist, ax = plt.subplots(figsize=(12, 6))
-                ax.plot(df_hist.index, df_hist["Close"], label="Close Price", color="blue")
-                ax.set_title(f"{chosen_ticker} - 5-Year Historical Performance")
-                ax.set_xlabel("Date")
-                ax.set_ylabel(f"Price ({sym})")
-                ax.legend()
-                ax.grid(True, linestyle="--", alpha=0.7)
-                st.pyplot(fig_hist)
+            history_png = fetch_history_chart(chosen_ticker)
+            if history_png is not None:
+                st.image(history_png, use_container_width=True)
             else:
                 st.warning("Historical data not available.")
 
             st.write("### Future Price Projection")
             years = st.selectbox("Projection Duration (Years)", [1, 5, 10, 15, 25], index=1, help="Select the number of years to project future prices.")
-            df_proj = project_future_price(price, years, cagr_5y)
+            df_proj = project_future_price(base_price if base_price is not None else price, years, cagr_5y)
             st.dataframe(df_proj, use_container_width=True)
             fig_proj, ax = plt.subplots(figsize=(10, 5))
             ax.plot(df_proj["Year"], df_proj["Projected Price"], marker="o", color="#008000")  # Green
             ax.set_title(f"Projected Price for {chosen_ticker} (@ {cagr_5y * 100:.2f}% CAGR)")
             ax.set_xlabel("Year")
-            ax.set_ylabel(f"Projected Price ({sym})")
+            ax.set_ylabel(f"Projected Price ({base_sym if base_price is not None else sym})")
             ax.grid(True, linestyle="--", alpha=0.7)
-            st.pyplot(fig_proj)
\ No newline at end of file
+            with span("matplotlib.render", ticker=chosen_ticker):
+                st.pyplot(fig_proj)
+            plt.close(fig_proj)
+
+    render_fundamentals_screener(all_tickers)
\ No newline at end of file
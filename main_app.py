@@ -1,4 +1,7 @@
 import streamlit as st
+import tracing
+import provider_health
+import prefetch
 
 st.set_page_config(page_title="Trading Signals for Beginners", layout="wide", page_icon="📊")
 
@@ -43,6 +46,8 @@ page = st.sidebar.radio("Go to:", [
     "Stock Analysis",
     "Long-Term Investments",
     "Top 25 Stocks",
+    "Portfolio Risk",
+    "Paper Trading",
     "Education Hub",
     "Legal"
 ])
@@ -50,22 +55,36 @@ page = st.sidebar.radio("Go to:", [
 # Remove the dynamic ID for wallpapers
 # st.markdown(f'<div id="{page.replace(" ", "-")}" style="height: 100vh; width: 100%;"></div>', unsafe_allow_html=True)
 
-if page == "Stock Analysis":
-    import stock_analysis
-    stock_analysis.run()
+trace = tracing.start_trace(page)
+try:
+    if page == "Stock Analysis":
+        import stock_analysis
+        stock_analysis.run()
 
-elif page == "Long-Term Investments":
-    import long_term_investments
-    long_term_investments.run()
+    elif page == "Long-Term Investments":
+        import long_term_investments
+        long_term_investments.run()
 
-elif page == "Top 25 Stocks":
-    import top_25_stocks
-    top_25_stocks.run()
+    elif page == "Top 25 Stocks":
+        import top_25_stocks
+        top_25_stocks.run()
 
-elif page == "Education Hub":
-    import education_hub
-    education_hub.run()
+    elif page == "Portfolio Risk":
+        import portfolio_risk
+        portfolio_risk.run()
 
-elif page == "Legal":
-    import legal_disclaimer
-    legal_disclaimer.run()
\ No newline at end of file
+    elif page == "Paper Trading":
+        import paper_trading
+        paper_trading.run()
+
+    elif page == "Education Hub":
+        import education_hub
+        education_hub.run()
+
+    elif page == "Legal":
+        import legal_disclaimer
+        legal_disclaimer.run()
+finally:
+    tracing.finish_trace(trace)
+    tracing.render_timing_panel(trace, prefetch.prefetch_status())
+    provider_health.render_health_panel()
\ No newline at end of file
@@ -0,0 +1,121 @@
+import pandas as pd
+import yfinance as yf
+import shared_cache
+import price_store
+import provider_health
+from tracing import span, payload_bytes
+
+BATCH_SIZE = 200
+
+def _single_level(df):
+    if df is not None and isinstance(df.columns, pd.MultiIndex):
+        df.columns = df.columns.get_level_values(0)
+    return df
+
+def _history_key(ticker, period, interval, kwargs):
+    return ("history", ticker, period, interval, tuple(sorted(kwargs.items())))
+
+def _empty_frame(df):
+    return df is None or df.empty
+
+def _empty_info(info):
+    # Yahoo answers an unknown symbol with a near-empty dict rather than an error.
+    return not info or not any(info.get(k) for k in ("quoteType", "shortName", "longName", "regularMarketPrice"))
+
+def _stored_adjustment(period, interval, kwargs):
+    """The price_store adjustment that serves this request, or None if it needs its own download."""
+    if interval != "1d" or not period or set(kwargs) - {"auto_adjust"}:
+        return None
+    return "total" if kwargs.get("auto_adjust", True) else "splits"
+
+def download_history(ticker, period="1y", interval="1d", **kwargs):
+    """
+    yf.download for one ticker, traced as a 'yf.download' span and served from the
+    process-wide cache, so concurrent sessions asking for the same frame share one request.
+    Daily bars come from price_store, so every period and adjustment is sliced from one download.
+    """
+    adjust = _stored_adjustment(period, interval, kwargs)
+    if adjust:
+        df = price_store.history(ticker, period, adjust)
+        return df if df is not None else pd.DataFrame()
+    key = _history_key(ticker, period, interval, kwargs)
+    with span("yf.download", ticker=ticker, period=period, interval=interval) as attrs:
+        if provider_health.backing_off(ticker):
+            attrs["cache"] = "negative"
+        try:
+            df, status = shared_cache.get_or_fetch(
+                key,
+                lambda: provider_health.guarded(ticker, lambda: _single_level(yf.download(ticker, period=period, interval=interval, progress=False, **kwargs)), _empty_frame),
+                shared_cache.HISTORY_TTL,
+            )
+        except (provider_health.ProviderUnavailable, provider_health.TickerUnavailable):
+            attrs["cache"] = "negative"
+            return pd.DataFrame()
+        attrs.setdefault("cache", "miss" if status == "miss" else "hit")
+        attrs["rows"] = len(df) if df is not None else 0
+        attrs["bytes"] = payload_bytes(df) if status == "miss" else 0
+    return df.copy() if df is not None else df
+
+def download_histories(tickers, period="1y", interval="1d", **kwargs):
+    """
+    {ticker: frame} for many tickers. Tickers already cached (e.g. by the swing page) are
+    reused; the rest are fetched in batched multi-ticker yf.download calls and cached under
+    the same keys download_history uses.
+    """
+    adjust = _stored_adjustment(period, interval, kwargs)
+    if adjust:
+        return price_store.histories(tickers, period, adjust)
+    frames = {}
+    missing = []
+    for ticker in tickers:
+        df = shared_cache.peek(_history_key(ticker, period, interval, kwargs))
+        if df is not None:
+            frames[ticker] = df
+        else:
+            missing.append(ticker)
+    missing = provider_health.available(missing) if missing else []
+    for start in range(0, len(missing), BATCH_SIZE):
+        batch = missing[start:start + BATCH_SIZE]
+        with span("yf.download", tickers=len(batch), period=period, interval=interval) as attrs:
+            try:
+                data = yf.download(batch, period=period, interval=interval, progress=False, group_by="ticker", **kwargs)
+            except Exception as e:
+                provider_health.record_batch(batch, {}, f"{type(e).__name__}: {e}")
+                raise
+            attrs["cache"] = "miss"
+            attrs["bytes"] = payload_bytes(data)
+        returned = {}
+        for ticker in batch:
+            if data is None or data.empty:
+                continue
+            if isinstance(data.columns, pd.MultiIndex):
+                if ticker not in data.columns.get_level_values(0):
+                    continue
+                df = data[ticker].dropna(how="all")
+            else:
+                df = data.dropna(how="all")
+            if not df.empty:
+                shared_cache.put(_history_key(ticker, period, interval, kwargs), df, shared_cache.HISTORY_TTL)
+                frames[ticker] = returned[ticker] = df
+        provider_health.record_batch(batch, returned)
+    return {t: frames[t].copy() for t in tickers if t in frames}
+
+def fetch_info(ticker):
+    """
+    yf.Ticker(ticker).info, traced as a 'yf.info' span and cached process-wide. Unknown symbols
+    and errors are negative-cached by provider_health, so a bad ticker is not re-requested on
+    every rerun (an error is raised again as TickerUnavailable until its retry time). Empty
+    answers are left out of the shared cache, so the retry actually reaches the provider.
+    """
+    def fetch():
+        info = provider_health.guarded(ticker, lambda: yf.Ticker(ticker).info, _empty_info, "info")
+        return None if _empty_info(info) else info
+
+    with span("yf.info", ticker=ticker) as attrs:
+        if provider_health.backing_off(ticker, "info"):
+            attrs["cache"] = "negative"
+        info, status = shared_cache.get_or_fetch(("info", ticker), fetch, shared_cache.INFO_TTL)
+        info = info or {}
+        attrs.setdefault("cache", "miss" if status == "miss" else "hit")
+        attrs["bytes"] = payload_bytes(info) if status == "miss" else 0
+    return dict(info)
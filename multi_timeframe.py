@@ -0,0 +1,96 @@
+import pandas as pd
+import shared_cache
+import stock_analysis
+from market_data import download_history
+from tracing import span
+
+# Rule, SMA window for the Trend filter (~200 trading days on each scale), confluence weight.
+TIMEFRAMES = {
+    "Monthly": ("ME", 10, 0.2),
+    "Weekly": ("W-FRI", 40, 0.3),
+    "Daily": (None, 200, 0.5),
+}
+INTRADAY_TIMEFRAME = ("Hourly", "1h", 50, 0.2)
+DAILY_BASE = ("5y", "1d")
+INTRADAY_BASE = ("60d", "5m")
+OHLCV_AGGREGATION = {"Open": "first", "High": "max", "Low": "min", "Close": "last", "Volume": "sum"}
+
+def resample_ohlcv(df, rule):
+    """Aggregate base bars into coarser bars locally (no extra download)."""
+    df = stock_analysis.flatten_columns(df)
+    agg = {col: how for col, how in OHLCV_AGGREGATION.items() if col in df.columns}
+    return df.resample(rule).agg(agg).dropna(subset=["Close"])
+
+def confluence_signal(strengths, weights):
+    """Weighted mean of per-timeframe strengths, mapped back onto the swing signal labels."""
+    total = sum(weights[tf] for tf in strengths)
+    if not total:
+        return "N/A", 0.0
+    score = sum(strengths[tf] * weights[tf] for tf in strengths) / total
+    if score >= 60:
+        signal = "🔥 STRONG BUY"
+    elif score >= 30:
+        signal = "💡 BUY"
+    elif score <= -60:
+        signal = "🔴 STRONG SELL"
+    elif score <= -30:
+        signal = "🚫 SELL"
+    else:
+        signal = "⚖️ HOLD"
+    return signal, round(score, 1)
+
+def _timeframe_row(name, df, sma_window):
+    df_ind = stock_analysis.compute_indicators(df.copy(), sma_window) if df is not None and not df.empty else None
+    if df_ind is None:
+        return {"Timeframe": name, "Bars": 0 if df is None else len(df), "Signal": "N/A", "Strength": 0, "Trend": "N/A", "RSI14": None, "Close": None}, None
+    last_row = df_ind.iloc[-1]
+    signal, strength = stock_analysis.generate_signal_and_strength(last_row)
+    return {
+        "Timeframe": name,
+        "Bars": len(df),
+        "Signal": signal,
+        "Strength": strength,
+        "Trend": last_row["Trend"],
+        "RSI14": round(float(last_row["RSI14"]), 1),
+        "Close": round(float(last_row["Close"]), 2),
+    }, df_ind
+
+def _compute_multi_timeframe(ticker, include_intraday):
+    base = download_history(ticker, period=DAILY_BASE[0], interval=DAILY_BASE[1], auto_adjust=True)
+    if base is None or base.empty:
+        return None
+    base = stock_analysis.flatten_columns(base)
+    rows, frames, strengths, weights = [], {}, {}, {}
+    with span("multi_timeframe", ticker=ticker):
+        for name, (rule, sma_window, weight) in TIMEFRAMES.items():
+            bars = base if rule is None else resample_ohlcv(base, rule)
+            row, df_ind = _timeframe_row(name, bars, sma_window)
+            rows.append(row)
+            frames[name] = df_ind
+            if row["Signal"] != "N/A":
+                strengths[name], weights[name] = row["Strength"], weight
+        if include_intraday:
+            name, rule, sma_window, weight = INTRADAY_TIMEFRAME
+            intraday = download_history(ticker, period=INTRADAY_BASE[0], interval=INTRADAY_BASE[1], auto_adjust=True)
+            bars = resample_ohlcv(intraday, rule) if intraday is not None and not intraday.empty else None
+            row, df_ind = _timeframe_row(name, bars, sma_window)
+            rows.append(row)
+            frames[name] = df_ind
+            if row["Signal"] != "N/A":
+                strengths[name], weights[name] = row["Strength"], weight
+    signal, score = confluence_signal(strengths, weights)
+    aligned = len(strengths) > 1 and (all(s > 0 for s in strengths.values()) or all(s < 0 for s in strengths.values()))
+    return {"table": pd.DataFrame(rows), "frames": frames, "signal": signal, "score": score, "aligned": aligned}
+
+def fetch_multi_timeframe_summary(ticker, include_intraday=False):
+    """
+    Indicators and signals on monthly, weekly and daily bars (plus hourly when include_intraday)
+    from one daily base series, with a weighted confluence signal. Returns a dict with
+    'table', 'frames' (per-timeframe indicator frames), 'signal', 'score' and 'aligned', or None.
+    """
+    result, _ = shared_cache.get_or_fetch(
+        ("multi_timeframe", ticker, include_intraday),
+        lambda: _compute_multi_timeframe(ticker, include_intraday),
+        shared_cache.INDICATOR_TTL,
+    )
+    return result
@@ -0,0 +1,335 @@
+import sys
+import sqlite3
+import argparse
+import datetime
+import numpy as np
+import pandas as pd
+import streamlit as st
+import matplotlib.pyplot as plt
+from market_data import download_histories
+from tracing import span
+import fx_rates
+import symbol_directory
+
+# Fills are the only source of truth and are never updated or deleted (triggers enforce it).
+# Positions, open lots, per-signal attribution and the account are projections kept up to
+# date in the same transaction as each fill, so a render reads a handful of small tables
+# instead of replaying the log. --rebuild replays it once if a projection is ever in doubt.
+# The equity table is the daily mark history, which the fills alone cannot reproduce.
+PAPER_DB = "paper_trades.db"
+STARTING_CASH = 100000.0
+MANUAL_SIGNAL = "Manual"
+RECENT_FILLS = 50
+MARK_PERIOD = "5d"
+SIDES = ["BUY", "SELL"]
+# Quantities this close to zero are treated as flat, so float rounding never leaves dust lots.
+EPSILON = 1e-9
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fills (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, created TEXT, ticker TEXT, side TEXT, quantity REAL,
+    price REAL, currency TEXT, fx REAL, signal TEXT, note TEXT);
+CREATE INDEX IF NOT EXISTS fills_ticker ON fills (ticker);
+CREATE TRIGGER IF NOT EXISTS fills_no_update BEFORE UPDATE ON fills BEGIN SELECT RAISE(ABORT, 'fills are append-only'); END;
+CREATE TRIGGER IF NOT EXISTS fills_no_delete BEFORE DELETE ON fills BEGIN SELECT RAISE(ABORT, 'fills are append-only'); END;
+CREATE TABLE IF NOT EXISTS lots (
+    fill_id INTEGER PRIMARY KEY, ticker TEXT, signal TEXT, quantity REAL, price REAL, fx REAL);
+CREATE INDEX IF NOT EXISTS lots_ticker ON lots (ticker, fill_id);
+CREATE TABLE IF NOT EXISTS positions (
+    ticker TEXT PRIMARY KEY, quantity REAL, cost REAL, realized REAL, currency TEXT,
+    mark_price REAL, mark_fx REAL, mark_date TEXT);
+CREATE TABLE IF NOT EXISTS attribution (
+    signal TEXT PRIMARY KEY, fills INTEGER, closed INTEGER, wins INTEGER, realized REAL);
+CREATE TABLE IF NOT EXISTS account (
+    id INTEGER PRIMARY KEY CHECK (id = 1), cash REAL, realized REAL, last_fill_id INTEGER);
+CREATE TABLE IF NOT EXISTS equity (
+    date TEXT PRIMARY KEY, cash REAL, market_value REAL, cost REAL, realized REAL, unrealized REAL);
+"""
+PROJECTIONS = ["lots", "positions", "attribution", "account"]
+
+def open_ledger(path=PAPER_DB):
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.executescript(SCHEMA)
+    conn.execute("INSERT OR IGNORE INTO account (id, cash, realized, last_fill_id) VALUES (1, ?, 0, 0)", (STARTING_CASH,))
+    conn.commit()
+    return conn
+
+def fx_rate(currency, base=fx_rates.BASE_CURRENCY):
+    """Today's multiplier from currency (a major unit) into base; None when the FX series is unavailable."""
+    rate = fx_rates.rates_on(pd.DatetimeIndex([pd.Timestamp.today()]), currency, base)[0]
+    return None if np.isnan(rate) else float(rate)
+
+def _apply(conn, fill):
+    """
+    Project one fill: close open lots of the other side first-in first-out (realised P&L goes
+    to the signal that opened each lot), open a lot with whatever is left, and move the
+    position, the signal's attribution and the account. Amounts are in the base currency.
+    """
+    fill_id, ticker, side, quantity, price, currency, fx, signal = fill
+    signed = quantity if side == "BUY" else -quantity
+    value = price * fx
+    remaining = signed
+    realized = 0.0
+    closed_cost = 0.0
+    # Only lots on the other side can be closed, so a long run of buys never rereads its own lots.
+    lots = conn.execute("SELECT fill_id, signal, quantity, price, fx FROM lots WHERE ticker = ? AND quantity * ? < 0 ORDER BY fill_id", (ticker, signed)).fetchall()
+    for lot_id, lot_signal, lot_quantity, lot_price, lot_fx in lots:
+        if abs(remaining) < EPSILON:
+            break
+        closed = np.sign(lot_quantity) * min(abs(lot_quantity), abs(remaining))
+        pnl = closed * (value - lot_price * lot_fx)
+        realized += pnl
+        closed_cost += closed * lot_price * lot_fx
+        remaining += closed
+        conn.execute("INSERT OR IGNORE INTO attribution (signal, fills, closed, wins, realized) VALUES (?, 0, 0, 0, 0)", (lot_signal,))
+        conn.execute("UPDATE attribution SET closed = closed + 1, wins = wins + ?, realized = realized + ? WHERE signal = ?", (int(pnl > 0), pnl, lot_signal))
+        if abs(lot_quantity - closed) < EPSILON:
+            conn.execute("DELETE FROM lots WHERE fill_id = ?", (lot_id,))
+        else:
+            conn.execute("UPDATE lots SET quantity = ? WHERE fill_id = ?", (lot_quantity - closed, lot_id))
+    if abs(remaining) >= EPSILON:
+        conn.execute("INSERT INTO lots (fill_id, ticker, signal, quantity, price, fx) VALUES (?, ?, ?, ?, ?, ?)", (fill_id, ticker, signal, remaining, price, fx))
+    conn.execute("INSERT OR IGNORE INTO attribution (signal, fills, closed, wins, realized) VALUES (?, 0, 0, 0, 0)", (signal,))
+    conn.execute("UPDATE attribution SET fills = fills + 1 WHERE signal = ?", (signal,))
+    conn.execute(
+        """INSERT INTO positions (ticker, quantity, cost, realized, currency, mark_price, mark_fx, mark_date) VALUES (?, ?, ?, ?, ?, ?, ?, NULL)
+           ON CONFLICT (ticker) DO UPDATE SET quantity = quantity + excluded.quantity, cost = cost + excluded.cost, realized = realized + excluded.realized,
+                                              mark_price = excluded.mark_price, mark_fx = excluded.mark_fx""",
+        (ticker, signed, remaining * value - closed_cost, realized, currency, price, fx),
+    )
+    conn.execute("UPDATE account SET cash = cash - ?, realized = realized + ?, last_fill_id = ? WHERE id = 1", (signed * value, realized, fill_id))
+
+def record_fill(conn, ticker, side, quantity, price, currency="USD", signal=MANUAL_SIGNAL, note="", fx=None, created=None):
+    """
+    Append a fill and update every projection in the same transaction. A price quoted in a
+    minor unit (250 GBp) is stored in the major one (2.50 GBP). fx is the currency's rate into the base currency; today's is used if
+    omitted (1.0 if the FX series is unavailable). Returns the fill id.
+    """
+    if side not in SIDES:
+        raise ValueError(f"side must be one of {SIDES}")
+    if not quantity or quantity <= 0 or not price or price <= 0:
+        raise ValueError("quantity and price must be positive")
+    price, currency = fx_rates.to_major(price, currency)
+    fx = fx or fx_rate(currency) or 1.0
+    created = created or datetime.datetime.now().isoformat(timespec="seconds")
+    with span("paper.fill", ticker=ticker), conn:
+        cursor = conn.execute(
+            "INSERT INTO fills (created, ticker, side, quantity, price, currency, fx, signal, note) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (created, ticker, side, float(quantity), float(price), currency, fx, signal or MANUAL_SIGNAL, note),
+        )
+        _apply(conn, (cursor.lastrowid, ticker, side, float(quantity), float(price), currency, fx, signal or MANUAL_SIGNAL))
+    return cursor.lastrowid
+
+def catch_up(conn):
+    """Project fills appended after the last one applied (e.g. written by another tool); returns how many."""
+    last = conn.execute("SELECT last_fill_id FROM account WHERE id = 1").fetchone()[0]
+    pending = conn.execute("SELECT id, ticker, side, quantity, price, currency, fx, signal FROM fills WHERE id > ? ORDER BY id", (last,)).fetchall()
+    with conn:
+        for fill in pending:
+            _apply(conn, fill)
+    return len(pending)
+
+def rebuild(conn):
+    """Drop every projection and replay the whole fill log; marks and the daily equity history are kept."""
+    marks = conn.execute("SELECT mark_price, mark_fx, mark_date, ticker FROM positions WHERE mark_date IS NOT NULL").fetchall()
+    with conn:
+        for table in PROJECTIONS:
+            conn.execute(f"DELETE FROM {table}")
+        conn.execute("INSERT INTO account (id, cash, realized, last_fill_id) VALUES (1, ?, 0, 0)", (STARTING_CASH,))
+    replayed = catch_up(conn)
+    with conn:
+        conn.executemany("UPDATE positions SET mark_price = ?, mark_fx = ?, mark_date = ? WHERE ticker = ?", marks)
+    return replayed
+
+def mark_to_market(conn, marks, as_of=None):
+    """
+    Re-mark open positions from marks {ticker: (price in major unit, fx into base or None to
+    keep the last rate)}. Only tickers whose price or rate moved are written. Then today's
+    equity row is refreshed from the position totals. Returns the number of positions re-marked.
+    """
+    as_of = as_of or datetime.date.today().isoformat()
+    current = {t: (p, f) for t, p, f in conn.execute("SELECT ticker, mark_price, mark_fx FROM positions WHERE ABS(quantity) > ?", (EPSILON,))}
+    changed = []
+    for ticker, (price, fx) in marks.items():
+        if ticker not in current or price is None or np.isnan(price):
+            continue
+        mark = (price, fx if fx is not None else current[ticker][1])
+        if mark != current[ticker]:
+            changed.append((*mark, as_of, ticker))
+    with span("paper.mark", positions=len(current), changed=len(changed)), conn:
+        conn.executemany("UPDATE positions SET mark_price = ?, mark_fx = ?, mark_date = ? WHERE ticker = ?", changed)
+        conn.execute(
+            """INSERT OR REPLACE INTO equity (date, cash, market_value, cost, realized, unrealized)
+               SELECT ?, a.cash, COALESCE(SUM(p.quantity * p.mark_price * p.mark_fx), 0), COALESCE(SUM(p.cost), 0), a.realized,
+                      COALESCE(SUM(p.quantity * p.mark_price * p.mark_fx - p.cost), 0)
+               FROM account a LEFT JOIN positions p ON ABS(p.quantity) > ? WHERE a.id = 1""",
+            (as_of, EPSILON),
+        )
+    return len(changed)
+
+def latest_marks(tickers):
+    """{ticker: (last close in its major unit, fx into base)} from the shared daily price store."""
+    frames = download_histories(tickers, period=MARK_PERIOD, interval="1d", auto_adjust=True)
+    marks = {}
+    for ticker, df in frames.items():
+        if df is None or df.empty or "Close" not in df.columns:
+            continue
+        price, currency = fx_rates.to_major(float(df["Close"].iloc[-1]), fx_rates.ticker_currency(ticker))
+        marks[ticker] = (price, fx_rate(currency))
+    return marks
+
+def open_tickers(conn):
+    return [row[0] for row in conn.execute("SELECT ticker FROM positions WHERE ABS(quantity) > ?", (EPSILON,))]
+
+def positions_table(conn):
+    return pd.read_sql_query(
+        """SELECT ticker AS Ticker, quantity AS Quantity, currency AS Currency, cost / quantity / mark_fx AS "Avg Cost",
+                  mark_price AS "Last Price", mark_date AS "Marked", quantity * mark_price * mark_fx AS "Market Value (£)",
+                  quantity * mark_price * mark_fx - cost AS "Unrealised P&L (£)", realized AS "Realised P&L (£)"
+           FROM positions WHERE ABS(quantity) > ? ORDER BY ticker""",
+        conn, params=(EPSILON,),
+    )
+
+def attribution_table(conn):
+    """Per signal: fills, closed lots, win rate, realised and (from the open lots) unrealised P&L."""
+    df = pd.read_sql_query(
+        """SELECT a.signal AS Signal, a.fills AS Fills, a.closed AS Closed, a.wins AS Wins, a.realized AS "Realised P&L (£)",
+                  COALESCE(u.unrealized, 0) AS "Unrealised P&L (£)"
+           FROM attribution a LEFT JOIN (
+               SELECT l.signal, SUM(l.quantity * (p.mark_price * p.mark_fx - l.price * l.fx)) AS unrealized
+               FROM lots l JOIN positions p ON p.ticker = l.ticker GROUP BY l.signal) u ON u.signal = a.signal""",
+        conn,
+    )
+    df["Win Rate (%)"] = np.where(df["Closed"] > 0, df["Wins"] / df["Closed"].where(df["Closed"] > 0) * 100, np.nan)
+    df["Total P&L (£)"] = df["Realised P&L (£)"] + df["Unrealised P&L (£)"]
+    return df.drop(columns="Wins").sort_values("Total P&L (£)", ascending=False)
+
+def account_summary(conn):
+    cash, realized = conn.execute("SELECT cash, realized FROM account WHERE id = 1").fetchone()
+    market_value, unrealized = conn.execute(
+        "SELECT COALESCE(SUM(quantity * mark_price * mark_fx), 0), COALESCE(SUM(quantity * mark_price * mark_fx - cost), 0) FROM positions WHERE ABS(quantity) > ?",
+        (EPSILON,),
+    ).fetchone()
+    return {"cash": cash, "market_value": market_value, "equity": cash + market_value, "realized": realized, "unrealized": unrealized}
+
+def recent_fills(conn, limit=RECENT_FILLS):
+    return pd.read_sql_query(
+        """SELECT id AS "#", created AS Time, ticker AS Ticker, side AS Side, quantity AS Quantity, price AS Price,
+                  currency AS Currency, signal AS Signal, note AS Note FROM fills ORDER BY id DESC LIMIT ?""",
+        conn, params=(limit,),
+    )
+
+def equity_history(conn):
+    return pd.read_sql_query("SELECT * FROM equity ORDER BY date", conn, parse_dates=["date"], index_col="date")
+
+def default_side(signal):
+    return "SELL" if signal and "SELL" in signal else "BUY"
+
+def render_record_control(ticker, signal, price, currency, key):
+    """
+    Form under a deep analysis that records a paper trade on the current signal. price is the
+    last close as quoted (minor units included); it is entered and stored in the major unit.
+    """
+    price, major = fx_rates.to_major(price, currency) if price is not None else (None, fx_rates.major_currency(currency)[0])
+    with st.form(f"{key}_paper_trade"):
+        st.write(f"**Paper Trade {ticker}** on signal {signal or MANUAL_SIGNAL}")
+        col1, col2, col3 = st.columns(3)
+        side = col1.radio("Side", SIDES, index=SIDES.index(default_side(signal)), horizontal=True)
+        quantity = col2.number_input("Quantity", min_value=0.0, value=10.0, step=1.0)
+        fill_price = col3.number_input(f"Price ({major})", min_value=0.0, value=float(price or 0.0), format="%.4f")
+        note = st.text_input("Note", value="")
+        if st.form_submit_button("Record Paper Trade"):
+            conn = open_ledger()
+            try:
+                record_fill(conn, ticker, side, quantity, fill_price, major, signal or MANUAL_SIGNAL, note)
+                st.success(f"Recorded {side} {quantity:g} {ticker} @ {fx_rates.currency_symbol(major)}{fill_price:.2f} in the paper ledger.")
+            except ValueError as e:
+                st.error(str(e))
+            finally:
+                conn.close()
+
+def plot_equity_curve(history):
+    fig, ax = plt.subplots(figsize=(12, 4))
+    ax.plot(history.index, history["cash"] + history["market_value"], color="blue", label="Equity")
+    ax.axhline(STARTING_CASH, color="gray", linestyle="--", label="Starting Cash")
+    ax.set_title("Paper Portfolio Equity (£)")
+    ax.legend()
+    ax.grid(True, linestyle="--", alpha=0.7)
+    return fig
+
+def run():
+    st.title("🧾 Paper Trading Ledger")
+    st.write(f"""
+    Record trades on the app's signals without risking money, and see which signals actually pay.
+    Every fill is kept in an append-only log; positions and P&L are kept up to date as trades are recorded and prices move.
+    **Guidance:** Amounts are in GBP, starting from £{STARTING_CASH:,.0f} of paper cash. Record trades from the deep analysis on the
+    Stock Analysis and Top 25 pages (the triggering signal is saved with the trade) or manually below.
+    - **Attribution**: P&L is credited to the signal that opened each position, so you can compare STRONG BUY with BUY, and so on.
+    - **Tip:** Judge a signal on many closed trades, not one.
+    """)
+    conn = open_ledger()
+    try:
+        catch_up(conn)
+        tickers = open_tickers(conn)
+        if tickers:
+            mark_to_market(conn, latest_marks(tickers))
+        summary = account_summary(conn)
+        m1, m2, m3, m4, m5 = st.columns(5)
+        m1.metric("Equity", f"£{summary['equity']:,.2f}", f"{(summary['equity'] / STARTING_CASH - 1) * 100:+.2f}%")
+        m2.metric("Cash", f"£{summary['cash']:,.2f}")
+        m3.metric("Market Value", f"£{summary['market_value']:,.2f}")
+        m4.metric("Unrealised P&L", f"£{summary['unrealized']:,.2f}")
+        m5.metric("Realised P&L", f"£{summary['realized']:,.2f}")
+
+        st.subheader("Open Positions")
+        positions = positions_table(conn)
+        if positions.empty:
+            st.info("No open paper positions.")
+        else:
+            st.dataframe(positions.round(2), use_container_width=True, hide_index=True)
+
+        st.subheader("Performance by Signal")
+        attribution = attribution_table(conn)
+        if not attribution.empty:
+            st.dataframe(attribution.round(2), use_container_width=True, hide_index=True)
+
+        history = equity_history(conn)
+        if len(history) > 1:
+            fig = plot_equity_curve(history)
+            with span("matplotlib.render"):
+                st.pyplot(fig)
+            plt.close(fig)
+
+        st.subheader("Record a Manual Trade")
+        ticker = symbol_directory.ticker_input("Ticker", key="paper_add")
+        if ticker:
+            marks = latest_marks([ticker])
+            currency = fx_rates.ticker_currency(ticker)
+            last = marks[ticker][0] / fx_rates.major_currency(currency)[1] if ticker in marks else None
+            render_record_control(ticker, MANUAL_SIGNAL, last, currency, key="paper_manual")
+
+        st.subheader("Recent Fills")
+        st.dataframe(recent_fills(conn), use_container_width=True, hide_index=True)
+    finally:
+        conn.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Paper-trading ledger maintenance.")
+    parser.add_argument("--db", default=PAPER_DB)
+    parser.add_argument("--rebuild", action="store_true", help="Replay the whole fill log into fresh positions and attribution.")
+    parser.add_argument("--mark", action="store_true", help="Mark open positions to the latest closes and record today's equity.")
+    args = parser.parse_args(argv)
+    conn = open_ledger(args.db)
+    if args.rebuild:
+        print(f"Replayed {rebuild(conn)} fills")
+    if args.mark:
+        tickers = open_tickers(conn)
+        print(f"Re-marked {mark_to_market(conn, latest_marks(tickers))} of {len(tickers)} open positions")
+    summary = account_summary(conn)
+    print(f"Equity £{summary['equity']:,.2f}  cash £{summary['cash']:,.2f}  unrealised £{summary['unrealized']:,.2f}  realised £{summary['realized']:,.2f}")
+    conn.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,168 @@
+import hashlib
+import numpy as np
+import pandas as pd
+import shared_cache
+from tracing import span
+import portfolio_risk
+
+OPTIMIZER_TTL = 24 * 60 * 60
+FRONTIER_POINTS = 50
+MAX_ITERATIONS = 2000
+TOLERANCE = 1e-8
+
+def project_capped_simplex(v, cap=1.0):
+    """
+    Exact Euclidean projection of v onto {w : sum(w) = 1, 0 <= w <= cap}. The mass
+    g(tau) = sum(clip(v - tau, 0, cap)) is piecewise linear in tau, so it is evaluated at
+    every breakpoint with sorted cumulative sums and interpolated in the crossing segment.
+    """
+    v = np.asarray(v, dtype=np.float64)
+    n = len(v)
+    cap = max(cap, 1.0 / n)
+    v_sorted = np.sort(v)
+    csum = np.concatenate([[0.0], np.cumsum(v_sorted)])
+    taus = np.sort(np.concatenate([v_sorted, v_sorted - cap]))
+    # Entries above tau + cap contribute cap; entries in (tau, tau + cap] contribute v - tau.
+    hi = np.searchsorted(v_sorted, taus + cap, side="right")
+    lo = np.searchsorted(v_sorted, taus, side="right")
+    mass = (n - hi) * cap + (csum[hi] - csum[lo]) - (hi - lo) * taus
+    k = np.searchsorted(-mass, -1.0)
+    if k == 0:
+        tau = taus[0]
+    elif k >= len(taus):
+        tau = taus[-1]
+    else:
+        t0, t1, m0, m1 = taus[k - 1], taus[k], mass[k - 1], mass[k]
+        tau = t0 if m0 == m1 else t0 + (m0 - 1.0) * (t1 - t0) / (m0 - m1)
+    return np.clip(v - tau, 0.0, cap)
+
+def _lipschitz(cov):
+    return max(np.linalg.eigvalsh(cov)[-1], 1e-12)
+
+def _solve_qp(cov, mu, risk_aversion, cap, w0=None, lipschitz=None):
+    """
+    min 0.5 w'Cw - risk_aversion * mu'w  subject to the capped long-only simplex,
+    by accelerated projected gradient (FISTA) with step 1/L.
+    """
+    n = len(mu)
+    step = 1.0 / (lipschitz or _lipschitz(cov))
+    w = project_capped_simplex(np.full(n, 1.0 / n) if w0 is None else w0, cap)
+    y, t = w.copy(), 1.0
+    for _ in range(MAX_ITERATIONS):
+        w_next = project_capped_simplex(y - step * (cov @ y - risk_aversion * mu), cap)
+        if np.abs(w_next - w).max() < TOLERANCE:
+            w = w_next
+            break
+        # Adaptive restart keeps the momentum from overshooting along the simplex faces.
+        if (y - w_next) @ (w_next - w) > 0:
+            t = 1.0
+        t_next = (1 + np.sqrt(1 + 4 * t * t)) / 2
+        y = w_next + (t - 1) / t_next * (w_next - w)
+        w, t = w_next, t_next
+    return w
+
+def max_return_weights(mu, cap=1.0):
+    """Highest-return capped portfolio: fill the best names up to the cap."""
+    mu = np.asarray(mu, dtype=np.float64)
+    cap = max(cap, 1.0 / len(mu))
+    w = np.zeros(len(mu))
+    remaining = 1.0
+    for i in np.argsort(-mu):
+        w[i] = min(cap, remaining)
+        remaining -= w[i]
+        if remaining <= 0:
+            break
+    return w
+
+def efficient_frontier(mu, cov, cap=1.0, points=FRONTIER_POINTS):
+    """
+    Sweep the risk-aversion trade-off from minimum variance to the maximum-return corner,
+    warm-starting each solve from the previous one. The upper end of the sweep is found by
+    doubling until the solution reaches the max-return portfolio, so points are not wasted
+    past it. Returns a list of {'weights', 'return', 'volatility'}.
+    """
+    mu = np.asarray(mu, dtype=np.float64)
+    lipschitz = _lipschitz(cov)
+    max_return = float(mu @ max_return_weights(mu, cap))
+    w_min = _solve_qp(cov, mu, 0.0, cap, lipschitz=lipschitz)
+    top = lipschitz / max(np.abs(mu).max(), 1e-12) * 1e-3
+    w = w_min
+    for _ in range(40):
+        w = _solve_qp(cov, mu, top, cap, w, lipschitz)
+        if mu @ w >= max_return - 1e-6 * max(abs(max_return), 1e-12):
+            break
+        top *= 2
+    frontier = [w_min]
+    w = w_min
+    for risk_aversion in np.geomspace(top * 1e-4, top, points - 1):
+        w = _solve_qp(cov, mu, risk_aversion, cap, w, lipschitz)
+        frontier.append(w)
+    return [{"weights": w, "return": float(mu @ w), "volatility": float(np.sqrt(w @ cov @ w))} for w in frontier]
+
+def max_sharpe_point(frontier, risk_free=0.0):
+    sharpes = [(p["return"] - risk_free) / p["volatility"] if p["volatility"] > 0 else -np.inf for p in frontier]
+    return frontier[int(np.argmax(sharpes))]
+
+def risk_parity_weights(cov, cap=1.0, sweeps=500):
+    """
+    Equal risk contribution weights by cyclical coordinate descent on
+    0.5 y'Cy - sum(log y) / n, then normalised and projected onto the position caps.
+    """
+    n = len(cov)
+    diag = np.diag(cov)
+    y = 1.0 / np.sqrt(diag)
+    y /= y.sum()
+    cy = cov @ y
+    budget = 1.0 / n
+    for _ in range(sweeps):
+        y_prev = y.copy()
+        for i in range(n):
+            b = cy[i] - diag[i] * y[i]
+            y_i = (-b + np.sqrt(b * b + 4 * diag[i] * budget)) / (2 * diag[i])
+            cy += cov[:, i] * (y_i - y[i])
+            y[i] = y_i
+        if np.abs(y - y_prev).max() < TOLERANCE * max(y.max(), 1.0):
+            break
+    return project_capped_simplex(y / y.sum(), cap)
+
+def price_store_version(returns):
+    """Fingerprint of the return matrix the weights were solved on; any new bar or ticker changes it."""
+    digest = hashlib.sha1()
+    digest.update(",".join(returns.columns).encode())
+    digest.update(str(returns.index[-1] if len(returns) else "").encode())
+    digest.update(np.ascontiguousarray(returns.to_numpy(dtype=np.float64)).tobytes())
+    return digest.hexdigest()
+
+def optimise_allocations(returns, cap=1.0, risk_free=0.0, points=FRONTIER_POINTS):
+    """
+    Min-variance, max-Sharpe and risk-parity weights plus the efficient frontier, all annualised,
+    cached against the price-store version so reruns over unchanged prices are free.
+    """
+    key = ("optimizer", price_store_version(returns), round(cap, 6), round(risk_free, 6), points)
+
+    def solve():
+        with span("portfolio.optimise", tickers=returns.shape[1], points=points):
+            cov_df, _ = portfolio_risk.covariance_matrix(returns)
+            cov = cov_df.to_numpy() * portfolio_risk.TRADING_DAYS
+            mu = returns.to_numpy().mean(axis=0) * portfolio_risk.TRADING_DAYS
+            frontier = efficient_frontier(mu, cov, cap, points)
+            best = max_sharpe_point(frontier, risk_free)
+            min_var = frontier[0]["weights"]
+            rp = risk_parity_weights(cov, cap)
+            weights = pd.DataFrame({
+                "Min Variance": min_var,
+                "Max Sharpe": best["weights"],
+                "Risk Parity": rp,
+            }, index=returns.columns)
+            stats = pd.DataFrame({
+                name: {
+                    "Expected Return": float(mu @ w),
+                    "Volatility": float(np.sqrt(w @ cov @ w)),
+                    "Sharpe": float((mu @ w - risk_free) / np.sqrt(w @ cov @ w)) if w @ cov @ w > 0 else np.nan,
+                } for name, w in weights.items()
+            })
+            frontier_df = pd.DataFrame([{"Return": p["return"], "Volatility": p["volatility"]} for p in frontier])
+            return {"weights": weights, "stats": stats, "frontier": frontier_df}
+
+    result, _ = shared_cache.get_or_fetch(key, solve, OPTIMIZER_TTL)
+    return result
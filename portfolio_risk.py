@@ -0,0 +1,239 @@
+from statistics import NormalDist
+import streamlit as st
+import pandas as pd
+import numpy as np
+import matplotlib.pyplot as plt
+from market_data import download_histories
+from compact_store import build_panel, panel_field
+from tracing import span
+import fx_rates
+import watchlists
+
+TRADING_DAYS = 252
+BENCHMARKS = {"S&P 500 (^GSPC)": "^GSPC", "FTSE 100 (^FTSE)": "^FTSE", "Nasdaq 100 (^NDX)": "^NDX"}
+MIN_COVERAGE = 0.8
+SHRINKAGE_THRESHOLD = 50
+HEATMAP_LABEL_LIMIT = 40
+
+def watchlist_tickers():
+    """Union of the swing, long-term and dividend watchlists, in first-seen order."""
+    swing = st.session_state.get("swing_watchlist") or watchlists.load_swing_watchlist()
+    long_term = st.session_state.get("long_term_watchlist") or watchlists.load_long_term_watchlist()
+    dividend = st.session_state.get("dividend_watchlist") or watchlists.load_dividend_watchlist()
+    return watchlists.row_tickers(swing + long_term + dividend)
+
+def load_close_matrix(tickers, period="2y", base_currency=None, currencies=None):
+    """
+    Aligned (dates x tickers) close prices, using the same cached downloads as the swing page.
+    With base_currency every column is converted into it (currencies maps ticker -> quote
+    currency; missing ones are looked up from .info).
+    """
+    frames = download_histories(tickers, period=period, interval="1d", auto_adjust=True)
+    panel = build_panel({t: df[["Close"]] for t, df in frames.items() if "Close" in df.columns})
+    if not panel["tickers"]:
+        return pd.DataFrame()
+    closes = panel_field(panel, "Close").astype(np.float64)
+    if base_currency:
+        currencies = dict(currencies or {})
+        for ticker in closes.columns:
+            if not currencies.get(ticker):
+                currencies[ticker] = fx_rates.ticker_currency(ticker)
+        closes = fx_rates.convert_close_matrix(closes, currencies, base_currency)
+    return closes
+
+def build_return_matrix(closes, min_coverage=MIN_COVERAGE):
+    """
+    Daily simple returns; names with too little history are dropped. A gap inside a series (a
+    holiday on its own exchange calendar) carries the last close forward, so the day is flat and
+    the move lands on the next bar; days before a listing or after delisting count as flat too.
+    """
+    closes = closes.sort_index()
+    coverage = closes.notna().mean()
+    closes = closes.loc[:, coverage >= min_coverage].ffill(limit_area="inside")
+    returns = closes.pct_change(fill_method=None).iloc[1:]
+    return returns.dropna(how="all").fillna(0.0)
+
+def ledoit_wolf_covariance(returns):
+    """
+    Ledoit-Wolf shrinkage of the sample covariance towards a scaled identity.
+    Returns (covariance, shrinkage intensity in [0, 1]).
+    """
+    x = returns.to_numpy(dtype=np.float64)
+    n, p = x.shape
+    x = x - x.mean(axis=0)
+    sample = x.T @ x / n
+    mu = np.trace(sample) / p
+    delta = ((sample - mu * np.eye(p)) ** 2).sum() / p
+    x2 = x ** 2
+    beta = ((x2.T @ x2) / n - sample ** 2).sum() / (p * n)
+    shrinkage = 0.0 if delta == 0 else min(beta, delta) / delta
+    cov = shrinkage * mu * np.eye(p) + (1 - shrinkage) * sample
+    return pd.DataFrame(cov, index=returns.columns, columns=returns.columns), shrinkage
+
+def covariance_matrix(returns, shrink=None):
+    """Daily covariance; shrink=None shrinks automatically once the universe is large relative to history."""
+    if shrink is None:
+        shrink = returns.shape[1] >= SHRINKAGE_THRESHOLD or returns.shape[1] > returns.shape[0] / 2
+    if shrink:
+        return ledoit_wolf_covariance(returns)
+    x = returns.to_numpy(dtype=np.float64)
+    return pd.DataFrame(np.cov(x, rowvar=False, bias=True).reshape(x.shape[1], x.shape[1]), index=returns.columns, columns=returns.columns), 0.0
+
+def correlation_from_covariance(cov):
+    std = np.sqrt(np.diag(cov.to_numpy()))
+    std[std == 0] = np.nan
+    corr = cov.to_numpy() / np.outer(std, std)
+    return pd.DataFrame(corr, index=cov.index, columns=cov.columns)
+
+def portfolio_volatility(weights, cov, annualise=True):
+    w = np.asarray(weights, dtype=np.float64)
+    vol = float(np.sqrt(w @ cov.to_numpy() @ w))
+    return vol * np.sqrt(TRADING_DAYS) if annualise else vol
+
+def historical_var_cvar(portfolio_returns, level=0.95):
+    """One-day historical VaR and CVaR as positive loss fractions."""
+    r = np.sort(np.asarray(portfolio_returns, dtype=np.float64))
+    if r.size == 0:
+        return np.nan, np.nan
+    cutoff = max(int(np.floor((1 - level) * r.size)), 1)
+    var = -np.quantile(r, 1 - level)
+    cvar = -r[:cutoff].mean()
+    return float(var), float(cvar)
+
+def parametric_var_cvar(mean, std, level=0.95):
+    """One-day Gaussian VaR and CVaR as positive loss fractions."""
+    z = NormalDist().inv_cdf(1 - level)
+    var = -(mean + z * std)
+    cvar = -(mean - std * NormalDist().pdf(z) / (1 - level))
+    return float(var), float(cvar)
+
+def betas(returns, benchmark_returns):
+    """Beta of every column against the benchmark, in one matrix product."""
+    bench = benchmark_returns.reindex(returns.index).fillna(0.0).to_numpy(dtype=np.float64)
+    x = returns.to_numpy(dtype=np.float64)
+    bench_c = bench - bench.mean()
+    var_b = bench_c @ bench_c
+    if var_b == 0:
+        return pd.Series(np.nan, index=returns.columns)
+    return pd.Series((x - x.mean(axis=0)).T @ bench_c / var_b, index=returns.columns)
+
+def drawdown_series(portfolio_returns):
+    wealth = (1 + portfolio_returns).cumprod()
+    return wealth / wealth.cummax() - 1
+
+def max_drawdowns(returns):
+    """Worst peak-to-trough fall of every column, vectorised over the whole matrix."""
+    wealth = (1 + returns).cumprod()
+    return (wealth / wealth.cummax() - 1).min()
+
+def compute_risk_report(returns, weights, benchmark_returns=None, level=0.95, shrink=None):
+    with span("portfolio.risk", tickers=returns.shape[1], days=returns.shape[0]):
+        cov, shrinkage = covariance_matrix(returns, shrink)
+        portfolio_returns = pd.Series(returns.to_numpy() @ weights, index=returns.index)
+        hist_var, hist_cvar = historical_var_cvar(portfolio_returns, level)
+        param_var, param_cvar = parametric_var_cvar(portfolio_returns.mean(), np.sqrt(weights @ cov.to_numpy() @ weights), level)
+        report = {
+            "cov": cov,
+            "corr": correlation_from_covariance(cov),
+            "shrinkage": shrinkage,
+            "volatility": portfolio_volatility(weights, cov),
+            "portfolio_returns": portfolio_returns,
+            "historical_var": hist_var,
+            "historical_cvar": hist_cvar,
+            "parametric_var": param_var,
+            "parametric_cvar": param_cvar,
+            "drawdown": drawdown_series(portfolio_returns),
+            "max_drawdowns": max_drawdowns(returns),
+        }
+        if benchmark_returns is not None and not benchmark_returns.empty:
+            report["betas"] = betas(returns, benchmark_returns)
+            report["portfolio_beta"] = float(report["betas"].to_numpy() @ weights)
+    return report
+
+def plot_correlation_heatmap(corr):
+    fig, ax = plt.subplots(figsize=(10, 8))
+    im = ax.imshow(corr.to_numpy(), cmap="RdYlGn", vmin=-1, vmax=1)
+    if len(corr) <= HEATMAP_LABEL_LIMIT:
+        ax.set_xticks(range(len(corr)))
+        ax.set_xticklabels(corr.columns, rotation=90)
+        ax.set_yticks(range(len(corr)))
+        ax.set_yticklabels(corr.index)
+    ax.set_title("Correlation Matrix")
+    fig.colorbar(im, ax=ax)
+    return fig
+
+def plot_drawdown(drawdown):
+    fig, ax = plt.subplots(figsize=(12, 4))
+    ax.fill_between(drawdown.index, drawdown * 100, 0, color="red", alpha=0.3)
+    ax.set_title("Portfolio Drawdown")
+    ax.set_ylabel("Drawdown (%)")
+    ax.grid(True, linestyle="--", alpha=0.7)
+    return fig
+
+def run():
+    st.title("🧮 Portfolio Risk – Watchlist Analytics")
+    st.write("""
+    Analyse your watchlists as one portfolio: how the names move together, how volatile the whole basket is, and how much it could lose on a bad day.
+    **Guidance:**
+    - **Correlation**: Names close to +1 move together and add little diversification.
+    - **Volatility**: Annualised standard deviation of the portfolio's daily returns.
+    - **VaR / CVaR**: The one-day loss exceeded only on the worst days (VaR), and the average loss on those days (CVaR).
+    - **Beta**: Sensitivity to the benchmark index; above 1 means the portfolio tends to amplify market moves.
+    - **Drawdown**: How far the portfolio has fallen from its previous peak.
+    - All prices are converted to GBP first, so currency moves are part of the risk of overseas names.
+    """)
+
+    all_tickers = watchlist_tickers()
+    if not all_tickers:
+        st.info("Your watchlists are empty. Add tickers on the Stock Analysis or Long-Term Investments pages first.")
+        return
+
+    tickers = st.multiselect("Tickers in the portfolio", options=all_tickers, default=all_tickers, help="Defaults to every ticker across your watchlists.")
+    col1, col2, col3 = st.columns(3)
+    period = col1.selectbox("History", ["1y", "2y", "5y"], index=1)
+    benchmark_label = col2.selectbox("Benchmark", list(BENCHMARKS))
+    level = col3.selectbox("Confidence Level", [0.95, 0.99], format_func=lambda x: f"{x:.0%}")
+    if not tickers:
+        return
+
+    closes = load_close_matrix(tickers + [BENCHMARKS[benchmark_label]], period, fx_rates.BASE_CURRENCY)
+    benchmark = BENCHMARKS[benchmark_label]
+    benchmark_returns = closes.pop(benchmark).pct_change(fill_method=None).dropna() if benchmark in closes.columns else pd.Series(dtype=float)
+    returns = build_return_matrix(closes)
+    dropped = [t for t in tickers if t not in returns.columns]
+    if dropped:
+        st.warning(f"Not enough price history for: {', '.join(dropped)}")
+    if returns.shape[1] == 0:
+        st.warning("No price data available for the selected tickers.")
+        return
+
+    weights = np.full(returns.shape[1], 1.0 / returns.shape[1])
+    report = compute_risk_report(returns, weights, benchmark_returns, level)
+
+    st.subheader("Portfolio Summary (Equal Weight)")
+    m1, m2, m3, m4 = st.columns(4)
+    m1.metric("Annual Volatility", f"{report['volatility'] * 100:.2f}%")
+    m2.metric(f"1-Day VaR ({level:.0%})", f"{report['historical_var'] * 100:.2f}%", help=f"Parametric: {report['parametric_var'] * 100:.2f}%")
+    m3.metric(f"1-Day CVaR ({level:.0%})", f"{report['historical_cvar'] * 100:.2f}%", help=f"Parametric: {report['parametric_cvar'] * 100:.2f}%")
+    m4.metric("Beta", f"{report['portfolio_beta']:.2f}" if "portfolio_beta" in report else "N/A")
+    if report["shrinkage"]:
+        st.caption(f"Covariance shrunk towards a scaled identity (Ledoit-Wolf intensity {report['shrinkage']:.2f}) because of the universe size.")
+
+    st.subheader("Per-Ticker Risk")
+    per_ticker = pd.DataFrame({
+        "Annual Volatility (%)": (np.sqrt(np.diag(report["cov"].to_numpy()) * TRADING_DAYS) * 100).round(2),
+        "Max Drawdown (%)": (report["max_drawdowns"] * 100).round(2),
+    }, index=returns.columns)
+    if "betas" in report:
+        per_ticker["Beta"] = report["betas"].round(2)
+    st.dataframe(per_ticker, use_container_width=True, height=400)
+
+    st.subheader("Correlation")
+    fig_corr = plot_correlation_heatmap(report["corr"])
+    st.pyplot(fig_corr)
+    plt.close(fig_corr)
+
+    st.subheader("Drawdown")
+    fig_dd = plot_drawdown(report["drawdown"])
+    st.pyplot(fig_dd)
+    plt.close(fig_dd)
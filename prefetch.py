@@ -0,0 +1,195 @@
+import io
+import atexit
+import time
+import threading
+from collections import deque
+import pandas as pd
+import streamlit as st
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import shared_cache
+import provider_health
+import tracing
+from tracing import span
+
+# Once a page's table has rendered, the deep analysis behind its selectbox (indicator frames,
+# chart PNGs) is warmed into the shared cache by one background thread, so picking a ticker is
+# a cache hit. Each session has its own queue per page; all of them draw on one process-wide
+# CPU and memory budget, refilled every BUDGET_WINDOW (by then the warmed entries have expired),
+# so reruns and extra sessions cannot add to the total work.
+MAX_TICKERS = 25
+CPU_SECONDS = 20.0
+MEMORY_BYTES = 256 * 1024 * 1024
+BUDGET_WINDOW = shared_cache.INDICATOR_TTL
+# Pause between tickers so the warm-up does not hold the GIL against page renders.
+PAUSE = 0.05
+RECENT_LIMIT = 10
+# Per-queue stop reasons kept for prefetch_status; the oldest are dropped as sessions come and go.
+STOPPED_LIMIT = 1000
+# At exit, how long to let a ticker being warmed finish rather than killing it mid-render.
+SHUTDOWN_WAIT = 5
+CHART_TTL = shared_cache.INDICATOR_TTL
+# st.pyplot's own resolution, so a cached chart looks the same as one drawn in place.
+CHART_DPI = 200
+SIGNAL_PRIORITY = {"🔥 STRONG BUY": 0, "🔴 STRONG SELL": 0, "💡 BUY": 1, "🚫 SELL": 1, "📈 STRONG HOLD": 2}
+
+_lock = threading.Lock()
+_wakeup = threading.Event()
+_queues = {}
+_worker = None
+_budget = {"cpu_left": CPU_SECONDS, "memory_left": MEMORY_BYTES, "refill_at": 0.0}
+_stats = {"warmed": 0, "failed": 0, "stopped": {}}
+_closing = threading.Event()
+
+def figure_png(fig, dpi=CHART_DPI):
+    """PNG bytes of a matplotlib figure."""
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    return buffer.getvalue()
+
+def cached_chart(key, render):
+    """Chart PNG bytes for key, rendered once per process by render() (None if it has no data)."""
+    with span("chart", key=key[1] if len(key) > 1 else key[0]) as attrs:
+        png, status = shared_cache.get_or_fetch(key, render, CHART_TTL)
+        attrs["cache"] = "miss" if status == "miss" else "hit"
+    return png
+
+def recently_viewed(page):
+    return list(st.session_state.get(f"{page}_recent", []))
+
+def note_viewed(page, ticker):
+    """Remember a ticker picked for deep analysis (most recent first) for this session."""
+    recent = [t for t in recently_viewed(page) if t != ticker]
+    st.session_state[f"{page}_recent"] = [ticker] + recent[:RECENT_LIMIT - 1]
+
+def prioritise(tickers, signals=None, recent=()):
+    """Prefetch order: strongest signals first, then recently viewed, then the rest in table order."""
+    signals = signals or {}
+    recency = {t: i for i, t in enumerate(recent)}
+    order = {t: i for i, t in enumerate(tickers)}
+    return sorted(tickers, key=lambda t: (SIGNAL_PRIORITY.get(signals.get(t), len(SIGNAL_PRIORITY)), recency.get(t, len(recency)), order[t]))
+
+def _size(value):
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (list, tuple)):
+        return sum(_size(v) for v in value)
+    if isinstance(value, dict):
+        return sum(_size(v) for v in value.values())
+    return 0
+
+def _session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx is not None else ""
+
+def schedule(owner, tickers, warm, max_tickers=MAX_TICKERS):
+    """
+    Warm warm(ticker) for tickers, in the given order, in the background. warm returns the
+    objects it cached, which are counted against the memory budget. A later schedule() for
+    the same owner (a page) in the same session replaces whatever of the earlier one has not
+    run yet; other sessions' queues are left alone.
+    """
+    global _worker
+    key = (owner, _session_id())
+    with _lock:
+        _queues[key] = deque((t, warm) for t in list(tickers)[:max_tickers])
+        _stats["stopped"].pop(key, None)
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_run, name="prefetch", daemon=True)
+            _worker.start()
+    _wakeup.set()
+
+def _note_stopped(key, reason):
+    _stats["stopped"].pop(key, None)
+    _stats["stopped"][key] = reason
+    while len(_stats["stopped"]) > STOPPED_LIMIT:
+        del _stats["stopped"][next(iter(_stats["stopped"]))]
+
+def _budget_left(now):
+    """Refill the shared budget once its window has passed; the reason it is spent, or None."""
+    if now >= _budget["refill_at"]:
+        _budget.update(cpu_left=CPU_SECONDS, memory_left=MEMORY_BYTES, refill_at=now + BUDGET_WINDOW)
+    if _budget["cpu_left"] <= 0:
+        return "CPU budget"
+    if _budget["memory_left"] <= 0:
+        return "memory budget"
+    return None
+
+def _next_job():
+    """Round-robin over queues with work left: (key, queue, ticker, warm) or None."""
+    with _lock:
+        spent = _budget_left(time.time())
+        if spent:
+            # Everything queued is dropped; the next rerun after the refill schedules it again.
+            for key in _queues:
+                _note_stopped(key, spent)
+            _queues.clear()
+            return None
+        for key in list(_queues):
+            queue = _queues.pop(key)
+            if queue:
+                ticker, warm = queue.popleft()
+                _queues[key] = queue
+                return key, queue, ticker, warm
+    return None
+
+def _stop(key, queue, reason):
+    with _lock:
+        if _queues.get(key) is queue:
+            del _queues[key]
+        _note_stopped(key, reason)
+
+def _run():
+    while not _closing.is_set():
+        job = _next_job()
+        if job is None:
+            _wakeup.wait()
+            _wakeup.clear()
+            continue
+        key, queue, ticker, warm = job
+        started = time.thread_time()
+        # A trace of its own: the page's trace has usually been exported before the warm-up runs.
+        trace = tracing.start_trace(f"prefetch:{key[0]}")
+        try:
+            with span("prefetch", owner=key[0], ticker=ticker) as attrs:
+                warmed = warm(ticker)
+                attrs["bytes"] = size = _size(warmed)
+            with _lock:
+                _budget["memory_left"] -= size
+            _stats["warmed"] += 1
+        except provider_health.ProviderUnavailable:
+            _stop(key, queue, "provider unavailable")
+            continue
+        except Exception:
+            # The page shows the error when the ticker is picked; prefetch just moves on.
+            _stats["failed"] += 1
+        finally:
+            tracing.finish_trace(trace)
+        with _lock:
+            _budget["cpu_left"] -= time.thread_time() - started
+        if not queue:
+            _stop(key, queue, "done")
+        time.sleep(PAUSE)
+
+def prefetch_status():
+    """Counters, the shared budget left, and for this session's pages the tickers queued or why the last run stopped."""
+    session = _session_id()
+    with _lock:
+        return {
+            "warmed": _stats["warmed"],
+            "failed": _stats["failed"],
+            "cpu_left": max(0.0, _budget["cpu_left"]),
+            "memory_left": max(0, _budget["memory_left"]),
+            "stopped": {owner: reason for (owner, s), reason in _stats["stopped"].items() if s == session},
+            "queued": {owner: len(q) for (owner, s), q in _queues.items() if s == session},
+        }
+
+@atexit.register
+def _shutdown():
+    _closing.set()
+    with _lock:
+        _queues.clear()
+    _wakeup.set()
+    if _worker is not None:
+        _worker.join(SHUTDOWN_WAIT)
@@ -0,0 +1,194 @@
+import numpy as np
+import pandas as pd
+import yfinance as yf
+import shared_cache
+import provider_health
+from tracing import span, payload_bytes
+
+# Every ticker is downloaded once at this length (longer only if a caller asks for more)
+# and shorter periods are sliced from it, so the pages share one set of bytes.
+STORE_PERIOD = "5y"
+PERIOD_ORDER = ["1d", "5d", "1mo", "3mo", "6mo", "ytd", "1y", "2y", "5y", "10y", "max"]
+PERIOD_OFFSETS = {
+    "5d": pd.DateOffset(days=5), "1mo": pd.DateOffset(months=1), "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6), "1y": pd.DateOffset(years=1), "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5), "10y": pd.DateOffset(years=10),
+}
+BAR_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+PRICE_COLUMNS = ["Open", "High", "Low", "Close"]
+# 'total': splits and dividends (what yf.download(auto_adjust=True) returns);
+# 'splits': Yahoo's quoted closes, split-adjusted only; 'raw': the prices as printed at the time.
+ADJUSTMENTS = ["total", "splits", "raw"]
+BATCH_SIZE = 200
+
+def _store_period(period):
+    """The period to download so that period can be sliced from it."""
+    if period not in PERIOD_ORDER:
+        return "max"
+    return period if PERIOD_ORDER.index(period) > PERIOD_ORDER.index(STORE_PERIOD) else STORE_PERIOD
+
+def _covering_periods(period):
+    start = PERIOD_ORDER.index(_store_period(period))
+    return PERIOD_ORDER[start:]
+
+def _event_steps(index, events, close=None):
+    """
+    Per-row multipliers that a reverse cumulative product turns into adjustment factors.
+    An event on date d affects every row before d, so its step sits on the row before d.
+    With close, events are dividends (step 1 - D / previous close); otherwise split ratios.
+    """
+    steps = np.ones(len(index))
+    if events is None or events.empty:
+        return steps
+    positions = index.searchsorted(events.index) - 1
+    for pos, value in zip(positions, events.to_numpy(dtype=np.float64)):
+        if pos < 0 or not value:
+            continue
+        if close is None:
+            steps[pos] *= value
+        elif close[pos] > 0:
+            steps[pos] *= 1 - value / close[pos]
+    return steps
+
+def adjustment_factors(bars, dividends, splits):
+    """
+    Cumulative factors per bar: 'dividend' takes Yahoo's split-adjusted close to the total
+    return series (the Adj Close ratio); 'split' takes it back to the unadjusted price.
+    """
+    close = bars["Close"].to_numpy(dtype=np.float64)
+    dividend = np.cumprod(_event_steps(bars.index, dividends, close)[::-1])[::-1]
+    split = np.cumprod(_event_steps(bars.index, splits)[::-1])[::-1]
+    return pd.DataFrame({"dividend": dividend, "split": split}, index=bars.index)
+
+def _build_store(df):
+    """{'bars', 'dividends', 'splits', 'factors'} from one yf.download(auto_adjust=False, actions=True) frame."""
+    if df is None or df.empty or "Close" not in df.columns:
+        return None
+    df = df.dropna(subset=["Close"])
+    if df.empty:
+        return None
+    bars = df[[c for c in BAR_COLUMNS if c in df.columns]].astype(np.float64)
+    dividends = df["Dividends"] if "Dividends" in df.columns else pd.Series(dtype=np.float64)
+    splits = df["Stock Splits"] if "Stock Splits" in df.columns else pd.Series(dtype=np.float64)
+    dividends = dividends[dividends.fillna(0) > 0].astype(np.float64).rename("Dividend")
+    splits = splits[splits.fillna(0) > 0].astype(np.float64).rename("Split Ratio")
+    return {"bars": bars, "dividends": dividends, "splits": splits, "factors": adjustment_factors(bars, dividends, splits)}
+
+def _download(tickers, period):
+    data = yf.download(list(tickers), period=period, interval="1d", auto_adjust=False, actions=True, progress=False, group_by="ticker")
+    if data is None or data.empty:
+        return {}
+    if not isinstance(data.columns, pd.MultiIndex):
+        return {tickers[0]: data} if len(tickers) == 1 else {}
+    present = set(data.columns.get_level_values(0))
+    return {t: data[t].dropna(how="all") for t in tickers if t in present}
+
+def _cached_store(ticker, period):
+    for covering in _covering_periods(period):
+        store = shared_cache.peek(("price_store", ticker, covering))
+        if store is not None:
+            return store
+    return None
+
+def fetch_store(ticker, period=STORE_PERIOD):
+    """
+    The stored raw bars, dividend and split tables and adjustment factors for ticker,
+    downloaded once per process (traced as a 'yf.download' span) and shared by every page.
+    """
+    store = _cached_store(ticker, period)
+    with span("yf.download", ticker=ticker, period=period, interval="1d") as attrs:
+        if store is not None:
+            attrs["cache"] = "hit"
+            return store
+        if provider_health.backing_off(ticker):
+            attrs["cache"] = "negative"
+        store_period = _store_period(period)
+        try:
+            store, status = shared_cache.get_or_fetch(
+                ("price_store", ticker, store_period),
+                lambda: provider_health.guarded(ticker, lambda: _build_store(_download([ticker], store_period).get(ticker))),
+                shared_cache.HISTORY_TTL,
+            )
+        except (provider_health.ProviderUnavailable, provider_health.TickerUnavailable):
+            attrs["cache"] = "negative"
+            return None
+        attrs.setdefault("cache", "miss" if status == "miss" else "hit")
+        attrs["bytes"] = payload_bytes(store["bars"]) if store is not None and status == "miss" else 0
+    return store
+
+def fetch_stores(tickers, period=STORE_PERIOD):
+    """
+    {ticker: store} for many tickers; the ones not yet stored are fetched in batched downloads,
+    skipping tickers that are backing off after a failure (and everything while the provider
+    breaker is open).
+    """
+    stores, missing = {}, []
+    for ticker in tickers:
+        store = _cached_store(ticker, period)
+        if store is not None:
+            stores[ticker] = store
+        else:
+            missing.append(ticker)
+    missing = provider_health.available(missing) if missing else []
+    store_period = _store_period(period)
+    for start in range(0, len(missing), BATCH_SIZE):
+        batch = missing[start:start + BATCH_SIZE]
+        with span("yf.download", tickers=len(batch), period=store_period, interval="1d") as attrs:
+            try:
+                frames = _download(batch, store_period)
+            except Exception as e:
+                provider_health.record_batch(batch, {}, f"{type(e).__name__}: {e}")
+                raise
+            attrs["cache"] = "miss"
+            attrs["bytes"] = sum(payload_bytes(df) for df in frames.values())
+        built = {}
+        for ticker, df in frames.items():
+            store = _build_store(df)
+            if store is not None:
+                shared_cache.put(("price_store", ticker, store_period), store, shared_cache.HISTORY_TTL)
+                stores[ticker] = built[ticker] = store
+        provider_health.record_batch(batch, built)
+    return {t: stores[t] for t in tickers if t in stores}
+
+def _slice(index, period):
+    if period == "max" or period not in PERIOD_ORDER or len(index) == 0:
+        return slice(None)
+    if period == "1d":
+        return slice(len(index) - 1, None)
+    if period == "ytd":
+        return slice(index.searchsorted(pd.Timestamp(index[-1].year, 1, 1, tz=index.tz)), None)
+    return slice(index.searchsorted(index[-1] - PERIOD_OFFSETS[period]), None)
+
+def adjusted_frame(store, period=STORE_PERIOD, adjust="total"):
+    """OHLCV for the last period of a store, adjusted as requested; always a new frame."""
+    if adjust not in ADJUSTMENTS:
+        raise ValueError(f"adjust must be one of {ADJUSTMENTS}")
+    rows = _slice(store["bars"].index, period)
+    bars = store["bars"].iloc[rows]
+    if adjust == "splits":
+        return bars.copy()
+    factor = store["factors"]["dividend" if adjust == "total" else "split"].to_numpy()[rows]
+    out = bars.copy()
+    out[PRICE_COLUMNS] = bars[PRICE_COLUMNS].to_numpy() * factor[:, None]
+    if adjust == "raw" and "Volume" in out.columns:
+        out["Volume"] = bars["Volume"].to_numpy() / factor
+    return out
+
+def history(ticker, period="1y", adjust="total"):
+    """Daily OHLCV for ticker over period, sliced from the stored series; None if unavailable."""
+    store = fetch_store(ticker, period)
+    return adjusted_frame(store, period, adjust) if store is not None else None
+
+def histories(tickers, period="1y", adjust="total"):
+    """{ticker: daily OHLCV} for many tickers from the shared store."""
+    return {t: adjusted_frame(store, period, adjust) for t, store in fetch_stores(tickers, period).items()}
+
+def dividends(ticker, period=STORE_PERIOD):
+    """Dividend events (ex-date -> amount per share, split-adjusted) from the stored series."""
+    store = fetch_store(ticker, period)
+    return store["dividends"].copy() if store is not None else pd.Series(dtype=np.float64, name="Dividend")
+
+def splits(ticker, period=STORE_PERIOD):
+    """Split events (date -> ratio) from the stored series."""
+    store = fetch_store(ticker, period)
+    return store["splits"].copy() if store is not None else pd.Series(dtype=np.float64, name="Split Ratio")
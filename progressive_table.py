@@ -0,0 +1,68 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import pandas as pd
+import streamlit as st
+import shared_cache
+import provider_health
+from tracing import run_in_trace
+
+MAX_WORKERS = 16
+ROW_TTL = 15 * 60
+REDRAW_INTERVAL = 0.25
+STATUS_LOADING = "⏳ Loading"
+STATUS_CACHED = "↻ Refreshing"
+STATUS_OK = "✅"
+
+def _skeleton_row(ticker, columns, cache_key):
+    cached = shared_cache.peek(cache_key) if cache_key else None
+    if cached is not None:
+        return dict(cached, Status=STATUS_CACHED)
+    row = {col: None for col in columns}
+    row["Ticker"] = ticker
+    row["Status"] = STATUS_LOADING
+    return row
+
+def _failed_row(ticker, columns, reason):
+    row = {col: None for col in columns}
+    row["Ticker"] = ticker
+    row["Status"] = f"⚠️ {reason}"
+    return row
+
+def render_progressive_table(tickers, fetch_row, columns, cache_prefix=None, height=400, max_workers=MAX_WORKERS):
+    """
+    Draw the table at once (last known rows from the shared cache, blank otherwise), then
+    fill each ticker's row as its worker finishes. fetch_row(ticker) returns a row dict or
+    None; None and exceptions are shown inline in the Status column instead of being dropped.
+    Returns the final rows in ticker order.
+    """
+    keys = {t: (cache_prefix, t) if cache_prefix else None for t in tickers}
+    rows = {t: _skeleton_row(t, columns, keys[t]) for t in tickers}
+    table = st.empty()
+    table.dataframe(pd.DataFrame([rows[t] for t in tickers]), use_container_width=True, height=height)
+    if not tickers:
+        return []
+
+    progress = st.progress(0.0, text=f"Loading 0/{len(tickers)} tickers")
+    last_draw = time.monotonic()
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(tickers))) as pool:
+        futures = {pool.submit(run_in_trace(fetch_row), t): t for t in tickers}
+        for done, future in enumerate(as_completed(futures), 1):
+            ticker = futures[future]
+            try:
+                row = future.result()
+                row = dict(row, Ticker=ticker, Status=STATUS_OK) if row is not None else _failed_row(ticker, columns, provider_health.failure_reason(ticker) or "No data")
+                if keys[ticker] and row["Status"] == STATUS_OK:
+                    shared_cache.put(keys[ticker], row, ROW_TTL)
+            except Exception as e:
+                row = _failed_row(ticker, columns, f"{type(e).__name__}: {e}")
+            rows[ticker] = row
+            # Redraws are throttled so a 500-row table is not re-sent 500 times.
+            if done == len(tickers) or time.monotonic() - last_draw >= REDRAW_INTERVAL:
+                table.dataframe(pd.DataFrame([rows[t] for t in tickers]), use_container_width=True, height=height)
+                progress.progress(done / len(tickers), text=f"Loading {done}/{len(tickers)} tickers")
+                last_draw = time.monotonic()
+    progress.empty()
+    return [rows[t] for t in tickers]
+
+def successful_rows(rows):
+    return [row for row in rows if row.get("Status") == STATUS_OK]
@@ -0,0 +1,194 @@
+import time
+import threading
+import pandas as pd
+import streamlit as st
+
+# A ticker whose request failed or came back empty is not asked for again until its retry
+# time, which doubles with every consecutive failure. Meanwhile callers get the same answer
+# instantly: the empty result again, or TickerUnavailable for an error. Prices and .info are
+# tracked separately ("kind"), since a symbol can have one without the other.
+BACKOFF_BASE = 60
+BACKOFF_MAX = 6 * 60 * 60
+# Provider-wide circuit breaker: this many consecutive request errors (exceptions, or a
+# batch download with nothing in it) open it; after BREAKER_COOLDOWN one probe is let through.
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 60
+NO_DATA = "No data returned"
+STATUS_NO_DATA = "⚠️ No data"
+STATUS_ERROR = "❌ Error"
+
+_lock = threading.Lock()
+_tickers = {}
+_breaker = {"state": "closed", "errors": 0, "opened_at": 0.0, "last_error": None}
+
+class ProviderUnavailable(Exception):
+    """The circuit breaker is open: the data provider has been erroring and is being left alone."""
+
+class TickerUnavailable(LookupError):
+    """The ticker failed recently and is inside its backoff window."""
+
+def _retry_in(entry, now):
+    return max(0.0, entry["retry_at"] - now)
+
+def _breaker_allows(now):
+    """Whether a request may go to the provider; the first caller after the cooldown is the probe."""
+    if _breaker["state"] == "closed":
+        return True
+    # A probe that never reports back (e.g. its caller found everything cached) is replaced
+    # by another after a further cooldown rather than leaving the breaker half-open for good.
+    if now - _breaker["opened_at"] >= BREAKER_COOLDOWN:
+        _breaker["state"] = "half-open"
+        _breaker["opened_at"] = now
+        return True
+    return False
+
+def _provider_error(error, now):
+    _breaker["errors"] += 1
+    _breaker["last_error"] = error
+    if _breaker["state"] == "half-open" or _breaker["errors"] >= BREAKER_THRESHOLD:
+        _breaker["state"] = "open"
+        _breaker["opened_at"] = now
+
+def _provider_ok():
+    _breaker.update(state="closed", errors=0)
+
+def record_success(ticker=None, kind="prices"):
+    with _lock:
+        if ticker is not None:
+            _tickers.pop((ticker, kind), None)
+        _provider_ok()
+
+def record_failure(ticker, error=NO_DATA, provider_error=False, result=None, kind="prices"):
+    """
+    Note a failed request. ticker None records a provider-level error only (a failed batch).
+    provider_error: the request itself errored, as opposed to answering with no data;
+    result: the empty value to hand back while the ticker backs off.
+    """
+    now = time.time()
+    with _lock:
+        if ticker is not None:
+            entry = _tickers.setdefault((ticker, kind), {"failures": 0, "error": None, "result": None, "raised": False, "retry_at": 0.0, "last_failure": 0.0})
+            entry["failures"] += 1
+            entry.update(error=error, result=result, raised=provider_error, last_failure=now)
+            entry["retry_at"] = now + min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (entry["failures"] - 1))
+        if provider_error:
+            _provider_error(error, now)
+        elif ticker is not None:
+            # An empty answer still means the provider is up.
+            _provider_ok()
+
+def backing_off(ticker, kind="prices"):
+    entry = _tickers.get((ticker, kind))
+    return entry is not None and entry["retry_at"] > time.time()
+
+def available(tickers, kind="prices"):
+    """The tickers that may be requested now: none while the breaker is open, never those backing off."""
+    now = time.time()
+    with _lock:
+        if not _breaker_allows(now):
+            return []
+        return [t for t in tickers if not ((t, kind) in _tickers and _tickers[(t, kind)]["retry_at"] > now)]
+
+def record_batch(requested, returned, error=None):
+    """Record the outcome of one multi-ticker request: an error, or which tickers came back."""
+    if error is not None:
+        record_failure(None, error, provider_error=True)
+        return
+    if requested and not returned and len(requested) > 1:
+        # A whole batch with nothing in it is the provider failing, not every symbol being bad.
+        record_failure(None, "Empty batch download", provider_error=True)
+        return
+    for ticker in requested:
+        if ticker in returned:
+            record_success(ticker)
+        else:
+            record_failure(ticker)
+
+def guarded(ticker, fetch, is_empty=lambda result: result is None, kind="prices"):
+    """
+    fetch() for one ticker through the failure tracker. While the ticker backs off this
+    returns its last empty result (or raises TickerUnavailable if it last raised) without
+    calling fetch; while the breaker is open it raises ProviderUnavailable.
+    """
+    now = time.time()
+    with _lock:
+        entry = _tickers.get((ticker, kind))
+        if entry is not None and entry["retry_at"] > now:
+            if entry["raised"]:
+                raise TickerUnavailable(f"{ticker}: {entry['error']} (retrying in {_retry_in(entry, now):.0f}s)")
+            return entry["result"]
+        if not _breaker_allows(now):
+            raise ProviderUnavailable(f"Data provider unavailable after repeated errors ({_breaker['last_error']})")
+    try:
+        result = fetch()
+    except Exception as e:
+        record_failure(ticker, f"{type(e).__name__}: {e}", provider_error=True, kind=kind)
+        raise
+    if is_empty(result):
+        record_failure(ticker, NO_DATA, result=result, kind=kind)
+    else:
+        record_success(ticker, kind)
+    return result
+
+def breaker_state():
+    with _lock:
+        state = dict(_breaker)
+    if state["state"] == "open":
+        state["retry_in"] = max(0.0, BREAKER_COOLDOWN - (time.time() - state["opened_at"]))
+    return state
+
+def _latest_entry(ticker):
+    with _lock:
+        entries = [e for (t, _), e in _tickers.items() if t == ticker]
+    return max(entries, key=lambda e: e["retry_at"]) if entries else None
+
+def failure_reason(ticker):
+    """'No data returned (2 failures, retry in 4m)' for a failing ticker, None if it is healthy."""
+    entry = _latest_entry(ticker)
+    if entry is None:
+        return None
+    retry = _retry_in(entry, time.time())
+    detail = f"{entry['failures']} failure{'s' if entry['failures'] > 1 else ''}"
+    detail += f", retry in {retry / 60:.0f}m" if retry >= 60 else f", retry in {retry:.0f}s" if retry else ", retrying"
+    return f"{entry['error']} ({detail})"
+
+def health_table():
+    """One row per ticker and kind of data that is currently failing."""
+    now = time.time()
+    with _lock:
+        rows = [{
+            "Ticker": ticker,
+            "Data": kind,
+            "Status": STATUS_ERROR if entry["raised"] else STATUS_NO_DATA,
+            "Failures": entry["failures"],
+            "Last Error": entry["error"],
+            "Retry In (s)": round(_retry_in(entry, now)),
+        } for (ticker, kind), entry in _tickers.items()]
+    return pd.DataFrame(rows, columns=["Ticker", "Data", "Status", "Failures", "Last Error", "Retry In (s)"])
+
+def reset(tickers=None):
+    """Forget failures (for tickers, or everything) and close the breaker."""
+    with _lock:
+        if tickers is None:
+            _tickers.clear()
+        else:
+            for key in [k for k in _tickers if k[0] in tickers]:
+                del _tickers[key]
+        _provider_ok()
+
+def render_health_panel():
+    """Sidebar summary of the provider breaker and the tickers being backed off."""
+    state = breaker_state()
+    failing = health_table()
+    if state["state"] == "closed" and failing.empty:
+        return
+    label = "⛔ Data provider paused" if state["state"] == "open" else f"⚠️ {len(failing)} ticker(s) failing"
+    with st.sidebar.expander(label, expanded=state["state"] == "open"):
+        if state["state"] == "open":
+            st.write(f"Yahoo Finance kept erroring ({state['last_error']}); requests resume in {state['retry_in']:.0f}s.")
+        if not failing.empty:
+            st.write("These tickers are not re-requested until their retry time:")
+            st.dataframe(failing, use_container_width=True, hide_index=True)
+        if st.button("Retry now", key="provider_health_retry"):
+            reset()
+            st.rerun()
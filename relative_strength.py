@@ -0,0 +1,124 @@
+import numpy as np
+import pandas as pd
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from market_data import download_histories, fetch_info
+from compact_store import build_panel, panel_field
+from tracing import span
+
+# Momentum horizons in trading days. Twelve months needs a year of bars before the last one,
+# so prices are loaded for two years (the swing page's period, which shares the cache).
+HORIZONS = {"1M": 21, "3M": 63, "6M": 126, "12M": 252}
+RS_PERIOD = "2y"
+BENCHMARKS = {"S&P 500 ETF (SPY)": "SPY", "Nasdaq 100 ETF (QQQ)": "QQQ", "S&P 500 (^GSPC)": "^GSPC"}
+# SPDR sector ETFs by Yahoo's .info sector names.
+SECTOR_ETFS = {
+    "Technology": "XLK", "Communication Services": "XLC", "Consumer Cyclical": "XLY", "Consumer Defensive": "XLP",
+    "Energy": "XLE", "Financial Services": "XLF", "Healthcare": "XLV", "Industrials": "XLI",
+    "Basic Materials": "XLB", "Real Estate": "XLRE", "Utilities": "XLU",
+}
+# A name needs a price at least this close to each horizon's start to be ranked on it.
+MAX_STALE_DAYS = 5
+
+def ticker_sectors(tickers):
+    """{ticker: Yahoo sector} from the cached .info; tickers with no known sector are left out."""
+    sectors = {}
+    for ticker in tickers:
+        try:
+            sector = fetch_info(ticker).get("sector")
+        except Exception:
+            continue
+        if isinstance(sector, str) and sector:
+            sectors[ticker] = sector
+    return sectors
+
+def load_rs_closes(tickers, benchmark, period=RS_PERIOD):
+    """Aligned (dates x tickers) closes for the universe, the benchmark and every sector ETF, from one batched download."""
+    wanted = list(dict.fromkeys([*tickers, benchmark, *SECTOR_ETFS.values()]))
+    frames = download_histories(wanted, period=period, interval="1d", auto_adjust=True)
+    panel = build_panel({t: df[["Close"]] for t, df in frames.items() if "Close" in df.columns})
+    if not panel["tickers"]:
+        return pd.DataFrame()
+    return panel_field(panel, "Close").astype(np.float64)
+
+def horizon_returns(closes, horizons=HORIZONS):
+    """
+    (horizons x tickers) total returns over each horizon, from the last close back to the
+    close horizon bars earlier. Gaps are carried forward, so names on different exchange
+    calendars line up; a name whose price is too stale at either end gets NaN.
+    """
+    values = closes.to_numpy(dtype=np.float64)
+    filled = pd.DataFrame(values).ffill(limit=MAX_STALE_DAYS).to_numpy()
+    last = filled[-1]
+    out = np.full((len(horizons), values.shape[1]), np.nan)
+    for i, days in enumerate(horizons.values()):
+        if len(filled) > days:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                out[i] = last / filled[-1 - days] - 1
+    return pd.DataFrame(out, index=list(horizons), columns=closes.columns)
+
+def percentile_ranks(returns):
+    """Cross-sectional percentile rank (0-100, higher is stronger) along every row; NaNs stay unranked."""
+    return returns.rank(axis=1, pct=True, method="max") * 100
+
+def rank_universe(closes, tickers, benchmark, sectors=None, horizons=HORIZONS):
+    """
+    Relative-strength table for tickers, one row each, strongest first: return over each
+    horizon, excess over the benchmark and over the ticker's sector ETF, the cross-sectional
+    percentile rank of the excess over the benchmark, and the RS Score (the mean of those
+    ranks). Every column is computed across the whole universe at once.
+    """
+    sectors = sectors or {}
+    tickers = [t for t in tickers if t in closes.columns]
+    with span("relative_strength.rank", tickers=len(tickers)):
+        returns = horizon_returns(closes, horizons)
+        growth = 1 + returns[tickers].to_numpy()
+        bench = 1 + (returns[benchmark].to_numpy() if benchmark in returns.columns else np.full(len(horizons), np.nan))
+        vs_bench = pd.DataFrame(growth / bench[:, None] - 1, index=returns.index, columns=tickers)
+        # Each ticker's sector ETF column gathered in one fancy-index; -1 (no sector) becomes NaN.
+        etf = returns.columns.get_indexer([SECTOR_ETFS.get(sectors.get(t), "") for t in tickers])
+        sector_growth = np.where(etf >= 0, 1 + returns.to_numpy()[:, etf], np.nan)
+        vs_sector = growth / sector_growth - 1
+        ranks = percentile_ranks(vs_bench)
+        table = {"Sector": [sectors.get(t) or "Unknown" for t in tickers]}
+        for i, h in enumerate(horizons):
+            table[f"{h} Return (%)"] = returns[tickers].to_numpy()[i] * 100
+            table[f"{h} vs Benchmark (%)"] = vs_bench.to_numpy()[i] * 100
+            table[f"{h} vs Sector (%)"] = vs_sector[i] * 100
+            table[f"{h} RS Rank"] = ranks.to_numpy()[i]
+        df = pd.DataFrame(table, index=pd.Index(tickers, name="Ticker"))
+        df["RS Score"] = ranks.mean(axis=0).to_numpy()
+        df = df.sort_values("RS Score", ascending=False, na_position="last")
+        df.insert(0, "RS Rank", np.arange(1, len(df) + 1))
+    return df
+
+def sector_rotation(closes, benchmark, horizons=HORIZONS):
+    """(sector x horizon) excess return (%) of each sector ETF over the benchmark."""
+    returns = horizon_returns(closes[[e for e in [*SECTOR_ETFS.values(), benchmark] if e in closes.columns]], horizons)
+    if benchmark not in returns.columns:
+        return pd.DataFrame(columns=list(horizons))
+    bench = 1 + returns[benchmark]
+    rows = {sector: ((1 + returns[etf]) / bench - 1) * 100 for sector, etf in SECTOR_ETFS.items() if etf in returns.columns}
+    rotation = pd.DataFrame(rows).T
+    rotation.index.name = "Sector"
+    return rotation.sort_values(list(horizons)[1], ascending=False) if len(rotation) else rotation
+
+def plot_sector_heatmap(rotation, benchmark):
+    # Built without pyplot's global state, like the deep-analysis chart, so it can render alongside the prefetch thread.
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    values = rotation.to_numpy(dtype=np.float64)
+    limit = np.nanmax(np.abs(values)) if np.isfinite(values).any() else 1.0
+    im = ax.imshow(values, cmap="RdYlGn", vmin=-limit, vmax=limit, aspect="auto")
+    ax.set_xticks(range(len(rotation.columns)))
+    ax.set_xticklabels(rotation.columns)
+    ax.set_yticks(range(len(rotation)))
+    ax.set_yticklabels([f"{s} ({SECTOR_ETFS[s]})" for s in rotation.index])
+    for i in range(values.shape[0]):
+        for j in range(values.shape[1]):
+            if np.isfinite(values[i, j]):
+                ax.text(j, i, f"{values[i, j]:+.1f}", ha="center", va="center", fontsize=8)
+    ax.set_title(f"Sector Rotation: Excess Return vs {benchmark} (%)")
+    fig.colorbar(im, ax=ax)
+    return fig
@@ -0,0 +1,261 @@
+import io
+import os
+import sys
+import html
+import base64
+import shutil
+import argparse
+import datetime
+import tempfile
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import pandas as pd
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+from matplotlib.backends.backend_pdf import PdfPages
+from tracing import span, run_in_trace
+import stock_analysis
+import long_term_investments
+import dividend_tracker
+import fx_rates
+import watchlists
+
+REPORT_DIR = "reports"
+FORMATS = ["html", "pdf", "xlsx"]
+WATCHLISTS = ["swing", "long_term", "dividend"]
+FETCH_WORKERS = 16
+CHART_WORKERS = max(1, (os.cpu_count() or 2) - 1)
+# Charts in flight per worker; bounds memory however long the watchlist is.
+CHART_QUEUE_DEPTH = 2
+CHART_DPI = 72
+PROJECTION_YEARS = 10
+PDF_TABLE_ROWS = 30
+
+def watchlist_tickers(name):
+    if name == "swing":
+        rows = watchlists.load_swing_watchlist()
+    elif name == "long_term":
+        rows = watchlists.load_long_term_watchlist()
+    else:
+        rows = watchlists.load_dividend_watchlist()
+    return watchlists.row_tickers(rows)
+
+def swing_section(ticker):
+    row = stock_analysis.fetch_watchlist_data(ticker)
+    df = stock_analysis.fetch_indicator_frame(ticker)
+    signal = row["Signal"] if row else "N/A"
+    return {"ticker": ticker, "row": row or {"Ticker": ticker, "Signal": "N/A"},
+            "conclusion": stock_analysis.generate_swing_trading_conclusion(signal, df), "projection": None}
+
+def long_term_section(ticker):
+    row = long_term_investments.fetch_watchlist_row(ticker)
+    fundamentals = long_term_investments.fetch_fundamental_data(ticker)
+    price, _ = long_term_investments.get_current_price_and_currency(ticker)
+    cagr = long_term_investments.compute_historical_cagr(ticker)
+    base_price = long_term_investments.price_in_base(price, fundamentals["Currency"])
+    projection = long_term_investments.project_future_price(base_price, PROJECTION_YEARS, cagr) if base_price else None
+    if projection is not None:
+        projection = projection.rename(columns={"Projected Price": f"Projected Price ({fx_rates.currency_symbol(fx_rates.BASE_CURRENCY)})"})
+    return {"ticker": ticker, "row": row, "conclusion": long_term_investments.generate_long_term_conclusion(cagr, fundamentals), "projection": projection}
+
+def dividend_section(ticker):
+    name, ex_div, pay_div = dividend_tracker.fetch_dividend_info(ticker)
+    return {"ticker": ticker, "row": {"ticker": ticker, "company": name, "ex_div_date": ex_div, "pay_date": pay_div},
+            "conclusion": None, "projection": None}
+
+SECTION_BUILDERS = {"swing": swing_section, "long_term": long_term_section, "dividend": dividend_section}
+
+def collect_sections(watchlist, tickers, max_workers=FETCH_WORKERS):
+    """Table rows, conclusions and projections for every ticker (I/O bound, so threaded)."""
+    build = SECTION_BUILDERS[watchlist]
+
+    def safe_build(ticker):
+        try:
+            return build(ticker)
+        except Exception as e:
+            return {"ticker": ticker, "row": {"Ticker": ticker, "Error": f"{type(e).__name__}: {e}"}, "conclusion": None, "projection": None}
+
+    with span("report.collect", watchlist=watchlist, tickers=len(tickers)):
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(tickers)))) as pool:
+            return [f.result() for f in [pool.submit(run_in_trace(safe_build), t) for t in tickers]]
+
+def render_chart_png(ticker, df, dpi=CHART_DPI):
+    """PNG bytes of the full analysis chart; runs in a worker process."""
+    fig = stock_analysis.build_full_analysis_figure(ticker, df)
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=dpi, bbox_inches="tight")
+    plt.close(fig)
+    return buffer.getvalue()
+
+def render_charts(tickers, workers=CHART_WORKERS, dpi=CHART_DPI):
+    """
+    Yield (ticker, png bytes or None) in ticker order. Indicator frames come from the shared
+    cache and charts render in a process pool, with at most workers * CHART_QUEUE_DEPTH
+    charts held at once, so memory does not grow with the number of tickers.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = deque()
+        remaining = iter(tickers)
+        for ticker in remaining:
+            df = stock_analysis.fetch_indicator_frame(ticker)
+            pending.append((ticker, pool.submit(render_chart_png, ticker, df, dpi) if df is not None else None))
+            if len(pending) >= workers * CHART_QUEUE_DEPTH:
+                break
+        while pending:
+            ticker, future = pending.popleft()
+            try:
+                png = future.result() if future is not None else None
+            except Exception:
+                png = None
+            yield ticker, png
+            for next_ticker in remaining:
+                df = stock_analysis.fetch_indicator_frame(next_ticker)
+                pending.append((next_ticker, pool.submit(render_chart_png, next_ticker, df, dpi) if df is not None else None))
+                break
+
+def _table_html(df):
+    return df.to_html(index=False, na_rep="N/A", border=0, classes="table", escape=True)
+
+def html_writer(path, title, summary):
+    """Sections are appended to a temporary body file and copied after the summary on close."""
+    body = tempfile.TemporaryFile(mode="w+", encoding="utf-8")
+
+    def add(section, png):
+        body.write(f'<section id="{html.escape(section["ticker"])}"><h2>{html.escape(section["ticker"])}</h2>\n')
+        if png:
+            body.write(f'<img alt="{html.escape(section["ticker"])} chart" src="data:image/png;base64,{base64.b64encode(png).decode()}">\n')
+        if section["conclusion"]:
+            body.write(f'<p><strong>Conclusion:</strong> {html.escape(section["conclusion"])}</p>\n')
+        if section["projection"] is not None:
+            body.write("<h3>Projected Price</h3>\n" + _table_html(section["projection"]) + "\n")
+        body.write("</section>\n")
+
+    def close():
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(f"<!DOCTYPE html><html><head><meta charset=\"utf-8\"><title>{html.escape(title)}</title>\n"
+                    "<style>body{font-family:sans-serif;margin:2em} img{max-width:100%} .table{border-collapse:collapse}"
+                    " .table td,.table th{padding:4px 8px;border-bottom:1px solid #ddd}</style></head><body>\n")
+            f.write(f"<h1>{html.escape(title)}</h1>\n<h2>Summary</h2>\n{_table_html(summary)}\n")
+            body.seek(0)
+            shutil.copyfileobj(body, f)
+            f.write("</body></html>\n")
+        body.close()
+
+    return {"add": add, "close": close}
+
+def _pdf_table_pages(pdf, title, df):
+    for start in range(0, max(len(df), 1), PDF_TABLE_ROWS):
+        chunk = df.iloc[start:start + PDF_TABLE_ROWS].fillna("N/A").astype(str)
+        fig, ax = plt.subplots(figsize=(11.69, 8.27))
+        ax.axis("off")
+        ax.set_title(title if start == 0 else f"{title} (continued)")
+        if len(chunk):
+            table = ax.table(cellText=chunk.to_numpy(), colLabels=list(chunk.columns), loc="upper center", cellLoc="left")
+            table.auto_set_font_size(False)
+            table.set_fontsize(7)
+        pdf.savefig(fig)
+        plt.close(fig)
+
+def pdf_writer(path, title, summary):
+    """One page per ticker (chart, conclusion, projection) written to the PDF as it arrives."""
+    pdf = PdfPages(path)
+    _pdf_table_pages(pdf, f"{title} - Summary", summary)
+
+    def add(section, png):
+        fig = plt.figure(figsize=(8.27, 11.69))
+        fig.suptitle(section["ticker"], fontsize=14)
+        if png:
+            ax = fig.add_axes([0.05, 0.3, 0.9, 0.65])
+            ax.imshow(plt.imread(io.BytesIO(png), format="png"))
+            ax.axis("off")
+        lines = []
+        if section["conclusion"]:
+            lines.append(f"Conclusion: {section['conclusion']}")
+        if section["projection"] is not None:
+            proj = section["projection"]
+            lines.append("Projection: " + ", ".join(f"Y{int(y)}: {p}" for y, p in proj.iloc[:, :2].itertuples(index=False, name=None)))
+        fig.text(0.05, 0.27, "\n\n".join(lines), va="top", wrap=True, fontsize=9)
+        pdf.savefig(fig)
+        plt.close(fig)
+
+    return {"add": add, "close": pdf.close}
+
+def xlsx_writer(path, title, summary):
+    """
+    Streaming workbook (openpyxl write_only): a Summary sheet plus a Details sheet with one
+    block per ticker. Charts are left to the HTML and PDF reports so rows stream to disk.
+    """
+    try:
+        from openpyxl import Workbook
+    except ImportError as e:
+        raise ImportError("openpyxl is required for XLSX reports: pip install openpyxl") from e
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("Summary")
+    sheet.append([title])
+    sheet.append(list(summary.columns))
+    for values in summary.itertuples(index=False, name=None):
+        sheet.append([None if pd.isna(v) else v for v in values])
+    details = workbook.create_sheet("Details")
+
+    def add(section, png):
+        details.append([section["ticker"]])
+        if section["conclusion"]:
+            details.append(["Conclusion", section["conclusion"]])
+        if section["projection"] is not None:
+            details.append(list(section["projection"].columns))
+            for values in section["projection"].itertuples(index=False, name=None):
+                details.append(list(values))
+        details.append([])
+
+    return {"add": add, "close": lambda: workbook.save(path)}
+
+WRITERS = {"html": html_writer, "pdf": pdf_writer, "xlsx": xlsx_writer}
+
+def generate_report(watchlist, formats=("html",), output_dir=REPORT_DIR, tickers=None, workers=CHART_WORKERS, charts=True):
+    """
+    Write one report per format for a watchlist and return the paths. Sections are collected
+    first (small), then charts are rendered in a process pool and streamed into every
+    writer one ticker at a time.
+    """
+    tickers = tickers if tickers is not None else watchlist_tickers(watchlist)
+    os.makedirs(output_dir, exist_ok=True)
+    stamp = datetime.date.today().isoformat()
+    title = f"{watchlist.replace('_', ' ').title()} Watchlist Report - {stamp}"
+    sections = collect_sections(watchlist, tickers)
+    summary = pd.DataFrame([s["row"] for s in sections])
+    paths = {fmt: os.path.join(output_dir, f"{watchlist}_report_{stamp}.{fmt}") for fmt in formats}
+    writers = [WRITERS[fmt](path, title, summary) for fmt, path in paths.items()]
+    needs_charts = charts and any(fmt in ("html", "pdf") for fmt in formats)
+    chart_stream = render_charts(tickers, workers) if needs_charts and tickers else ((t, None) for t in tickers)
+    with span("report.write", watchlist=watchlist, tickers=len(tickers), formats=",".join(formats)):
+        try:
+            for section, (_, png) in zip(sections, chart_stream):
+                for writer in writers:
+                    writer["add"](section, png)
+        finally:
+            for writer in writers:
+                writer["close"]()
+    return list(paths.values())
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate HTML/PDF/XLSX reports for the watchlists.")
+    parser.add_argument("--watchlist", nargs="+", choices=WATCHLISTS, default=WATCHLISTS)
+    parser.add_argument("--format", nargs="+", choices=FORMATS, default=["html"])
+    parser.add_argument("--output", default=REPORT_DIR)
+    parser.add_argument("--tickers", nargs="+", help="Report on these tickers instead of the saved watchlist (one watchlist only).")
+    parser.add_argument("--workers", type=int, default=CHART_WORKERS, help="Processes rendering charts.")
+    parser.add_argument("--no-charts", action="store_true")
+    args = parser.parse_args(argv)
+    if args.tickers and len(args.watchlist) != 1:
+        parser.error("--tickers needs exactly one --watchlist")
+
+    for watchlist in args.watchlist:
+        started = datetime.datetime.now()
+        paths = generate_report(watchlist, args.format, args.output, args.tickers, args.workers, not args.no_charts)
+        seconds = (datetime.datetime.now() - started).total_seconds()
+        print(f"{watchlist}: wrote {', '.join(paths)} in {seconds:.1f}s", flush=True)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+import os
+import time
+import pickle
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+import pandas as pd
+
+# Process-wide: every Streamlit session runs in this process, so one entry serves all users.
+# Set CAPRIANI_CACHE_DIR to also share entries between processes (several servers on one box).
+CACHE_DIR = os.environ.get("CAPRIANI_CACHE_DIR")
+MAX_ENTRIES = 20000
+HISTORY_TTL = 15 * 60
+INDICATOR_TTL = 15 * 60
+INFO_TTL = 6 * 60 * 60
+DISK_LOCK_TIMEOUT = 60
+
+_entries = OrderedDict()
+_inflight = {}
+_lock = threading.Lock()
+
+def _is_cacheable(value):
+    if value is None:
+        return False
+    if isinstance(value, pd.DataFrame) and value.empty:
+        return False
+    return True
+
+def _disk_path(key):
+    return os.path.join(CACHE_DIR, hashlib.sha1(repr(key).encode()).hexdigest() + ".pkl")
+
+def _disk_get(key, ttl):
+    path = _disk_path(key)
+    try:
+        if time.time() - os.path.getmtime(path) > ttl:
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+    except (OSError, pickle.PickleError, EOFError):
+        return None
+
+def _disk_put(key, value):
+    path = _disk_path(key)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+    except OSError:
+        pass
+
+def _disk_fetch(key, fetch, ttl):
+    """
+    Cross-process single flight: the process that creates the .lock file fetches,
+    the others poll for its result until the lock goes stale.
+    """
+    value = _disk_get(key, ttl)
+    if value is not None:
+        return value, "hit"
+    lock_path = _disk_path(key) + ".lock"
+    try:
+        fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+    except FileExistsError:
+        deadline = time.time() + DISK_LOCK_TIMEOUT
+        while time.time() < deadline and os.path.exists(lock_path):
+            time.sleep(0.1)
+        value = _disk_get(key, ttl)
+        if value is not None:
+            return value, "wait"
+        return fetch(), "miss"
+    try:
+        value = fetch()
+        if _is_cacheable(value):
+            _disk_put(key, value)
+        return value, "miss"
+    finally:
+        os.close(fd)
+        try:
+            os.remove(lock_path)
+        except OSError:
+            pass
+
+def get_or_fetch(key, fetch, ttl):
+    """
+    Return (value, status) for key, calling fetch() at most once across all concurrent callers.
+    status is 'hit', 'miss', or 'wait' (another caller's in-flight fetch was reused).
+    Treat returned values as read-only; they are shared between sessions.
+    """
+    now = time.time()
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] > now:
+            _entries.move_to_end(key)
+            return entry[1], "hit"
+        future = _inflight.get(key)
+        owner = future is None
+        if owner:
+            future = Future()
+            _inflight[key] = future
+    if not owner:
+        return future.result(), "wait"
+
+    try:
+        if CACHE_DIR:
+            value, status = _disk_fetch(key, fetch, ttl)
+        else:
+            value, status = fetch(), "miss"
+        put(key, value, ttl)
+        future.set_result(value)
+        return value, status
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+
+def put(key, value, ttl):
+    """Store a value computed elsewhere (e.g. a finished table row) under key."""
+    if _is_cacheable(value):
+        with _lock:
+            _entries[key] = (time.time() + ttl, value)
+            _entries.move_to_end(key)
+            while len(_entries) > MAX_ENTRIES:
+                _entries.popitem(last=False)
+
+def peek(key):
+    """Cached value for key if present and fresh, without fetching."""
+    with _lock:
+        entry = _entries.get(key)
+        if entry is not None and entry[0] > time.time():
+            return entry[1]
+    return None
+
+def invalidate(prefix=None):
+    """Drop every entry (or those whose key starts with the given first element)."""
+    with _lock:
+        if prefix is None:
+            _entries.clear()
+        else:
+            for key in [k for k in _entries if k[0] == prefix]:
+                del _entries[key]
+
+if CACHE_DIR:
+    os.makedirs(CACHE_DIR, exist_ok=True)
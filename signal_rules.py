@@ -0,0 +1,257 @@
+import os
+import ast
+import json
+import numpy as np
+import pandas as pd
+from compact_store import SIGNAL_CODES, SIGNAL_LABELS, TREND_LABELS
+import candlestick_patterns
+
+STRATEGY_DIR = "strategies"
+
+# The swing rules that used to be an if/elif chain in generate_signal_and_strength.
+# 'define' holds named sub-expressions; each is evaluated once however many rules use it.
+# Rules are tried in order and the first whose 'when' holds sets the signal.
+DEFAULT_STRATEGY = {
+    "name": "Swing (default)",
+    "required": ["Close", "EMA20", "RSI14", "MACD_Line", "MACD_Signal", "Volume", "Volume_SMA"],
+    "define": {
+        "volume_confirm": "Volume > Volume_SMA",
+        "rsi_overbought": "where(Close > BB_High, 70, 65)",
+        "rsi_oversold": "where(Close < BB_Low, 30, 35)",
+        "bullish_setup": "Trend == 'Uptrend' and Close > EMA20 and MACD_Line > MACD_Signal",
+        "bearish_setup": "Trend == 'Downtrend' and Close < EMA20 and MACD_Line < MACD_Signal",
+    },
+    "rules": [
+        {"signal": "🔥 STRONG BUY", "when": "bullish_setup and RSI14 < rsi_oversold and volume_confirm", "strength": "where(RSI14 < 25, 90, 75)"},
+        {"signal": "💡 BUY", "when": "bullish_setup and RSI14 < 50 and volume_confirm", "strength": "where(RSI14 < 40, 60, 50)"},
+        {"signal": "📈 STRONG HOLD", "when": "bullish_setup and RSI14 > rsi_overbought", "strength": 25},
+        {"signal": "🔴 STRONG SELL", "when": "bearish_setup and RSI14 > rsi_overbought and volume_confirm", "strength": "where(RSI14 > 75, -90, -75)"},
+        {"signal": "🚫 SELL", "when": "bearish_setup and RSI14 > 50 and volume_confirm", "strength": "where(RSI14 > 60, -60, -50)"},
+    ],
+    "default": {"signal": "⚖️ HOLD", "strength": 0},
+}
+
+CATEGORIES = {"Trend": TREND_LABELS}
+
+def _shift(x, n=1):
+    """Value n bars earlier along the time axis (axis 0); NaN where there is no earlier bar."""
+    x = np.asarray(x, dtype=np.float64)
+    n = int(n)
+    if x.ndim == 0 or n == 0:
+        return x if n == 0 else np.full_like(x, np.nan)
+    out = np.full_like(x, np.nan)
+    if n > 0:
+        out[n:] = x[:-n]
+    else:
+        out[:n] = x[-n:]
+    return out
+
+FUNCTIONS = {
+    "where": lambda cond, a, b: np.where(cond, a, b),
+    "abs": np.abs,
+    "min": np.minimum,
+    "max": np.maximum,
+    "shift": _shift,
+    "cross_above": lambda a, b: (np.asarray(a) > np.asarray(b)) & (_shift(a) <= _shift(b)),
+    "cross_below": lambda a, b: (np.asarray(a) < np.asarray(b)) & (_shift(a) >= _shift(b)),
+}
+COMPARE_OPS = {ast.Gt: np.greater, ast.GtE: np.greater_equal, ast.Lt: np.less, ast.LtE: np.less_equal, ast.Eq: np.equal, ast.NotEq: np.not_equal}
+BIN_OPS = {ast.Add: np.add, ast.Sub: np.subtract, ast.Mult: np.multiply, ast.Div: np.divide}
+
+def _check(node, names, source):
+    """Reject anything outside the small expression language before it is ever evaluated."""
+    for child in ast.walk(node):
+        if isinstance(child, ast.Call):
+            if not isinstance(child.func, ast.Name) or child.func.id not in FUNCTIONS:
+                raise ValueError(f"Unknown function in rule '{source}'")
+        elif isinstance(child, ast.Name):
+            if child.id not in FUNCTIONS:
+                names.add(child.id)
+        elif isinstance(child, ast.Constant):
+            if not isinstance(child.value, (int, float, str, bool)):
+                raise ValueError(f"Unsupported constant in rule '{source}'")
+        elif not isinstance(child, (ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+                                    ast.Compare, ast.BinOp, ast.Load, *COMPARE_OPS, *BIN_OPS)):
+            raise ValueError(f"Unsupported syntax {type(child).__name__} in rule '{source}'")
+
+def compile_expression(source):
+    """Parse one rule expression (e.g. "RSI14 < 30 and Volume > Volume_SMA") into a checked AST."""
+    if isinstance(source, (int, float)) and not isinstance(source, bool):
+        return ast.Expression(body=ast.Constant(value=source)), set()
+    try:
+        tree = ast.parse(str(source), mode="eval")
+    except SyntaxError as e:
+        raise ValueError(f"Invalid rule expression '{source}': {e.msg}") from e
+    names = set()
+    _check(tree, names, source)
+    return tree, names
+
+def compile_strategy(spec):
+    """
+    Validate a strategy spec (dict from Python, YAML or JSON) and compile every expression once.
+    Raises ValueError naming the offending rule.
+    """
+    defines = {}
+    for name, source in spec.get("define", {}).items():
+        defines[name] = compile_expression(source)[0]
+    rules = []
+    columns = set(spec.get("required", []))
+    for rule in spec.get("rules", []):
+        if rule.get("signal") not in SIGNAL_CODES:
+            raise ValueError(f"Unknown signal '{rule.get('signal')}'; expected one of {SIGNAL_LABELS[1:]}")
+        when, when_names = compile_expression(rule["when"])
+        strength, strength_names = compile_expression(rule.get("strength", 0))
+        columns |= (when_names | strength_names) - set(defines)
+        rules.append((SIGNAL_CODES[rule["signal"]], when, strength))
+    for tree in defines.values():
+        names = set()
+        _check(tree, names, "define")
+        columns |= names - set(defines)
+    default = spec.get("default", {"signal": "⚖️ HOLD", "strength": 0})
+    return {
+        "name": spec.get("name", "Custom"),
+        "defines": defines,
+        "rules": rules,
+        "required": list(spec.get("required", [])),
+        "columns": sorted(columns),
+        "default": (SIGNAL_CODES[default["signal"]], default.get("strength", 0)),
+    }
+
+def load_strategy(path):
+    """Load a strategy from .yaml/.yml (needs PyYAML) or .json."""
+    with open(path) as f:
+        if path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError as e:
+                raise ImportError("PyYAML is required for YAML strategies: pip install pyyaml") from e
+            spec = yaml.safe_load(f)
+        else:
+            spec = json.load(f)
+    spec.setdefault("name", os.path.splitext(os.path.basename(path))[0])
+    return compile_strategy(spec)
+
+def available_strategies(directory=STRATEGY_DIR):
+    """{name: compiled strategy} for the default rules plus every strategy file in directory."""
+    strategies = {DEFAULT_STRATEGY["name"]: DEFAULT_COMPILED}
+    if os.path.isdir(directory):
+        for filename in sorted(os.listdir(directory)):
+            if filename.endswith((".yaml", ".yml", ".json")):
+                try:
+                    strategy = load_strategy(os.path.join(directory, filename))
+                except (ValueError, ImportError, OSError):
+                    continue
+                strategies[strategy["name"]] = strategy
+    return strategies
+
+def _evaluate(tree, resolve, defines, memo):
+    """Evaluate a compiled expression; identical sub-expressions and defines are computed once per call."""
+    node = tree.body if isinstance(tree, ast.Expression) else tree
+    key = ast.dump(node)
+    if key in memo:
+        return memo[key]
+    ev = lambda n: _evaluate(n, resolve, defines, memo)
+    if isinstance(node, ast.Constant):
+        value = node.value
+    elif isinstance(node, ast.Name):
+        value = ev(defines[node.id]) if node.id in defines else resolve(node.id)
+    elif isinstance(node, ast.BoolOp):
+        values = [np.asarray(ev(v), dtype=bool) for v in node.values]
+        op = np.logical_and if isinstance(node.op, ast.And) else np.logical_or
+        value = values[0]
+        for v in values[1:]:
+            value = op(value, v)
+    elif isinstance(node, ast.UnaryOp):
+        operand = ev(node.operand)
+        value = np.logical_not(operand) if isinstance(node.op, ast.Not) else np.negative(operand)
+    elif isinstance(node, ast.Compare):
+        left = node.left
+        value = None
+        for op, right in zip(node.ops, node.comparators):
+            result = COMPARE_OPS[type(op)](*_compare_operands(left, right, resolve, ev))
+            value = result if value is None else np.logical_and(value, result)
+            left = right
+    elif isinstance(node, ast.BinOp):
+        value = BIN_OPS[type(node.op)](ev(node.left), ev(node.right))
+    elif isinstance(node, ast.Call):
+        value = FUNCTIONS[node.func.id](*[ev(a) for a in node.args])
+    else:
+        raise ValueError(f"Unsupported expression {type(node).__name__}")
+    memo[key] = value
+    return value
+
+def evaluate_expression(source, resolve, defines=None):
+    """Evaluate one expression (source text or compile_expression tree) against resolve(name)."""
+    tree = compile_expression(source)[0] if not isinstance(source, ast.Expression) else source
+    return _evaluate(tree, resolve, defines or {}, {})
+
+def _compare_operands(left, right, resolve, ev):
+    """Categorical columns compare on their int8 codes, so Trend == 'Uptrend' never touches strings."""
+    for a, b in ((left, right), (right, left)):
+        if isinstance(a, ast.Name) and a.id in CATEGORIES and isinstance(b, ast.Constant) and isinstance(b.value, str):
+            code = CATEGORIES[a.id].index(b.value) if b.value in CATEGORIES[a.id] else -2
+            codes = resolve(a.id)
+            return (codes, code) if a is left else (code, codes)
+    return ev(left), ev(right)
+
+def evaluate(strategy, resolve, shape):
+    """
+    Run a compiled strategy against columns supplied by resolve(name) (arrays of one shape).
+    Returns (int8 signal codes, int16 strengths); rows missing a required input are N/A.
+    """
+    memo = {}
+    codes = np.full(shape, strategy["default"][0], dtype=np.int8)
+    strength = np.full(shape, strategy["default"][1], dtype=np.int16)
+    undecided = np.ones(shape, dtype=bool)
+    for code, when, strength_expr in strategy["rules"]:
+        hit = np.logical_and(np.asarray(_evaluate(when, resolve, strategy["defines"], memo), dtype=bool), undecided)
+        if hit.any():
+            codes[hit] = code
+            strength[hit] = np.broadcast_to(_evaluate(strength_expr, resolve, strategy["defines"], memo), shape)[hit]
+            undecided &= ~hit
+    missing = np.zeros(shape, dtype=bool)
+    for col in strategy["required"]:
+        missing |= np.isnan(np.asarray(resolve(col), dtype=np.float64))
+    codes[missing] = SIGNAL_CODES["N/A"]
+    strength[missing] = 0
+    return codes, strength
+
+def _frame_resolver(df):
+    def resolve(name):
+        series = df[name]
+        if name in CATEGORIES:
+            if isinstance(series.dtype, pd.CategoricalDtype):
+                return series.cat.codes.to_numpy()
+            return np.array([CATEGORIES[name].index(v) if v in CATEGORIES[name] else -1 for v in series], dtype=np.int8)
+        return series.to_numpy()
+    return resolve
+
+def evaluate_frame(strategy, df):
+    """Signal and Strength for every row of an indicator frame, in one vectorised pass."""
+    codes, strength = evaluate(strategy, _frame_resolver(df), len(df))
+    return pd.DataFrame({"Signal": pd.Categorical.from_codes(codes, categories=SIGNAL_LABELS), "Strength": strength}, index=df.index)
+
+def evaluate_panel(strategy, panel):
+    """Signal codes and strengths (dates x tickers) for a compact_store panel, every ticker at once."""
+    fields = panel["fields"]
+    def resolve(name):
+        if name == "Trend":
+            return panel["trend"]
+        if name not in fields and name in candlestick_patterns.PATTERN_FUNCTIONS:
+            # Price panels carry OHLC only; pattern masks are derived from it on first use.
+            return candlestick_patterns.panel_pattern(panel, name)
+        return panel["values"][fields.index(name)]
+    return evaluate(strategy, resolve, panel["trend"].shape)
+
+def signal_for_row(row, strategy=None):
+    """(signal label, strength) for one indicator row, as generate_signal_and_strength returns."""
+    strategy = strategy or DEFAULT_COMPILED
+    def resolve(name):
+        value = row[name] if name in row.index else np.nan
+        if name in CATEGORIES:
+            return np.int8(CATEGORIES[name].index(value)) if value in CATEGORIES[name] else np.int8(-1)
+        return value
+    codes, strength = evaluate(strategy, resolve, ())
+    return SIGNAL_LABELS[int(codes)], int(strength)
+
+DEFAULT_COMPILED = compile_strategy(DEFAULT_STRATEGY)
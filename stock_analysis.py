@@ -1,23 +1,32 @@
-import os
 import streamlit as st
 import pandas as pd
 import numpy as np
-import yfinance as yf
 from ta.trend import SMAIndicator, EMAIndicator, MACD
 from ta.momentum import RSIIndicator
 from ta.volatility import BollingerBands
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+import shared_cache
+from market_data import download_history, download_histories, fetch_info
+from tracing import span
+from compact_store import compact_frame, trend_categorical
+from progressive_table import render_progressive_table, successful_rows
+import multi_timeframe
+import signal_rules
+import fx_rates
+import symbol_directory
+import candlestick_patterns
+import prefetch
+import paper_trading
+import event_study
+import relative_strength
+from watchlists import SWING_WATCHLIST_CSV, load_swing_watchlist
 
-SWING_WATCHLIST_CSV = "swing_watchlist.csv"
-CURRENCY_MAP = {"USD": "£", "GBP": "£", "GBp": "£", "EUR": "€"}
-
-def load_watchlist():
-    if os.path.exists(SWING_WATCHLIST_CSV):
-        return pd.read_csv(SWING_WATCHLIST_CSV).to_dict("records")
-    return []
+WATCHLIST_COLUMNS = ["Ticker", "Company", "Current Price", "1-Day Change", "52-Week Change", "RSI14", "MACD_Line", "MACD_Signal", "EMA20", "Patterns", "Signal"]
 
 def save_watchlist(watchlist_list):
-    pd.DataFrame(watchlist_list).to_csv(SWING_WATCHLIST_CSV, index=False)
+    with span("csv.write", path=SWING_WATCHLIST_CSV):
+        pd.DataFrame(watchlist_list).to_csv(SWING_WATCHLIST_CSV, index=False)
 
 def flatten_columns(df):
     if isinstance(df.columns, pd.MultiIndex):
@@ -31,85 +40,102 @@ def compute_indicators(df, sma_window=200):
     close_series = df["Close"].squeeze()
     volume_series = df["Volume"].squeeze()
     try:
-        sma_obj = SMAIndicator(close=close_series, window=sma_window)
-        ema_obj = EMAIndicator(close=close_series, window=20)
-        rsi_obj = RSIIndicator(close=close_series, window=14)
-        macd_obj = MACD(close=close_series, window_slow=26, window_fast=12, window_sign=9)
-        bb_obj = BollingerBands(close=close_series, window=20, window_dev=2)
-
-        df[f"SMA{sma_window}"] = sma_obj.sma_indicator()
-        df["EMA20"] = ema_obj.ema_indicator()
-        df["RSI14"] = rsi_obj.rsi()
-        df["MACD_Line"] = macd_obj.macd()
-        df["MACD_Signal"] = macd_obj.macd_signal()
-        df["BB_High"] = bb_obj.bollinger_hband()
-        df["BB_Low"] = bb_obj.bollinger_lband()
-        df["Volume_SMA"] = SMAIndicator(close=volume_series, window=20).sma_indicator()
-        df["Trend"] = np.where(df["Close"] > df[f"SMA{sma_window}"], "Uptrend", "Downtrend")
+        with span("ta.indicators", rows=len(df)):
+            sma_obj = SMAIndicator(close=close_series, window=sma_window)
+            ema_obj = EMAIndicator(close=close_series, window=20)
+            rsi_obj = RSIIndicator(close=close_series, window=14)
+            macd_obj = MACD(close=close_series, window_slow=26, window_fast=12, window_sign=9)
+            bb_obj = BollingerBands(close=close_series, window=20, window_dev=2)
+
+            df[f"SMA{sma_window}"] = sma_obj.sma_indicator()
+            df["EMA20"] = ema_obj.ema_indicator()
+            df["RSI14"] = rsi_obj.rsi()
+            df["MACD_Line"] = macd_obj.macd()
+            df["MACD_Signal"] = macd_obj.macd_signal()
+            df["BB_High"] = bb_obj.bollinger_hband()
+            df["BB_Low"] = bb_obj.bollinger_lband()
+            df["Volume_SMA"] = SMAIndicator(close=volume_series, window=20).sma_indicator()
+            df["Trend"] = trend_categorical(df["Close"] > df[f"SMA{sma_window}"], df.index)
+            candlestick_patterns.add_pattern_columns(df)
         df.dropna(inplace=True)
-        return df if not df.empty else None
+        return compact_frame(df) if not df.empty else None
     except Exception:
         return None
 
-def generate_signal_and_strength(row):
-    close = row["Close"]
-    ema20 = row["EMA20"]
-    rsi = row["RSI14"]
-    macd_line = row["MACD_Line"]
-    macd_signal = row["MACD_Signal"]
-    trend = row["Trend"]
-    volume = row["Volume"]
-    volume_sma = row["Volume_SMA"]
-    bb_high = row["BB_High"]
-    bb_low = row["BB_Low"]
-
-    if any(pd.isna(x) for x in [close, ema20, rsi, macd_line, macd_signal, volume, volume_sma]):
-        return "N/A", 0
-
-    volume_confirm = volume > volume_sma
-    rsi_overbought = 70 if close > bb_high else 65
-    rsi_oversold = 30 if close < bb_low else 35
+def compute_panel_indicators(panel, sma_window=200):
+    """
+    compute_indicators for every ticker of a compact_store price panel at once, as column-wise
+    rolling/ewm passes over (dates x tickers) matrices. The tickers must share one calendar
+    (build the panel per exchange), since a gap would restart the windows. Rows that
+    compute_indicators would drop keep NaN indicators and trend -1.
+    """
+    fields = panel["fields"]
+    close = pd.DataFrame(panel["values"][fields.index("Close")], dtype=np.float64)
+    volume = pd.DataFrame(panel["values"][fields.index("Volume")], dtype=np.float64)
+    with span("ta.indicators.panel", rows=close.shape[0], tickers=close.shape[1]):
+        ema = lambda x, n: x.ewm(span=n, min_periods=n, adjust=False).mean()
+        sma = close.rolling(sma_window, min_periods=sma_window).mean()
+        diff = close.diff()
+        up = diff.where(diff > 0, 0.0).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+        down = (-diff.where(diff < 0, 0.0)).ewm(alpha=1 / 14, min_periods=14, adjust=False).mean()
+        rsi = (100 - 100 / (1 + up / down)).mask(down == 0, 100.0).where(down.notna())
+        macd = ema(close, 12) - ema(close, 26)
+        mavg = close.rolling(20, min_periods=20).mean()
+        mstd = close.rolling(20, min_periods=20).std(ddof=0)
+        indicators = {
+            f"SMA{sma_window}": sma,
+            "EMA20": ema(close, 20),
+            "RSI14": rsi,
+            "MACD_Line": macd,
+            "MACD_Signal": ema(macd, 9),
+            "BB_High": mavg + 2 * mstd,
+            "BB_Low": mavg - 2 * mstd,
+            "Volume_SMA": volume.rolling(20, min_periods=20).mean(),
+        }
+        values = np.concatenate([panel["values"], np.stack([x.to_numpy(dtype=np.float32) for x in indicators.values()])])
+        valid = ~np.isnan(values).any(axis=0)
+        values[:, ~valid] = np.nan
+        trend = np.where(valid, (close.to_numpy() > sma.to_numpy()).astype(np.int8), np.int8(-1)).astype(np.int8)
+    return {"dates": panel["dates"], "tickers": panel["tickers"], "fields": fields + list(indicators), "values": values, "trend": trend}
 
-    signal, strength = "⚖️ HOLD", 0
-    if trend == "Uptrend" and close > ema20 and macd_line > macd_signal:
-        if rsi < rsi_oversold and volume_confirm:
-            signal, strength = "🔥 STRONG BUY", 90 if rsi < 25 else 75
-        elif rsi < 50 and volume_confirm:
-            signal, strength = "💡 BUY", 60 if rsi < 40 else 50
-        elif rsi > rsi_overbought:
-            signal, strength = "📈 STRONG HOLD", 25
-    elif trend == "Downtrend" and close < ema20 and macd_line < macd_signal:
-        if rsi > rsi_overbought and volume_confirm:
-            signal, strength = "🔴 STRONG SELL", -90 if rsi > 75 else -75
-        elif rsi > 50 and volume_confirm:
-            signal, strength = "🚫 SELL", -60 if rsi > 60 else -50
-    return signal, strength
+def generate_signal_and_strength(row, strategy=None):
+    """(signal, strength) for one indicator row under strategy (the default swing rules if None)."""
+    return signal_rules.signal_for_row(row, strategy)
 
 def get_current_price_and_changes(ticker):
     try:
-        df = yf.download(ticker, period="1y", interval="1d", progress=False, auto_adjust=True)
+        df = download_history(ticker, period="1y", interval="1d", auto_adjust=True)
         df = flatten_columns(df)
         if not df.empty and "Close" in df.columns:
             current_price = float(df["Close"].iloc[-1])
             one_day_change = current_price - df["Close"].iloc[-2] if len(df) > 1 else 0
             fifty_two_week_low = df["Close"].min()
             fifty_two_week_change = current_price - fifty_two_week_low
-            info = yf.Ticker(ticker).info
-            code = info.get("currency", "USD")
-            return current_price, CURRENCY_MAP.get(code, "£"), one_day_change, fifty_two_week_change
+            code = fetch_info(ticker).get("currency", "USD")
+            _, scale = fx_rates.major_currency(code)
+            return current_price * scale, fx_rates.currency_symbol(code), one_day_change * scale, fifty_two_week_change * scale
     except Exception:
         return None, "£", 0, 0
 
-def fetch_technical_summary(ticker, sma_window=200):
-    df = yf.download(ticker, period="2y", interval="1d", progress=False, auto_adjust=True)
-    df = flatten_columns(df)
-    if df.empty:
-        return None, None
-    df = compute_indicators(df, sma_window)
+def fetch_indicator_frame(ticker, period="2y", sma_window=200):
+    """Indicator frame for ticker, computed once per process and shared by every session."""
+    key = ("indicators", ticker, period, sma_window)
+    with span("indicators", ticker=ticker, period=period) as attrs:
+        df, status = shared_cache.get_or_fetch(
+            key,
+            lambda: compute_indicators(download_history(ticker, period=period, interval="1d", auto_adjust=True), sma_window),
+            shared_cache.INDICATOR_TTL,
+        )
+        attrs["cache"] = "miss" if status == "miss" else "hit"
+    return df.copy() if df is not None else None
+
+def fetch_technical_summary(ticker, sma_window=200, strategy=None):
+    """(signal under strategy, daily indicator frame)."""
+    df = fetch_indicator_frame(ticker, "2y", sma_window)
     if df is None:
         return None, None
     last_row = df.iloc[-1]
-    signal, strength = generate_signal_and_strength(last_row)
+    signal, strength = generate_signal_and_strength(last_row, strategy)
     return signal, df
 
 def generate_swing_trading_conclusion(signal, df):
@@ -141,13 +167,12 @@ def generate_swing_trading_conclusion(signal, df):
         return "This stock is a strong candidate for swing trading with a bearish trend, high RSI indicating overbought conditions, and high volume confirming momentum. The best decision is to enter a short position for potential downward movement, targeting quick profits within days to weeks."
     return "Unexpected signal encountered. Please review the data for accuracy."
 
-def fetch_watchlist_data(ticker, sma_window=200):
-    tkr = yf.Ticker(ticker)
-    info = tkr.info
+def fetch_watchlist_data(ticker, sma_window=200, strategy=None):
+    info = fetch_info(ticker)
     company = info.get("shortName", info.get("longName", ticker))
     price, sym, one_day_change, fifty_two_week_change = get_current_price_and_changes(ticker)
     price_str = f"{sym}{price:.2f}" if price else "N/A"
-    signal, df = fetch_technical_summary(ticker, sma_window)
+    signal, df = fetch_technical_summary(ticker, sma_window, strategy=strategy)
     conclusion = generate_swing_trading_conclusion(signal, df)
     if signal:
         return {
@@ -160,16 +185,16 @@ def fetch_watchlist_data(ticker, sma_window=200):
             "MACD_Line": f"{df['MACD_Line'].iloc[-1]:.2f}" if df is not None and not df.empty else "N/A",
             "MACD_Signal": f"{df['MACD_Signal'].iloc[-1]:.2f}" if df is not None and not df.empty else "N/A",
             "EMA20": f"{df['EMA20'].iloc[-1]:.2f}" if df is not None and not df.empty else "N/A",
+            "Patterns": candlestick_patterns.describe(df.iloc[-1]) if df is not None and not df.empty else "",
             "Signal": signal
         }
-    return {k: "N/A" for k in ["Ticker", "Company", "Current Price", "1-Day Change", "52-Week Change", "RSI14", "MACD_Line", "MACD_Signal", "EMA20", "Signal"]}
+    return None
 
-def plot_full_analysis(ticker, df_full):
-    if df_full is None or df_full.empty:
-        st.warning("No data available for analysis.")
-        return
-    
-    fig, (ax1, ax2, ax3, ax4) = plt.subplots(4, 1, figsize=(12, 16), sharex=True)
+def build_full_analysis_figure(ticker, df_full):
+    # Built without pyplot's global state so the prefetch thread can render alongside a page.
+    fig = Figure(figsize=(12, 16))
+    FigureCanvasAgg(fig)
+    ax1, ax2, ax3, ax4 = fig.subplots(4, 1, sharex=True)
     
     # Price Chart with Indicators
     ax1.plot(df_full.index, df_full["Close"], label="Close", color="blue")
@@ -206,8 +231,84 @@ def plot_full_analysis(ticker, df_full):
     ax4.legend()
     ax4.grid(True, linestyle="--", alpha=0.7)
 
-    plt.xlabel("Date")
-    st.pyplot(fig)
+    ax4.set_xlabel("Date")
+    return fig
+
+def fetch_analysis_chart(ticker):
+    """PNG bytes of the full analysis chart for the default indicator frame, rendered once per process."""
+    def render():
+        df = fetch_indicator_frame(ticker)
+        if df is None or df.empty:
+            return None
+        with span("matplotlib.render", ticker=ticker):
+            return prefetch.figure_png(build_full_analysis_figure(ticker, df))
+    return prefetch.cached_chart(("chart", "full_analysis", ticker), render)
+
+def warm_deep_analysis(ticker):
+    """Everything the deep analysis of ticker reads, fetched into the shared cache ahead of time."""
+    return [fetch_indicator_frame(ticker), fetch_analysis_chart(ticker)]
+
+def plot_full_analysis(ticker, df_full):
+    if df_full is None or df_full.empty:
+        st.warning("No data available for analysis.")
+        return
+    png = fetch_analysis_chart(ticker)
+    if png is None:
+        st.warning("No data available for analysis.")
+        return
+    st.image(png, use_container_width=True)
+
+def recent_patterns(df, bars=10):
+    """The patterns formed on each of the last bars of an indicator frame, newest first."""
+    if df is None or df.empty or candlestick_patterns.PATTERNS[0] not in df.columns:
+        return pd.DataFrame(columns=["Date", "Close", "Patterns"])
+    tail = df.iloc[-bars:]
+    rows = [{"Date": date.strftime("%Y-%m-%d"), "Close": f"{row['Close']:.2f}", "Patterns": candlestick_patterns.describe(row)}
+            for date, row in tail.iterrows()]
+    return pd.DataFrame([r for r in reversed(rows) if r["Patterns"]], columns=["Date", "Close", "Patterns"])
+
+def render_pattern_screener(watchlist_tickers):
+    st.subheader("Candlestick Patterns Formed Today")
+    st.write("""
+    Scan for candlestick patterns on each ticker's latest daily bar. The whole universe is checked in one vectorised pass,
+    and the prices come from the same batched downloads the watchlist uses.
+    **Guidance:** A pattern is a prompt to look closer, not a signal on its own; confirm it with trend, RSI and volume.
+    """)
+    universe = st.radio("Universe", options=["Swing watchlist", "Symbol directory"], horizontal=True, key="pattern_universe")
+    patterns = st.multiselect("Patterns", options=candlestick_patterns.PATTERNS, default=candlestick_patterns.PATTERNS,
+                              format_func=lambda p: p.replace("_", " "), key="pattern_filter")
+    if not st.button("Scan for Patterns"):
+        return
+    tickers = watchlist_tickers if universe == "Swing watchlist" else symbol_directory.load_directory()["tickers"]
+    if not tickers or not patterns:
+        st.warning("Nothing to scan: add tickers and choose at least one pattern.")
+        return
+    with st.spinner(f"Scanning {len(tickers)} tickers..."):
+        # Three months covers the five-bar decline a hammer needs, and shares the daily price store.
+        frames = download_histories(tickers, period="3mo", interval="1d", auto_adjust=True)
+        with span("patterns.screen", tickers=len(frames)):
+            hits = candlestick_patterns.screen_patterns(frames, patterns)
+    if hits.empty:
+        st.info(f"No selected pattern formed on the latest bar of {len(frames)} tickers.")
+        return
+    st.dataframe(hits.reset_index(), use_container_width=True, hide_index=True)
+
+def render_signal_event_study(watchlist_tickers, strategy, strategy_name):
+    st.subheader("Returns Around Signal Changes")
+    st.write("""
+    See how the watchlist has moved, relative to the benchmark, in the days before and after the selected strategy switched
+    to a new signal. Every switch over five years of stored prices is an event; day 0 is the bar the signal changed on.
+    **Guidance:** A CAAR that keeps rising after buy signals (or falling after sell signals) with a band clear of zero suggests
+    the strategy has an edge on these names; a drift before day 0 shows the signal is reacting to a move already made.
+    """)
+    signals = st.multiselect("Signals", options=event_study.STUDY_SIGNALS, default=event_study.STUDY_SIGNALS[:2], key="event_signals")
+    benchmark = st.selectbox("Benchmark", options=list(relative_strength.BENCHMARKS.values()), key="event_benchmark")
+    if not st.button("Run Event Study") or not signals:
+        return
+    with st.spinner(f"Finding {strategy_name} signal changes across {len(watchlist_tickers)} tickers..."):
+        panels, bench = event_study.load_event_data(watchlist_tickers, benchmark)
+        events = event_study.signal_events(panels, strategy, signals)
+    event_study.render_event_study(panels, events, benchmark, bench, f"{strategy_name} Signal Changes")
 
 def run():
     st.title("📈 Stock Analysis for Swing Trading")
@@ -224,10 +325,10 @@ def run():
     """)
 
     if "swing_watchlist" not in st.session_state:
-        st.session_state.swing_watchlist = load_watchlist()
+        st.session_state.swing_watchlist = load_swing_watchlist()
 
     st.subheader("Manage Your Swing Trading Watchlist")
-    new_ticker = st.text_input("Add a Ticker (e.g., 'AAPL')", help="Enter a stock symbol like 'AAPL' for Apple.").upper().strip()
+    new_ticker = symbol_directory.ticker_input("Add a Ticker (e.g., 'AAPL')", key="swing_add")
     if st.button("Add Ticker") and new_ticker:
         if any(item["ticker"] == new_ticker for item in st.session_state.swing_watchlist):
             st.warning(f"{new_ticker} is already in your swing trading watchlist.")
@@ -245,9 +346,10 @@ def run():
 
     st.subheader("Swing Trading Watchlist Table")
     if st.session_state.swing_watchlist:
-        watchlist_data = [fetch_watchlist_data(ticker) for ticker in all_tickers]
-        df = pd.DataFrame(watchlist_data)
-        st.dataframe(df, use_container_width=True, height=400)
+        strategies = signal_rules.available_strategies()
+        strategy_name = st.selectbox("Signal Strategy", options=list(strategies), help=f"Custom strategies are loaded from YAML/JSON files in the '{signal_rules.STRATEGY_DIR}' folder.")
+        strategy = strategies[strategy_name]
+        watchlist_data = render_progressive_table(all_tickers, lambda t: fetch_watchlist_data(t, strategy=strategy), WATCHLIST_COLUMNS, cache_prefix=("swing_row", strategy_name))
 
         st.subheader("Swing Trading Analysis")
         st.write("""
@@ -257,8 +359,12 @@ def run():
         - Combine signals with Bollinger Bands, RSI, MACD, and volume for confirmation.
         - Check the conclusion for the best decision based on current analysis.
         """)
-        selected_ticker = st.selectbox("Select Ticker for Analysis", options=[""] + all_tickers, help="Choose a ticker to see in-depth swing trading analysis.")
+        analysed_tickers = [row["Ticker"] for row in successful_rows(watchlist_data)]
+        signals = {row["Ticker"]: row["Signal"] for row in successful_rows(watchlist_data)}
+        prefetch.schedule("swing", prefetch.prioritise(analysed_tickers, signals, prefetch.recently_viewed("swing")), warm_deep_analysis)
+        selected_ticker = st.selectbox("Select Ticker for Analysis", options=[""] + analysed_tickers, help="Choose a ticker to see in-depth swing trading analysis.")
         if selected_ticker:
+            prefetch.note_viewed("swing", selected_ticker)
             data = next(item for item in watchlist_data if item["Ticker"] == selected_ticker)
             st.write(f"**Ticker:** {data['Ticker']}")
             st.write(f"**Company:** {data['Company']}")
@@ -269,14 +375,37 @@ def run():
             st.write(f"**MACD Line:** {data['MACD_Line']}")
             st.write(f"**MACD Signal:** {data['MACD_Signal']}")
             st.write(f"**EMA20:** {data['EMA20']}")
+            st.write(f"**Candlestick Patterns (latest bar):** {data['Patterns'] or 'None'}")
             st.write(f"**Signal:** {data['Signal']}")
-            conclusion = generate_swing_trading_conclusion(data['Signal'], yf.download(selected_ticker, period="2y", interval="1d", progress=False, auto_adjust=True).pipe(compute_indicators))
+            df_signal = fetch_indicator_frame(selected_ticker)
+            conclusion = generate_swing_trading_conclusion(data['Signal'], df_signal)
             st.write(f"**Conclusion:** {conclusion}")
             st.write("""
             **Guidance:** Use this signal and conclusion to make informed swing trading decisions. Prioritise Strong Buy/Sell for high-potential trades, but confirm with volume and volatility.
             """)
+            last_close = float(df_signal["Close"].iloc[-1]) if df_signal is not None and not df_signal.empty else None
+            paper_trading.render_record_control(selected_ticker, data['Signal'], last_close, fx_rates.ticker_currency(selected_ticker), key="swing")
+
+            st.write("### Multi-Timeframe Confluence")
+            include_intraday = st.checkbox("Include hourly bars", help="Adds one 60-day intraday download, resampled to hourly bars.")
+            summary = multi_timeframe.fetch_multi_timeframe_summary(selected_ticker, include_intraday)
+            if summary is not None:
+                st.dataframe(summary["table"], use_container_width=True, hide_index=True)
+                st.write(f"**Confluence Signal:** {summary['signal']} (score {summary['score']}{', all timeframes aligned' if summary['aligned'] else ''})")
+                st.write("""
+                **Guidance:** Signals that agree across monthly, weekly and daily bars are more reliable than a daily signal alone. A daily buy against a monthly downtrend is a counter-trend trade.
+                """)
+            else:
+                st.warning("Not enough history for a multi-timeframe view.")
 
             # Full Analysis and Graphs
-            df_full = yf.download(selected_ticker, period="2y", interval="1d", progress=False, auto_adjust=True)
-            df_full = compute_indicators(df_full)
-            plot_full_analysis(selected_ticker, df_full)
\ No newline at end of file
+            df_full = fetch_indicator_frame(selected_ticker)
+            recent = recent_patterns(df_full)
+            if not recent.empty:
+                st.write("### Recent Candlestick Patterns")
+                st.dataframe(recent, use_container_width=True, hide_index=True)
+            plot_full_analysis(selected_ticker, df_full)
+
+        render_signal_event_study(all_tickers, strategy, strategy_name)
+
+    render_pattern_screener(all_tickers)
\ No newline at end of file
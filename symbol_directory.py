@@ -0,0 +1,235 @@
+import io
+import os
+import re
+import sys
+import time
+import bisect
+import argparse
+import urllib.request
+import pandas as pd
+import streamlit as st
+import shared_cache
+from tracing import span
+
+# Bundled listing (ticker, name, exchange, currency), in Yahoo symbol form. `--refresh`
+# replaces its US rows with the full Nasdaq Trader directories and keeps everything else.
+SYMBOLS_CSV = "symbols.csv"
+COLUMNS = ["ticker", "name", "exchange", "currency"]
+NASDAQ_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/nasdaqlisted.txt"
+OTHER_LISTED_URL = "https://www.nasdaqtrader.com/dynamic/SymDir/otherlisted.txt"
+OTHER_EXCHANGES = {"A": "NYSE American", "N": "NYSE", "P": "NYSE Arca", "Z": "Cboe BZX", "V": "IEX"}
+US_EXCHANGES = {"NASDAQ", "US Other", *OTHER_EXCHANGES.values()}
+REFRESH_TIMEOUT = 30
+MAX_SUGGESTIONS = 10
+# Prefix ranges longer than this (e.g. a single letter over 100k names) are cut before ranking.
+CANDIDATE_LIMIT = 200
+WORD_PATTERN = re.compile(r"[A-Z0-9&]+")
+TICKER_PATTERN = re.compile(r"^[A-Z0-9^][A-Z0-9.\-=^]*$")
+
+def _words(name):
+    return WORD_PATTERN.findall(str(name).upper())
+
+def _deletes(word):
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+def _delete_index(tickers):
+    """Symmetric-delete index over ticker roots (the part before any '.L'-style suffix)."""
+    index = {}
+    for row, ticker in enumerate(tickers):
+        root = ticker.split(".")[0]
+        for key in _deletes(root) | {root}:
+            index.setdefault(key, []).append(row)
+    return index
+
+def build_index(df):
+    """
+    Sorted key lists for prefix search (bisect gives the range of keys starting with a
+    prefix, like walking a trie, without a node per character) over tickers and name words,
+    plus the typo index. Everything is built up front, so no keystroke pays for indexing.
+    """
+    tickers = df["ticker"].astype(str).str.upper().tolist()
+    name_words = [tuple(_words(name)) for name in df["name"]]
+    ticker_order = sorted(range(len(tickers)), key=tickers.__getitem__)
+    words = sorted((word, row) for row, ws in enumerate(name_words) for word in set(ws))
+    return {
+        "rows": df[COLUMNS].to_dict("records"),
+        "tickers": tickers,
+        "by_ticker": {t: row for row, t in enumerate(tickers)},
+        "name_words": name_words,
+        "ticker_keys": [tickers[row] for row in ticker_order],
+        "ticker_rows": ticker_order,
+        "word_keys": [word for word, _ in words],
+        "word_rows": [row for _, row in words],
+        "deletes": _delete_index(tickers),
+    }
+
+def load_directory(path=SYMBOLS_CSV):
+    """The indexed directory, built once per file version and shared by every session."""
+    if not os.path.exists(path):
+        return build_index(pd.DataFrame(columns=COLUMNS))
+    key = ("symbol_directory", os.path.abspath(path), os.path.getmtime(path))
+
+    def read():
+        with span("csv.read", path=path, bytes=os.path.getsize(path)):
+            df = pd.read_csv(path, dtype=str, keep_default_na=False)
+        with span("symbols.index", rows=len(df)):
+            return build_index(df)
+
+    directory, _ = shared_cache.get_or_fetch(key, read, shared_cache.INFO_TTL)
+    return directory
+
+def _prefix_range(keys, prefix):
+    return bisect.bisect_left(keys, prefix), bisect.bisect_left(keys, prefix + "\uffff")
+
+def _fuzzy_rows(directory, query):
+    """Rows whose ticker root is one edit (insert, delete, substitute, swap) from the query."""
+    index = directory["deletes"]
+    root = query.split(".")[0]
+    rows = []
+    for key in _deletes(root) | {root}:
+        rows.extend(index.get(key, ()))
+    return rows
+
+def search(query, limit=MAX_SUGGESTIONS, directory=None):
+    """
+    Directory rows matching query, best first: the exact ticker, tickers starting with it,
+    names with words starting with each query word; failing all those, tickers one typo away.
+    """
+    directory = directory or load_directory()
+    query = str(query).strip().upper()
+    if not query:
+        return []
+    found = []
+    seen = set()
+
+    def add(rows):
+        for row in rows:
+            if row not in seen:
+                seen.add(row)
+                found.append(row)
+            if len(found) >= limit:
+                return True
+        return False
+
+    exact = directory["by_ticker"].get(query)
+    if add([exact] if exact is not None else []):
+        return [directory["rows"][row] for row in found]
+    start, end = _prefix_range(directory["ticker_keys"], query)
+    if add(directory["ticker_rows"][start:min(end, start + CANDIDATE_LIMIT)]):
+        return [directory["rows"][row] for row in found]
+
+    query_words = _words(query)
+    if query_words:
+        # Candidates come from the query word with the fewest matching names ('GEORGIA', not 'BANK').
+        ranges = [_prefix_range(directory["word_keys"], word) for word in query_words]
+        start, end = min(ranges, key=lambda r: r[1] - r[0])
+        candidates = dict.fromkeys(directory["word_rows"][start:min(end, start + CANDIDATE_LIMIT)])
+        matches = [row for row in candidates
+                   if all(any(word.startswith(q) for word in directory["name_words"][row]) for q in query_words)]
+        # Names that start with the query rank above those that merely contain it.
+        matches.sort(key=lambda row: (not (directory["name_words"][row] or ("",))[0].startswith(query_words[0]), len(directory["rows"][row]["name"])))
+        if add(matches):
+            return [directory["rows"][row] for row in found]
+
+    if not found and len(query) >= 2:
+        add(sorted(set(_fuzzy_rows(directory, query)), key=lambda row: directory["tickers"][row]))
+    return [directory["rows"][row] for row in found[:limit]]
+
+def lookup(ticker, directory=None):
+    """The directory row for an exact ticker, or None."""
+    directory = directory or load_directory()
+    row = directory["by_ticker"].get(str(ticker).strip().upper())
+    return directory["rows"][row] if row is not None else None
+
+def is_known(ticker, directory=None):
+    return lookup(ticker, directory) is not None
+
+def _yahoo_symbol(symbol):
+    # Nasdaq Trader writes class shares as BRK.B and preferreds as ABR$D; Yahoo uses BRK-B and ABR-PD.
+    return symbol.replace(".", "-").replace("$", "-P")
+
+def _fetch_listing(url, timeout):
+    with span("symbols.download", url=url) as attrs:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            payload = response.read()
+        attrs["bytes"] = len(payload)
+    df = pd.read_csv(io.BytesIO(payload), sep="|", dtype=str, keep_default_na=False)
+    # The last line is a "File Creation Time" footer, not a symbol.
+    return df[~df.iloc[:, 0].str.startswith("File Creation Time")]
+
+def fetch_us_listings(timeout=REFRESH_TIMEOUT):
+    """Every Nasdaq, NYSE, NYSE American, NYSE Arca, Cboe and IEX listing (test issues dropped)."""
+    nasdaq = _fetch_listing(NASDAQ_LISTED_URL, timeout)
+    nasdaq = nasdaq[nasdaq["Test Issue"] != "Y"]
+    other = _fetch_listing(OTHER_LISTED_URL, timeout)
+    other = other[other["Test Issue"] != "Y"]
+    return pd.concat([
+        pd.DataFrame({"ticker": nasdaq["Symbol"].map(_yahoo_symbol), "name": nasdaq["Security Name"], "exchange": "NASDAQ", "currency": "USD"}),
+        pd.DataFrame({"ticker": other["ACT Symbol"].map(_yahoo_symbol), "name": other["Security Name"], "exchange": other["Exchange"].map(OTHER_EXCHANGES).fillna("US Other"), "currency": "USD"}),
+    ], ignore_index=True)
+
+def refresh_directory(path=SYMBOLS_CSV, timeout=REFRESH_TIMEOUT):
+    """Replace the US rows of the listing file with today's Nasdaq Trader directories; returns the row count."""
+    current = pd.read_csv(path, dtype=str, keep_default_na=False) if os.path.exists(path) else pd.DataFrame(columns=COLUMNS)
+    kept = current[~current["exchange"].isin(US_EXCHANGES)]
+    merged = pd.concat([kept, fetch_us_listings(timeout)], ignore_index=True)
+    merged = merged[merged["ticker"] != ""].drop_duplicates("ticker", keep="last").sort_values("ticker")
+    tmp = f"{path}.tmp"
+    with span("csv.write", path=path, rows=len(merged)):
+        merged[COLUMNS].to_csv(tmp, index=False)
+        os.replace(tmp, path)
+    return len(merged)
+
+def _label(row):
+    return f"{row['ticker']} — {row['name']} ({row['exchange']}, {row['currency']})"
+
+def ticker_input(label, key, help=None):
+    """
+    Ticker entry backed by the directory: matches are offered as the user types, and a symbol
+    the directory does not know is only returned once 'add anyway' is ticked, so a typo never
+    reaches Yahoo. Returns the chosen ticker, or '' if there is nothing valid to add yet.
+    """
+    query = st.text_input(label, key=f"{key}_query", help=help or "Type a symbol or company name, e.g. 'AAPL', 'BGEO' or 'bank of georgia'.").strip()
+    if not query:
+        return ""
+    directory = load_directory()
+    matches = search(query, directory=directory)
+    typed = query.upper()
+    options = [row["ticker"] for row in matches]
+    if typed not in options and TICKER_PATTERN.match(typed):
+        options.append(typed)
+    if not options:
+        st.warning(f"Nothing in the symbol directory matches '{query}'.")
+        return ""
+    labels = {row["ticker"]: _label(row) for row in matches}
+    choice = st.selectbox("Matching symbols", options=options, key=f"{key}_choice",
+                          format_func=lambda t: labels.get(t, f"{t} (not in the symbol directory)"))
+    if is_known(choice, directory):
+        return choice
+    st.warning(f"{choice} is not in the symbol directory ({SYMBOLS_CSV}); it may be mistyped or need an exchange suffix such as '.L'.")
+    if st.checkbox(f"Add {choice} anyway", key=f"{key}_override"):
+        return choice
+    return ""
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Search or refresh the local symbol directory.")
+    parser.add_argument("query", nargs="*", help="Symbol or company name to look up.")
+    parser.add_argument("--refresh", action="store_true", help="Download the current US listings from Nasdaq Trader.")
+    parser.add_argument("--path", default=SYMBOLS_CSV)
+    parser.add_argument("--limit", type=int, default=MAX_SUGGESTIONS)
+    args = parser.parse_args(argv)
+
+    if args.refresh:
+        print(f"{args.path}: {refresh_directory(args.path)} symbols")
+    if args.query:
+        directory = load_directory(args.path)
+        started = time.perf_counter()
+        matches = search(" ".join(args.query), args.limit, directory)
+        elapsed = (time.perf_counter() - started) * 1000
+        for row in matches:
+            print(_label(row))
+        print(f"{len(matches)} match(es) in {elapsed:.2f} ms over {len(directory['tickers'])} symbols")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
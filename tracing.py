@@ -0,0 +1,180 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from contextlib import contextmanager
+import pandas as pd
+import streamlit as st
+
+TRACE_EXPORT_JSONL = "trace_spans.jsonl"
+# Export is opt-in (CAPRIANI_TRACE_EXPORT=1): the file is appended to on every rerun and never rotated.
+TRACE_EXPORT = os.environ.get("CAPRIANI_TRACE_EXPORT", "0") == "1"
+SERVICE_NAME = "capriani-one"
+
+_current_trace = contextvars.ContextVar("current_trace", default=None)
+_export_lock = threading.Lock()
+
+def start_trace(page):
+    """Begin collecting spans for one rerun of a page and make it the active trace."""
+    trace = {
+        "trace_id": uuid.uuid4().hex,
+        "page": page,
+        "start_ns": time.time_ns(),
+        "end_ns": None,
+        "spans": [],
+        "lock": threading.Lock(),
+    }
+    _current_trace.set(trace)
+    return trace
+
+def current_trace():
+    return _current_trace.get()
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block as a span on the active trace. Yields the attribute dict so the
+    caller can add 'bytes', 'cache' ('hit'/'miss') or anything else it learns.
+    Without an active trace (scripts, workers started elsewhere) this is a no-op timer.
+    """
+    trace = _current_trace.get()
+    attrs = dict(attributes)
+    start_ns = time.time_ns()
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except Exception as e:
+        attrs["error"] = type(e).__name__
+        raise
+    finally:
+        if trace is not None:
+            record = {
+                "name": name,
+                "span_id": uuid.uuid4().hex[:16],
+                "start_ns": start_ns,
+                "seconds": time.perf_counter() - start,
+                "attributes": attrs,
+            }
+            with trace["lock"]:
+                trace["spans"].append(record)
+
+def run_in_trace(func):
+    """Wrap func so it records spans on the caller's trace when run on a worker thread."""
+    ctx = contextvars.copy_context()
+    def wrapper(*args, **kwargs):
+        return ctx.run(func, *args, **kwargs)
+    return wrapper
+
+def payload_bytes(obj):
+    """Best-effort size in bytes of a downloaded payload."""
+    if obj is None:
+        return 0
+    if isinstance(obj, pd.DataFrame):
+        return int(obj.memory_usage(deep=True).sum())
+    try:
+        return len(json.dumps(obj, default=str))
+    except (TypeError, ValueError):
+        return 0
+
+def summarise_trace(trace):
+    """One row per span name: count, wall time, bytes and cache hits/misses."""
+    rows = {}
+    for record in trace["spans"]:
+        row = rows.setdefault(record["name"], {"Operation": record["name"], "Count": 0, "Seconds": 0.0, "Bytes": 0, "Cache Hits": 0, "Cache Misses": 0, "Errors": 0})
+        attrs = record["attributes"]
+        row["Count"] += 1
+        row["Seconds"] += record["seconds"]
+        row["Bytes"] += attrs.get("bytes", 0)
+        if attrs.get("cache") == "hit":
+            row["Cache Hits"] += 1
+        elif attrs.get("cache") == "miss":
+            row["Cache Misses"] += 1
+        if "error" in attrs:
+            row["Errors"] += 1
+    df = pd.DataFrame(list(rows.values()))
+    if not df.empty:
+        df["Seconds"] = df["Seconds"].round(3)
+        df = df.sort_values("Seconds", ascending=False).reset_index(drop=True)
+    return df
+
+def _otel_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+def to_otlp_json(trace):
+    """Render a trace in the OTLP/JSON 'resourceSpans' layout understood by OpenTelemetry collectors."""
+    spans = [{
+        "traceId": trace["trace_id"],
+        "spanId": uuid.uuid4().hex[:16],
+        "name": f"page:{trace['page']}",
+        "kind": 1,
+        "startTimeUnixNano": str(trace["start_ns"]),
+        "endTimeUnixNano": str(trace["end_ns"]),
+        "attributes": [{"key": "page", "value": _otel_value(trace["page"])}],
+    }]
+    root_id = spans[0]["spanId"]
+    for record in trace["spans"]:
+        spans.append({
+            "traceId": trace["trace_id"],
+            "spanId": record["span_id"],
+            "parentSpanId": root_id,
+            "name": record["name"],
+            "kind": 3 if record["name"].startswith("yf.") else 1,
+            "startTimeUnixNano": str(record["start_ns"]),
+            "endTimeUnixNano": str(record["start_ns"] + int(record["seconds"] * 1e9)),
+            "attributes": [{"key": k, "value": _otel_value(v)} for k, v in record["attributes"].items()],
+        })
+    return {"resourceSpans": [{
+        "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+        "scopeSpans": [{"scope": {"name": "tracing"}, "spans": spans}],
+    }]}
+
+def export_trace(trace, path=TRACE_EXPORT_JSONL):
+    """Append the trace as one OTLP/JSON line to path."""
+    line = json.dumps(to_otlp_json(trace))
+    with _export_lock:
+        with open(path, "a") as f:
+            f.write(line + "\n")
+
+def finish_trace(trace, path=TRACE_EXPORT_JSONL):
+    trace["end_ns"] = time.time_ns()
+    if path and TRACE_EXPORT:
+        try:
+            export_trace(trace, path)
+        except OSError:
+            pass
+    return trace
+
+def _prefetch_caption(status):
+    pages = [f"{owner}: {count} queued" for owner, count in status["queued"].items()]
+    pages += [f"{owner}: {reason}" for owner, reason in status["stopped"].items() if owner not in status["queued"]]
+    line = (f"Prefetch: {status['warmed']} warmed, {status['failed']} failed; "
+            f"budget left {status['cpu_left']:.1f}s CPU, {status['memory_left'] / 2 ** 20:.0f} MB")
+    return line + (f" ({', '.join(pages)})" if pages else "")
+
+def render_timing_panel(trace, prefetch_status=None):
+    """Collapsible per-rerun timing breakdown in the sidebar, with the background prefetch state if given."""
+    total = (trace["end_ns"] - trace["start_ns"]) / 1e9
+    summary = summarise_trace(trace)
+    with st.sidebar.expander(f"⏱️ Timing: {total:.2f}s", expanded=False):
+        if prefetch_status is not None:
+            st.caption(_prefetch_caption(prefetch_status))
+        if summary.empty:
+            st.write(f"**{trace['page']}** rendered in {total:.2f}s with no traced operations.")
+            return
+        downloads = summary[summary["Operation"] == "yf.download"]
+        if not downloads.empty:
+            fetched = downloads["Count"].iloc[0] - downloads["Cache Hits"].iloc[0]
+            st.write(f"**{trace['page']}** spent {total:.1f}s, {downloads['Seconds'].iloc[0]:.1f}s of it across {fetched} downloads ({downloads['Cache Hits'].iloc[0]} served from cache).")
+        else:
+            st.write(f"**{trace['page']}** spent {total:.1f}s.")
+        st.dataframe(summary, use_container_width=True, hide_index=True)
+        if TRACE_EXPORT:
+            st.caption(f"Trace {trace['trace_id'][:8]} exported to {TRACE_EXPORT_JSONL}")
@@ -0,0 +1,49 @@
+import os
+import pandas as pd
+from tracing import span
+
+# The three watchlist CSVs the pages edit, readable without importing the pages (and Streamlit),
+# so command-line tools can build their ticker universe from them.
+SWING_WATCHLIST_CSV = "swing_watchlist.csv"
+LTI_CSV = "lti_watchlist.csv"
+DIVIDEND_CSV = "dividend_watchlist.csv"
+
+def _read_csv(path):
+    if os.path.exists(path):
+        with span("csv.read", path=path, bytes=os.path.getsize(path)):
+            return pd.read_csv(path)
+    return None
+
+def load_swing_watchlist():
+    df = _read_csv(SWING_WATCHLIST_CSV)
+    return df.to_dict("records") if df is not None else []
+
+def load_long_term_watchlist():
+    df = _read_csv(LTI_CSV)
+    if df is None:
+        return []
+    df.columns = [col.capitalize() for col in df.columns]
+    return df.to_dict("records")
+
+def load_dividend_watchlist():
+    """Load dividend watchlist from a local CSV if it exists, otherwise return an empty list."""
+    df = _read_csv(DIVIDEND_CSV)
+    return df.to_dict("records") if df is not None else []
+
+def row_tickers(rows):
+    """Tickers of watchlist rows (either column spelling), blanks dropped, in first-seen order."""
+    tickers = [row.get("ticker", row.get("Ticker", "")) for row in rows]
+    return [t for t in dict.fromkeys(tickers) if isinstance(t, str) and t]
+
+def load_universe(universe_csv=None):
+    """
+    (tickers, dividend tickers): every ticker on the three watchlists plus the 'ticker'
+    column (or first column) of an optional universe CSV, in first-seen order.
+    """
+    dividend = row_tickers(load_dividend_watchlist())
+    tickers = row_tickers(load_swing_watchlist() + load_long_term_watchlist()) + dividend
+    if universe_csv:
+        df = pd.read_csv(universe_csv)
+        column = next((c for c in df.columns if c.lower() == "ticker"), df.columns[0])
+        tickers += df[column].dropna().astype(str).str.strip().tolist()
+    return [t for t in dict.fromkeys(tickers) if t], dividend
\ No newline at end of file